@@ -4,9 +4,11 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from .database import get_db
 from .db_models import User
+from .user_directory import directory
 import os
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production-abc123xyz")
@@ -16,6 +18,10 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer(auto_error=False)
 
+# Built once: every request reuses the statement and its compiled SQL
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -44,10 +50,7 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+def _token_user_id(credentials: Optional[HTTPAuthorizationCredentials]) -> int:
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,21 +75,52 @@ async def get_current_user(
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return user_id
+
 
-    user = db.query(User).filter(User.id == user_id).first()
+def _user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db, scope="function")
+) -> User:
+    user_id = _token_user_id(credentials)
+    user = db.scalars(USER_BY_ID, {"user_id": user_id}).first()
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _user_not_found()
 
     return user
 
 
+async def get_current_username(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db, scope="function")
+) -> str:
+    """Username of the authenticated user, for handlers that need nothing else.
+
+    Answered from the user directory, so a warm worker resolves it without
+    starting the (lazy) session; users the directory does not know yet are
+    looked up in the database.
+    """
+    user_id = _token_user_id(credentials)
+    username = directory.username(db, user_id)
+    if username is None:
+        user = db.scalars(USER_BY_ID, {"user_id": user_id}).first()
+        if user is None:
+            raise _user_not_found()
+        username = user.username
+    return username
+
+
 async def get_current_user_optional(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ) -> Optional[User]:
     if not credentials:
         return None
@@ -107,7 +141,7 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
 
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-    user = db.query(User).filter(User.username == username).first()
+    user = db.scalars(USER_BY_USERNAME, {"username": username}).first()
     if not user:
         return None
     if not verify_password(password, user.password_hash):
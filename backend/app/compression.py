@@ -0,0 +1,206 @@
+"""
+Response compression.
+
+API responses larger than COMPRESSION_MIN_BYTES are compressed on the fly
+with brotli or gzip, whichever the client prefers. The frontend build is served
+from precompressed .br / .gz siblings written once at startup, with immutable
+cache headers for Vite's content-hashed assets.
+"""
+import gzip
+import os
+import tempfile
+from mimetypes import guess_type
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+# Cheap settings for per-request compression, maximum for one-off static files
+DYNAMIC_BROTLI_QUALITY = 4
+DYNAMIC_GZIP_LEVEL = 6
+STATIC_BROTLI_QUALITY = 11
+STATIC_GZIP_LEVEL = 9
+
+# Vite emits content-hashed file names under assets/
+IMMUTABLE_PREFIX = "assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, preferring brotli."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in ("br", "gzip"):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=DYNAMIC_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=DYNAMIC_GZIP_LEVEL)
+
+
+def _is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _media_type(path: str) -> str:
+    return guess_type(path)[0] or "text/plain"
+
+
+class CompressionMiddleware:
+    """Compress complete (non-streaming) responses above a size threshold.
+
+    Responses that already carry a Content-Encoding, such as precompressed
+    static files, and streamed bodies pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            start_message, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not _is_compressible(headers.get("content-type", ""))
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            # The compressed bytes differ, so a strong validator no longer applies
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves .br / .gz siblings when the client accepts them."""
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {}
+        relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        if relative.startswith(IMMUTABLE_PREFIX):
+            headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            headers["Cache-Control"] = "no-cache"
+
+        encoding = choose_encoding(request_headers.get("accept-encoding"))
+        variant = f"{full_path}{_EXTENSIONS[encoding]}" if encoding else None
+        if variant and os.path.isfile(variant):
+            headers["Content-Encoding"] = encoding
+            headers["Vary"] = "Accept-Encoding"
+            response = FileResponse(
+                variant,
+                status_code=status_code,
+                headers=headers,
+                media_type=_media_type(full_path),
+                stat_result=os.stat(variant)
+            )
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # Several workers may precompress the same build concurrently
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def precompress_directory(directory: str, minimum_size: int = MINIMUM_SIZE) -> int:
+    """Write .br and .gz variants of compressible files that lack a fresh one.
+
+    Returns the number of variants written.
+    """
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith((".br", ".gz")):
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) < minimum_size or not _is_compressible(_media_type(path)):
+                continue
+
+            mtime = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                data = f.read()
+            for ext, pack in (
+                (".br", lambda d: brotli.compress(d, quality=STATIC_BROTLI_QUALITY)),
+                (".gz", lambda d: gzip.compress(d, compresslevel=STATIC_GZIP_LEVEL, mtime=0)),
+            ):
+                target = path + ext
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                _write_atomic(target, pack(data))
+                written += 1
+    return written
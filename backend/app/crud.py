@@ -1,29 +1,121 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func, desc
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, delete, desc, false, func, or_, select
 from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 import uuid
 
 from . import db_models as models
 from . import schemas
-from .auth import get_password_hash
+from .auth import USER_BY_ID, USER_BY_USERNAME, get_password_hash
+from .filters import Filter
+from .listing import list_records
+
+
+def _finish(db: Session, commit: bool) -> None:
+    # commit=False makes a write a write_queue unit: it is flushed so ids and
+    # server defaults are loaded, and the queue commits it with its batch.
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+
+
+def _apply_update(db: Session, db_obj, update_data: dict, commit: bool = True):
+    """Apply changes to an already loaded record and commit (see _finish).
+
+    Denormalized owner/account names are refreshed by the flush listeners in
+    denormalize.py, so the object can be serialized as-is afterwards.
+    """
+    for key, value in update_data.items():
+        setattr(db_obj, key, value)
+    _finish(db, commit)
+    return db_obj
+
+
+# Hot statements are built once at import; values are bound per call, so
+# SQLAlchemy's compiled cache is hit without regenerating the statement.
+_USER_BY_EMAIL = select(models.User).where(models.User.email == bindparam("email"))
+_USERS = select(models.User).offset(bindparam("skip")).limit(bindparam("limit"))
+
+_ACTIVITIES = (
+    select(models.Activity)
+    .where(models.Activity.record_type == bindparam("record_type"), models.Activity.record_id == bindparam("record_id"))
+    .order_by(desc(models.Activity.created_at))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+_RECENT_RECORD = select(models.RecentRecord).where(
+    models.RecentRecord.user_id == bindparam("user_id"),
+    models.RecentRecord.record_type == bindparam("record_type"),
+    models.RecentRecord.record_id == bindparam("record_id")
+)
+_RECENT_RECORDS = (
+    select(models.RecentRecord)
+    .where(models.RecentRecord.user_id == bindparam("user_id"))
+    .order_by(desc(models.RecentRecord.accessed_at))
+    .limit(bindparam("limit"))
+)
+_PRUNE_RECENT_RECORDS = delete(models.RecentRecord).where(
+    models.RecentRecord.user_id == bindparam("user_id"),
+    models.RecentRecord.id.not_in(
+        select(models.RecentRecord.id)
+        .where(models.RecentRecord.user_id == bindparam("user_id"))
+        .order_by(desc(models.RecentRecord.accessed_at))
+        .limit(bindparam("keep"))
+    )
+).execution_options(synchronize_session=False)
+
+_OPEN_CASES_BY_PRIORITY = (
+    select(models.Case.priority, func.count(models.Case.id))
+    .where(models.Case.status != "Closed")
+    .group_by(models.Case.priority)
+)
+_OPEN_CASES_BY_PRIORITY_FOR_OWNER = (
+    select(models.Case.priority, func.count(models.Case.id))
+    .where(models.Case.status != "Closed", models.Case.owner_id == bindparam("owner_id"))
+    .group_by(models.Case.priority)
+)
+
+_SEARCH = {
+    "contact": select(models.Contact).where(or_(
+        models.Contact.first_name.ilike(bindparam("pattern")),
+        models.Contact.last_name.ilike(bindparam("pattern")),
+        models.Contact.email.ilike(bindparam("pattern"))
+    )).limit(5),
+    "account": select(models.Account).where(models.Account.name.ilike(bindparam("pattern"))).limit(5),
+    "lead": select(models.Lead).where(
+        models.Lead.is_converted == false(),
+        or_(
+            models.Lead.first_name.ilike(bindparam("pattern")),
+            models.Lead.last_name.ilike(bindparam("pattern")),
+            models.Lead.company.ilike(bindparam("pattern")),
+            models.Lead.email.ilike(bindparam("pattern"))
+        )
+    ).limit(5),
+    "opportunity": select(models.Opportunity).where(models.Opportunity.name.ilike(bindparam("pattern"))).limit(5),
+    "case": select(models.Case).where(or_(
+        models.Case.case_number.ilike(bindparam("pattern")),
+        models.Case.subject.ilike(bindparam("pattern"))
+    )).limit(5),
+}
 
 
 # User CRUD
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.scalars(USER_BY_ID, {"user_id": user_id}).first()
 
 
 def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.username == username).first()
+    return db.scalars(USER_BY_USERNAME, {"username": username}).first()
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.email == email).first()
+    return db.scalars(_USER_BY_EMAIL, {"email": email}).first()
 
 
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+    return db.scalars(_USERS, {"skip": skip, "limit": limit}).all()
 
 
 def create_user(db: Session, user: schemas.UserCreate) -> models.User:
@@ -39,15 +131,12 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     )
     db.add(db_user)
     db.commit()
-    db.refresh(db_user)
     return db_user
 
 
 # Account CRUD
 def get_account(db: Session, account_id: int) -> Optional[models.Account]:
-    return db.query(models.Account).options(
-        joinedload(models.Account.owner)
-    ).filter(models.Account.id == account_id).first()
+    return db.get(models.Account, account_id)
 
 
 def get_accounts(
@@ -57,66 +146,43 @@ def get_accounts(
     search: Optional[str] = None,
     owner_id: Optional[int] = None,
     sort_by: str = "created_at",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    fields: Optional[List[str]] = None,
+    filters: Optional[Filter] = None,
+    version: Optional[int] = None
 ) -> Tuple[List[models.Account], int]:
-    query = db.query(models.Account).options(joinedload(models.Account.owner))
-
-    if search:
-        query = query.filter(
-            or_(
-                models.Account.name.ilike(f"%{search}%"),
-                models.Account.phone.ilike(f"%{search}%")
-            )
-        )
-
-    if owner_id:
-        query = query.filter(models.Account.owner_id == owner_id)
-
-    total = query.count()
-
-    if sort_order == "desc":
-        query = query.order_by(desc(getattr(models.Account, sort_by, models.Account.created_at)))
-    else:
-        query = query.order_by(getattr(models.Account, sort_by, models.Account.created_at))
-
-    accounts = query.offset(skip).limit(limit).all()
-    return accounts, total
+    return list_records(
+        db, "account", skip=skip, limit=limit, search=search, sort_by=sort_by, sort_order=sort_order,
+        fields=fields, filters=filters, version=version, owner_id=owner_id
+    )
 
 
-def create_account(db: Session, account: schemas.AccountCreate) -> models.Account:
+def create_account(db: Session, account: schemas.AccountCreate, commit: bool = True) -> models.Account:
     db_account = models.Account(**account.model_dump())
     db.add(db_account)
-    db.commit()
-    db.refresh(db_account)
+    _finish(db, commit)
     return db_account
 
 
-def update_account(db: Session, account_id: int, account: schemas.AccountUpdate) -> Optional[models.Account]:
-    db_account = db.query(models.Account).filter(models.Account.id == account_id).first()
+def update_account(db: Session, account_id: int, account: schemas.AccountUpdate, commit: bool = True) -> Optional[models.Account]:
+    db_account = db.get(models.Account, account_id)
     if db_account:
-        update_data = account.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_account, key, value)
-        db.commit()
-        db.refresh(db_account)
+        _apply_update(db, db_account, account.model_dump(exclude_unset=True), commit)
     return db_account
 
 
-def delete_account(db: Session, account_id: int) -> bool:
-    db_account = db.query(models.Account).filter(models.Account.id == account_id).first()
+def delete_account(db: Session, account_id: int, commit: bool = True) -> bool:
+    db_account = db.get(models.Account, account_id)
     if db_account:
         db.delete(db_account)
-        db.commit()
+        _finish(db, commit)
         return True
     return False
 
 
 # Contact CRUD
 def get_contact(db: Session, contact_id: int) -> Optional[models.Contact]:
-    return db.query(models.Contact).options(
-        joinedload(models.Contact.owner),
-        joinedload(models.Contact.account)
-    ).filter(models.Contact.id == contact_id).first()
+    return db.get(models.Contact, contact_id)
 
 
 def get_contacts(
@@ -127,64 +193,36 @@ def get_contacts(
     owner_id: Optional[int] = None,
     account_id: Optional[int] = None,
     sort_by: str = "created_at",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    fields: Optional[List[str]] = None,
+    filters: Optional[Filter] = None,
+    version: Optional[int] = None
 ) -> Tuple[List[models.Contact], int]:
-    query = db.query(models.Contact).options(
-        joinedload(models.Contact.owner),
-        joinedload(models.Contact.account)
+    return list_records(
+        db, "contact", skip=skip, limit=limit, search=search, sort_by=sort_by, sort_order=sort_order,
+        fields=fields, filters=filters, version=version, owner_id=owner_id, account_id=account_id
     )
 
-    if search:
-        query = query.filter(
-            or_(
-                models.Contact.first_name.ilike(f"%{search}%"),
-                models.Contact.last_name.ilike(f"%{search}%"),
-                models.Contact.email.ilike(f"%{search}%"),
-                models.Contact.phone.ilike(f"%{search}%")
-            )
-        )
-
-    if owner_id:
-        query = query.filter(models.Contact.owner_id == owner_id)
-
-    if account_id:
-        query = query.filter(models.Contact.account_id == account_id)
-
-    total = query.count()
 
-    if sort_order == "desc":
-        query = query.order_by(desc(getattr(models.Contact, sort_by, models.Contact.created_at)))
-    else:
-        query = query.order_by(getattr(models.Contact, sort_by, models.Contact.created_at))
-
-    contacts = query.offset(skip).limit(limit).all()
-    return contacts, total
-
-
-def create_contact(db: Session, contact: schemas.ContactCreate) -> models.Contact:
+def create_contact(db: Session, contact: schemas.ContactCreate, commit: bool = True) -> models.Contact:
     db_contact = models.Contact(**contact.model_dump())
     db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    _finish(db, commit)
     return db_contact
 
 
-def update_contact(db: Session, contact_id: int, contact: schemas.ContactUpdate) -> Optional[models.Contact]:
-    db_contact = db.query(models.Contact).filter(models.Contact.id == contact_id).first()
+def update_contact(db: Session, contact_id: int, contact: schemas.ContactUpdate, commit: bool = True) -> Optional[models.Contact]:
+    db_contact = db.get(models.Contact, contact_id)
     if db_contact:
-        update_data = contact.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_contact, key, value)
-        db.commit()
-        db.refresh(db_contact)
+        _apply_update(db, db_contact, contact.model_dump(exclude_unset=True), commit)
     return db_contact
 
 
-def delete_contact(db: Session, contact_id: int) -> bool:
-    db_contact = db.query(models.Contact).filter(models.Contact.id == contact_id).first()
+def delete_contact(db: Session, contact_id: int, commit: bool = True) -> bool:
+    db_contact = db.get(models.Contact, contact_id)
     if db_contact:
         db.delete(db_contact)
-        db.commit()
+        _finish(db, commit)
         return True
     return False
 
@@ -206,9 +244,7 @@ def check_contact_duplicates(db: Session, email: Optional[str], phone: Optional[
 
 # Lead CRUD
 def get_lead(db: Session, lead_id: int) -> Optional[models.Lead]:
-    return db.query(models.Lead).options(
-        joinedload(models.Lead.owner)
-    ).filter(models.Lead.id == lead_id).first()
+    return db.get(models.Lead, lead_id)
 
 
 def get_leads(
@@ -219,65 +255,36 @@ def get_leads(
     owner_id: Optional[int] = None,
     status: Optional[str] = None,
     sort_by: str = "created_at",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    fields: Optional[List[str]] = None,
+    filters: Optional[Filter] = None,
+    version: Optional[int] = None
 ) -> Tuple[List[models.Lead], int]:
-    query = db.query(models.Lead).options(joinedload(models.Lead.owner))
-
-    # Exclude converted leads by default
-    query = query.filter(models.Lead.is_converted == False)
-
-    if search:
-        query = query.filter(
-            or_(
-                models.Lead.first_name.ilike(f"%{search}%"),
-                models.Lead.last_name.ilike(f"%{search}%"),
-                models.Lead.email.ilike(f"%{search}%"),
-                models.Lead.company.ilike(f"%{search}%"),
-                models.Lead.phone.ilike(f"%{search}%")
-            )
-        )
-
-    if owner_id:
-        query = query.filter(models.Lead.owner_id == owner_id)
-
-    if status:
-        query = query.filter(models.Lead.status == status)
-
-    total = query.count()
-
-    if sort_order == "desc":
-        query = query.order_by(desc(getattr(models.Lead, sort_by, models.Lead.created_at)))
-    else:
-        query = query.order_by(getattr(models.Lead, sort_by, models.Lead.created_at))
-
-    leads = query.offset(skip).limit(limit).all()
-    return leads, total
+    return list_records(
+        db, "lead", skip=skip, limit=limit, search=search, sort_by=sort_by, sort_order=sort_order,
+        fields=fields, filters=filters, version=version, owner_id=owner_id, status=status
+    )
 
 
-def create_lead(db: Session, lead: schemas.LeadCreate) -> models.Lead:
+def create_lead(db: Session, lead: schemas.LeadCreate, commit: bool = True) -> models.Lead:
     db_lead = models.Lead(**lead.model_dump())
     db.add(db_lead)
-    db.commit()
-    db.refresh(db_lead)
+    _finish(db, commit)
     return db_lead
 
 
-def update_lead(db: Session, lead_id: int, lead: schemas.LeadUpdate) -> Optional[models.Lead]:
-    db_lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
+def update_lead(db: Session, lead_id: int, lead: schemas.LeadUpdate, commit: bool = True) -> Optional[models.Lead]:
+    db_lead = db.get(models.Lead, lead_id)
     if db_lead:
-        update_data = lead.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_lead, key, value)
-        db.commit()
-        db.refresh(db_lead)
+        _apply_update(db, db_lead, lead.model_dump(exclude_unset=True), commit)
     return db_lead
 
 
-def delete_lead(db: Session, lead_id: int) -> bool:
-    db_lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
+def delete_lead(db: Session, lead_id: int, commit: bool = True) -> bool:
+    db_lead = db.get(models.Lead, lead_id)
     if db_lead:
         db.delete(db_lead)
-        db.commit()
+        _finish(db, commit)
         return True
     return False
 
@@ -299,10 +306,7 @@ def check_lead_duplicates(db: Session, email: Optional[str], phone: Optional[str
 
 # Opportunity CRUD
 def get_opportunity(db: Session, opportunity_id: int) -> Optional[models.Opportunity]:
-    return db.query(models.Opportunity).options(
-        joinedload(models.Opportunity.owner),
-        joinedload(models.Opportunity.account)
-    ).filter(models.Opportunity.id == opportunity_id).first()
+    return db.get(models.Opportunity, opportunity_id)
 
 
 def get_opportunities(
@@ -314,60 +318,36 @@ def get_opportunities(
     account_id: Optional[int] = None,
     stage: Optional[str] = None,
     sort_by: str = "created_at",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    fields: Optional[List[str]] = None,
+    filters: Optional[Filter] = None,
+    version: Optional[int] = None
 ) -> Tuple[List[models.Opportunity], int]:
-    query = db.query(models.Opportunity).options(
-        joinedload(models.Opportunity.owner),
-        joinedload(models.Opportunity.account)
+    return list_records(
+        db, "opportunity", skip=skip, limit=limit, search=search, sort_by=sort_by, sort_order=sort_order,
+        fields=fields, filters=filters, version=version, owner_id=owner_id, account_id=account_id, stage=stage
     )
 
-    if search:
-        query = query.filter(models.Opportunity.name.ilike(f"%{search}%"))
-
-    if owner_id:
-        query = query.filter(models.Opportunity.owner_id == owner_id)
-
-    if account_id:
-        query = query.filter(models.Opportunity.account_id == account_id)
-
-    if stage:
-        query = query.filter(models.Opportunity.stage == stage)
 
-    total = query.count()
-
-    if sort_order == "desc":
-        query = query.order_by(desc(getattr(models.Opportunity, sort_by, models.Opportunity.created_at)))
-    else:
-        query = query.order_by(getattr(models.Opportunity, sort_by, models.Opportunity.created_at))
-
-    opportunities = query.offset(skip).limit(limit).all()
-    return opportunities, total
-
-
-def create_opportunity(db: Session, opportunity: schemas.OpportunityCreate) -> models.Opportunity:
+def create_opportunity(db: Session, opportunity: schemas.OpportunityCreate, commit: bool = True) -> models.Opportunity:
     db_opportunity = models.Opportunity(**opportunity.model_dump())
     db.add(db_opportunity)
-    db.commit()
-    db.refresh(db_opportunity)
+    _finish(db, commit)
     return db_opportunity
 
 
-def update_opportunity(db: Session, opportunity_id: int, opportunity: schemas.OpportunityUpdate) -> Optional[models.Opportunity]:
-    db_opportunity = db.query(models.Opportunity).filter(models.Opportunity.id == opportunity_id).first()
+def update_opportunity(db: Session, opportunity_id: int, opportunity: schemas.OpportunityUpdate, commit: bool = True) -> Optional[models.Opportunity]:
+    db_opportunity = db.get(models.Opportunity, opportunity_id)
     if db_opportunity:
-        update_data = opportunity.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_opportunity, key, value)
-        db.commit()
-        db.refresh(db_opportunity)
+        _apply_update(db, db_opportunity, opportunity.model_dump(exclude_unset=True), commit)
     return db_opportunity
 
 
-def delete_opportunity(db: Session, opportunity_id: int) -> bool:
-    db_opportunity = db.query(models.Opportunity).filter(models.Opportunity.id == opportunity_id).first()
+def delete_opportunity(db: Session, opportunity_id: int, commit: bool = True) -> bool:
+    db_opportunity = db.get(models.Opportunity, opportunity_id)
     if db_opportunity:
         db.delete(db_opportunity)
-        db.commit()
+        _finish(db, commit)
         return True
     return False
 
@@ -378,11 +358,7 @@ def generate_case_number() -> str:
 
 
 def get_case(db: Session, case_id: int) -> Optional[models.Case]:
-    return db.query(models.Case).options(
-        joinedload(models.Case.owner),
-        joinedload(models.Case.account),
-        joinedload(models.Case.contact)
-    ).filter(models.Case.id == case_id).first()
+    return db.get(models.Case, case_id)
 
 
 def get_cases(
@@ -395,59 +371,26 @@ def get_cases(
     status: Optional[str] = None,
     priority: Optional[str] = None,
     sort_by: str = "created_at",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    fields: Optional[List[str]] = None,
+    filters: Optional[Filter] = None,
+    version: Optional[int] = None
 ) -> Tuple[List[models.Case], int]:
-    query = db.query(models.Case).options(
-        joinedload(models.Case.owner),
-        joinedload(models.Case.account),
-        joinedload(models.Case.contact)
+    return list_records(
+        db, "case", skip=skip, limit=limit, search=search, sort_by=sort_by, sort_order=sort_order,
+        fields=fields, filters=filters, version=version, owner_id=owner_id, account_id=account_id, status=status, priority=priority
     )
 
-    if search:
-        query = query.filter(
-            or_(
-                models.Case.case_number.ilike(f"%{search}%"),
-                models.Case.subject.ilike(f"%{search}%")
-            )
-        )
-
-    if owner_id:
-        query = query.filter(models.Case.owner_id == owner_id)
-
-    if account_id:
-        query = query.filter(models.Case.account_id == account_id)
-
-    if status:
-        query = query.filter(models.Case.status == status)
-
-    if priority:
-        query = query.filter(models.Case.priority == priority)
-
-    total = query.count()
-
-    if sort_order == "desc":
-        query = query.order_by(desc(getattr(models.Case, sort_by, models.Case.created_at)))
-    else:
-        query = query.order_by(getattr(models.Case, sort_by, models.Case.created_at))
-
-    cases = query.offset(skip).limit(limit).all()
-    return cases, total
-
 
 def get_cases_by_priority(db: Session, owner_id: Optional[int] = None) -> dict:
-    query = db.query(
-        models.Case.priority,
-        func.count(models.Case.id)
-    ).filter(models.Case.status != "Closed")
-
     if owner_id:
-        query = query.filter(models.Case.owner_id == owner_id)
-
-    result = query.group_by(models.Case.priority).all()
+        result = db.execute(_OPEN_CASES_BY_PRIORITY_FOR_OWNER, {"owner_id": owner_id})
+    else:
+        result = db.execute(_OPEN_CASES_BY_PRIORITY)
     return {priority: count for priority, count in result}
 
 
-def create_case(db: Session, case: schemas.CaseCreate) -> models.Case:
+def create_case(db: Session, case: schemas.CaseCreate, commit: bool = True) -> models.Case:
     case_data = case.model_dump()
     case_data["case_number"] = generate_case_number()
 
@@ -458,27 +401,22 @@ def create_case(db: Session, case: schemas.CaseCreate) -> models.Case:
 
     db_case = models.Case(**case_data)
     db.add(db_case)
-    db.commit()
-    db.refresh(db_case)
+    _finish(db, commit)
     return db_case
 
 
-def update_case(db: Session, case_id: int, case: schemas.CaseUpdate) -> Optional[models.Case]:
-    db_case = db.query(models.Case).filter(models.Case.id == case_id).first()
+def update_case(db: Session, case_id: int, case: schemas.CaseUpdate, commit: bool = True) -> Optional[models.Case]:
+    db_case = db.get(models.Case, case_id)
     if db_case:
-        update_data = case.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_case, key, value)
-        db.commit()
-        db.refresh(db_case)
+        _apply_update(db, db_case, case.model_dump(exclude_unset=True), commit)
     return db_case
 
 
-def delete_case(db: Session, case_id: int) -> bool:
-    db_case = db.query(models.Case).filter(models.Case.id == case_id).first()
+def delete_case(db: Session, case_id: int, commit: bool = True) -> bool:
+    db_case = db.get(models.Case, case_id)
     if db_case:
         db.delete(db_case)
-        db.commit()
+        _finish(db, commit)
         return True
     return False
 
@@ -491,36 +429,33 @@ def get_activities(
     skip: int = 0,
     limit: int = 50
 ) -> List[models.Activity]:
-    return db.query(models.Activity).options(
-        joinedload(models.Activity.created_by_user)
-    ).filter(
-        models.Activity.record_type == record_type,
-        models.Activity.record_id == record_id
-    ).order_by(desc(models.Activity.created_at)).offset(skip).limit(limit).all()
+    return db.scalars(_ACTIVITIES, {
+        "record_type": record_type, "record_id": record_id, "skip": skip, "limit": limit
+    }).all()
 
 
-def create_activity(db: Session, activity: schemas.ActivityCreate, user_id: int) -> models.Activity:
+def create_activity(db: Session, activity: schemas.ActivityCreate, user_id: int, commit: bool = True) -> models.Activity:
     db_activity = models.Activity(**activity.model_dump(), created_by=user_id)
     db.add(db_activity)
-    db.commit()
-    db.refresh(db_activity)
+    _finish(db, commit)
     return db_activity
 
 
 # Recent Records
-def add_recent_record(
+def track_recent_record(
     db: Session,
     user_id: int,
     record_type: str,
     record_id: int,
     record_name: str
-):
-    # Check if record already exists
-    existing = db.query(models.RecentRecord).filter(
-        models.RecentRecord.user_id == user_id,
-        models.RecentRecord.record_type == record_type,
-        models.RecentRecord.record_id == record_id
-    ).first()
+) -> None:
+    """Upsert a recent record and prune the user's list, without committing.
+
+    A write_queue unit; add_recent_record commits it on its own.
+    """
+    existing = db.scalars(_RECENT_RECORD, {
+        "user_id": user_id, "record_type": record_type, "record_id": record_id
+    }).first()
 
     if existing:
         existing.accessed_at = datetime.utcnow()
@@ -533,39 +468,34 @@ def add_recent_record(
             record_name=record_name
         )
         db.add(db_record)
-
-    db.commit()
+    db.flush()
 
     # Keep only last 20 recent records per user
-    recent_ids = db.query(models.RecentRecord.id).filter(
-        models.RecentRecord.user_id == user_id
-    ).order_by(desc(models.RecentRecord.accessed_at)).limit(20).subquery()
-
-    db.query(models.RecentRecord).filter(
-        models.RecentRecord.user_id == user_id,
-        ~models.RecentRecord.id.in_(recent_ids)
-    ).delete(synchronize_session=False)
+    db.execute(_PRUNE_RECENT_RECORDS, {"user_id": user_id, "keep": 20})
+
+
+def add_recent_record(
+    db: Session,
+    user_id: int,
+    record_type: str,
+    record_id: int,
+    record_name: str
+):
+    track_recent_record(db, user_id, record_type, record_id, record_name)
     db.commit()
 
 
 def get_recent_records(db: Session, user_id: int, limit: int = 10) -> List[models.RecentRecord]:
-    return db.query(models.RecentRecord).filter(
-        models.RecentRecord.user_id == user_id
-    ).order_by(desc(models.RecentRecord.accessed_at)).limit(limit).all()
+    return db.scalars(_RECENT_RECORDS, {"user_id": user_id, "limit": limit}).all()
 
 
 # Global Search
 def global_search(db: Session, query: str, limit: int = 20) -> List[schemas.SearchResult]:
     results = []
+    params = {"pattern": f"%{query}%"}
 
     # Search Contacts
-    contacts = db.query(models.Contact).filter(
-        or_(
-            models.Contact.first_name.ilike(f"%{query}%"),
-            models.Contact.last_name.ilike(f"%{query}%"),
-            models.Contact.email.ilike(f"%{query}%")
-        )
-    ).limit(5).all()
+    contacts = db.scalars(_SEARCH["contact"], params).all()
 
     for c in contacts:
         results.append(schemas.SearchResult(
@@ -577,9 +507,7 @@ def global_search(db: Session, query: str, limit: int = 20) -> List[schemas.Sear
         ))
 
     # Search Accounts
-    accounts = db.query(models.Account).filter(
-        models.Account.name.ilike(f"%{query}%")
-    ).limit(5).all()
+    accounts = db.scalars(_SEARCH["account"], params).all()
 
     for a in accounts:
         results.append(schemas.SearchResult(
@@ -591,15 +519,7 @@ def global_search(db: Session, query: str, limit: int = 20) -> List[schemas.Sear
         ))
 
     # Search Leads
-    leads = db.query(models.Lead).filter(
-        models.Lead.is_converted == False,
-        or_(
-            models.Lead.first_name.ilike(f"%{query}%"),
-            models.Lead.last_name.ilike(f"%{query}%"),
-            models.Lead.company.ilike(f"%{query}%"),
-            models.Lead.email.ilike(f"%{query}%")
-        )
-    ).limit(5).all()
+    leads = db.scalars(_SEARCH["lead"], params).all()
 
     for l in leads:
         results.append(schemas.SearchResult(
@@ -611,9 +531,7 @@ def global_search(db: Session, query: str, limit: int = 20) -> List[schemas.Sear
         ))
 
     # Search Opportunities
-    opportunities = db.query(models.Opportunity).filter(
-        models.Opportunity.name.ilike(f"%{query}%")
-    ).limit(5).all()
+    opportunities = db.scalars(_SEARCH["opportunity"], params).all()
 
     for o in opportunities:
         results.append(schemas.SearchResult(
@@ -625,12 +543,7 @@ def global_search(db: Session, query: str, limit: int = 20) -> List[schemas.Sear
         ))
 
     # Search Cases
-    cases = db.query(models.Case).filter(
-        or_(
-            models.Case.case_number.ilike(f"%{query}%"),
-            models.Case.subject.ilike(f"%{query}%")
-        )
-    ).limit(5).all()
+    cases = db.scalars(_SEARCH["case"], params).all()
 
     for cs in cases:
         results.append(schemas.SearchResult(
@@ -1,20 +1,215 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+"""
+Engines, sessions and the request session router.
+
+Writes go through ``engine``. Reads from GET requests go through
+``read_engine``, which has its own connection pool:
+- For a SQLite file it is the same file opened with ``mode=ro``. The
+  primary engine switches the file to WAL journaling, so these readers
+  never block the writer and the writer never blocks them.
+- For other databases, READ_DATABASE_URL can point at a replica.
+- An in-memory SQLite database has no read engine, and reads use
+  ``engine``.
+
+A client that wrote in the last READ_YOUR_WRITES_SECONDS reads from the
+primary, so a replica that lags behind still shows users their own changes.
+"""
 import os
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session, sessionmaker
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/app.db")
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+def _connect_args(url) -> dict:
+    return {"check_same_thread": False} if url.get_backend_name() == "sqlite" else {}
+
+
+def _sqlite_file(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:") \
+        and not url.database.startswith("file:")
+
+
+def read_only_url(url):
+    """The URL of a read-only connection to the same SQLite file, or None."""
+    if not _sqlite_file(url):
+        return None
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_url = make_url(DATABASE_URL)
+engine = create_engine(_url, connect_args=_connect_args(_url))
+
+if _sqlite_file(_url):
+    @event.listens_for(engine, "connect")
+    def _use_wal(dbapi_connection, connection_record):
+        # Persistent for the file; readers then see the last commit without
+        # taking locks the writer has to wait for
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+_read_url = make_url(READ_DATABASE_URL) if READ_DATABASE_URL else read_only_url(_url)
+read_engine = create_engine(_read_url, connect_args=_connect_args(_read_url)) if _read_url is not None else engine
+
+# Objects stay loaded after commit so write routes can build their response
+# from the instance they just saved instead of re-querying it.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def upgrade_schema(bind) -> list:
+    """Add columns and indexes introduced after a database was created.
+
+    There are no migrations and create_all only creates missing tables, so new
+    columns (nullable or with a constant server default) are added with ALTER
+    TABLE and missing indexes created.
+    Returns the "table.column" names that were added.
+    """
+    inspector = inspect(bind)
+    added = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+                    added.append(f"{table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    return added
+
+
+class RecentWriters:
+    """Clients that committed a write within the last ``window`` seconds."""
+
+    def __init__(self, window: float, maxsize: int = 10000):
+        self.window = window
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._writes = {}
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def __contains__(self, key) -> bool:
+        written = self._writes.get(key)
+        return written is not None and time.monotonic() - written < self.window
+
+    def mark(self, key) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._writes.pop(key, None)
+            self._writes[key] = now
+            if len(self._writes) > self.maxsize:
+                # Oldest first by insertion; drop the expired ones
+                for stale in [k for k, t in self._writes.items() if now - t >= self.window]:
+                    del self._writes[stale]
+                while len(self._writes) > self.maxsize:
+                    del self._writes[next(iter(self._writes))]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writes.clear()
+
+
+recent_writers = RecentWriters(READ_YOUR_WRITES_SECONDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    # Marked at commit, before the handler can respond to the client
+    if session.info.pop("wrote", False) and "client" in session.info:
+        recent_writers.mark(session.info["client"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("wrote", None)
+
+
+def client_key(request: Request) -> str:
+    """Who a request is from: its bearer token, else its address."""
+    return request.headers.get("authorization") or (request.client.host if request.client else "")
+
+
+class LazySession:
+    """Stands in for a Session and creates it on first use.
+
+    Handlers that declare a session but never query it (the frontend logging
+    endpoints, whose user comes from the user directory) then never build
+    one, and closing an unused LazySession is free.
+    """
+    __slots__ = ("_factory", "_info", "_session")
+
+    def __init__(self, factory, info: Optional[dict] = None):
+        self._factory = factory
+        self._info = info
+        self._session: Optional[Session] = None
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    def _get(self) -> Session:
+        if self._session is None:
+            self._session = self._factory(info=self._info) if self._info else self._factory()
+        return self._session
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+# Routes declare these with scope="function": teardown then runs as soon as
+# the handler returns, so the connection goes back to the pool before the
+# response is serialized and sent instead of after.
+def get_write_db(request: Request):
+    """Session on the primary, for handlers that write even on GET."""
+    db = LazySession(SessionLocal, {"client": client_key(request)})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_db(request: Request):
+    """Session router: GETs read from the read engine unless the client just wrote."""
+    client = client_key(request)
+    if request.method in SAFE_METHODS and read_engine is not engine and client not in recent_writers:
+        db = LazySession(ReadSessionLocal)
+    else:
+        db = LazySession(SessionLocal, {"client": client})
     try:
         yield db
     finally:
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Enum, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 from .database import Base
 import enum
 
@@ -44,6 +44,9 @@ class OpportunityStage(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    # Fetch server-generated timestamps as part of the INSERT/UPDATE (RETURNING
+    # where the dialect supports it) so saved objects need no refresh.
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(100), unique=True, index=True, nullable=False)
@@ -78,6 +81,14 @@ class User(Base):
 
 class Account(Base):
     __tablename__ = "accounts"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_accounts_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_accounts_created_at", "created_at"),
+        # Sort keys, see sorting.py
+        Index("ix_accounts_updated_at", "updated_at"),
+        Index("ix_accounts_industry", "industry"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
@@ -89,6 +100,11 @@ class Account(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every UPDATE; used for strong ETags
+    row_version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("row_version") + 1)
+
+    # Denormalized for list views, maintained in denormalize.py
+    owner_alias = Column(String(10))
 
     # Relationships
     owner = relationship("User", back_populates="owned_accounts")
@@ -99,11 +115,20 @@ class Account(Base):
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_contacts_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_contacts_created_at", "created_at"),
+        # Sort keys, see sorting.py
+        Index("ix_contacts_updated_at", "updated_at"),
+        Index("ix_contacts_last_name_first_name", "last_name", "first_name"),
+        Index("ix_contacts_account_name", "account_name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(100))
     last_name = Column(String(100), nullable=False)
-    account_id = Column(Integer, ForeignKey("accounts.id"))
+    account_id = Column(Integer, ForeignKey("accounts.id"), index=True)
     title = Column(String(100))
     phone = Column(String(50))
     email = Column(String(255), index=True)
@@ -111,6 +136,12 @@ class Contact(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every UPDATE; used for strong ETags
+    row_version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("row_version") + 1)
+
+    # Denormalized for list views, maintained in denormalize.py
+    owner_alias = Column(String(10))
+    account_name = Column(String(255))
 
     # Relationships
     owner = relationship("User", back_populates="owned_contacts")
@@ -124,6 +155,21 @@ class Contact(Base):
 
 class Lead(Base):
     __tablename__ = "leads"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Owner lists also filter on is_converted; without both columns the
+        # planner may prefer an is_converted index and walk most of the table
+        Index("ix_leads_owner_id_is_converted_created_at", "owner_id", "is_converted", "created_at"),
+        Index("ix_leads_status_is_converted_created_at", "status", "is_converted", "created_at"),
+        # Lead lists always exclude converted leads
+        Index("ix_leads_is_converted_created_at", "is_converted", "created_at"),
+        # Sort keys, see sorting.py
+        Index("ix_leads_is_converted_updated_at", "is_converted", "updated_at"),
+        Index("ix_leads_is_converted_last_name_first_name", "is_converted", "last_name", "first_name"),
+        Index("ix_leads_is_converted_company", "is_converted", "company"),
+        Index("ix_leads_is_converted_status", "is_converted", "status"),
+        Index("ix_leads_is_converted_score", "is_converted", "score"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(100))
@@ -144,6 +190,11 @@ class Lead(Base):
     converted_opportunity_id = Column(Integer, ForeignKey("opportunities.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every UPDATE; used for strong ETags
+    row_version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("row_version") + 1)
+
+    # Denormalized for list views, maintained in denormalize.py
+    owner_alias = Column(String(10))
 
     # Relationships
     owner = relationship("User", back_populates="owned_leads")
@@ -155,10 +206,21 @@ class Lead(Base):
 
 class Opportunity(Base):
     __tablename__ = "opportunities"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_opportunities_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_opportunities_stage_created_at", "stage", "created_at"),
+        Index("ix_opportunities_created_at", "created_at"),
+        # Sort keys, see sorting.py
+        Index("ix_opportunities_updated_at", "updated_at"),
+        Index("ix_opportunities_account_name", "account_name"),
+        Index("ix_opportunities_amount", "amount"),
+        Index("ix_opportunities_close_date", "close_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
-    account_id = Column(Integer, ForeignKey("accounts.id"))
+    account_id = Column(Integer, ForeignKey("accounts.id"), index=True)
     amount = Column(Float, default=0)
     stage = Column(String(50), default="Prospecting")
     probability = Column(Integer, default=0)
@@ -167,6 +229,12 @@ class Opportunity(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every UPDATE; used for strong ETags
+    row_version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("row_version") + 1)
+
+    # Denormalized for list views, maintained in denormalize.py
+    owner_alias = Column(String(10))
+    account_name = Column(String(255))
 
     # Relationships
     owner = relationship("User", back_populates="owned_opportunities")
@@ -175,6 +243,18 @@ class Opportunity(Base):
 
 class Case(Base):
     __tablename__ = "cases"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_cases_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_cases_status_created_at", "status", "created_at"),
+        # Also covers the open-cases-by-priority counts
+        Index("ix_cases_priority_status", "priority", "status"),
+        Index("ix_cases_created_at", "created_at"),
+        # Sort keys, see sorting.py
+        Index("ix_cases_updated_at", "updated_at"),
+        Index("ix_cases_subject", "subject"),
+        Index("ix_cases_priority_created_at", "priority", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     case_number = Column(String(50), unique=True, index=True)
@@ -182,14 +262,21 @@ class Case(Base):
     description = Column(Text)
     status = Column(String(50), default="New")
     priority = Column(String(50), default="Medium")
-    account_id = Column(Integer, ForeignKey("accounts.id"))
-    contact_id = Column(Integer, ForeignKey("contacts.id"))
+    account_id = Column(Integer, ForeignKey("accounts.id"), index=True)
+    contact_id = Column(Integer, ForeignKey("contacts.id"), index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     is_escalated = Column(Boolean, default=False)
     escalated_at = Column(DateTime(timezone=True))
     sla_due_date = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every UPDATE; used for strong ETags
+    row_version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("row_version") + 1)
+
+    # Denormalized for list views, maintained in denormalize.py
+    owner_alias = Column(String(10))
+    account_name = Column(String(255))
+    contact_name = Column(String(255))
 
     # Relationships
     owner = relationship("User", back_populates="owned_cases")
@@ -199,6 +286,10 @@ class Case(Base):
 
 class Activity(Base):
     __tablename__ = "activities"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_activities_record_type_record_id_created_at", "record_type", "record_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     record_type = Column(String(50), nullable=False)  # contact, account, lead, opportunity, case
@@ -228,6 +319,10 @@ class AuditLog(Base):
 
 class RecentRecord(Base):
     __tablename__ = "recent_records"
+    __table_args__ = (
+        Index("ix_recent_records_user_id_accessed_at", "user_id", "accessed_at"),
+        Index("ix_recent_records_user_id_record", "user_id", "record_type", "record_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -237,6 +332,26 @@ class RecentRecord(Base):
     accessed_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class TableVersion(Base):
+    """Per record type change counter, bumped once by every transaction that
+    inserts, updates or deletes records of that type. Used for list ETags."""
+    __tablename__ = "table_versions"
+
+    record_type = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class RecordChange(Base):
+    """Append-only log of record writes, polled by every worker to invalidate
+    its record cache. A NULL record_id marks a change to all records of a type."""
+    __tablename__ = "record_changes"
+
+    id = Column(Integer, primary_key=True)
+    record_type = Column(String(50), nullable=False)
+    record_id = Column(Integer)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
 class ServiceAccount(Base):
     __tablename__ = "service_accounts"
 
@@ -342,3 +457,7 @@ class WarrantyExtension(Base):
     # Relationships
     service_account = relationship("ServiceAccount")
     owner = relationship("User")
+
+
+# Registers the flush listeners that keep the denormalized columns in sync
+from . import denormalize  # noqa: E402,F401
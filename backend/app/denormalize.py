@@ -0,0 +1,160 @@
+"""
+Denormalized display columns on record tables.
+
+owner_alias, account_name and contact_name are copied onto accounts, contacts,
+leads, opportunities and cases so list views can be served from a single
+table. They are set whenever a record is inserted or its foreign key changes,
+and renames of users, accounts and contacts are fanned out to the referencing
+rows with one batched UPDATE per table inside the same transaction. Deleting
+a user, account or contact clears the name on the rows that referenced it.
+Neither counts as an edit of those rows: updated_at and row_version stay.
+"""
+from sqlalchemy import event, inspect, select, update, bindparam, func
+from sqlalchemy.orm import Session, attributes
+
+from . import db_models as models
+from .record_cache import RECORD_TYPES, mark_changed
+from .user_directory import directory
+
+OWNER_MODELS = (models.Account, models.Contact, models.Lead, models.Opportunity, models.Case)
+ACCOUNT_MODELS = (models.Contact, models.Opportunity, models.Case)
+CONTACT_MODELS = (models.Case,)
+
+# (denormalized column, foreign key, relationship, source model, models carrying it)
+_LINKS = (
+    ("owner_alias", "owner_id", "owner", models.User, OWNER_MODELS),
+    ("account_name", "account_id", "account", models.Account, ACCOUNT_MODELS),
+    ("contact_name", "contact_id", "contact", models.Contact, CONTACT_MODELS),
+)
+
+# Source columns whose change requires a fan-out, and the value that is copied
+_SOURCES = {
+    models.User: (("first_name", "last_name", "username"), "owner_alias", "owner_id", lambda u: u.alias),
+    models.Account: (("name",), "account_name", "account_id", lambda a: a.name),
+    models.Contact: (("first_name", "last_name"), "contact_name", "contact_id", lambda c: c.full_name),
+}
+
+
+def _changed(obj, *keys) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[key].history.has_changes() for key in keys)
+
+
+def _display_value(source):
+    if source is None:
+        return None
+    return _SOURCES[type(source)][3](source)
+
+
+def _lookup(session: Session, obj, fk: str, rel: str, target):
+    # A relationship assigned directly wins; otherwise follow the foreign key,
+    # answering owners from the user directory and everything else from the
+    # session (normally an identity-map hit for the account being edited).
+    if inspect(obj).attrs[rel].history.has_changes():
+        return _display_value(getattr(obj, rel))
+    value = getattr(obj, fk)
+    if value is None:
+        return None
+    if target is models.User:
+        directory.poll(session)
+        alias = directory.alias(value)
+        if alias is not None:
+            return alias
+    return _display_value(session.get(target, value))
+
+
+def _update_carriers(session: Session, column: str, fk: str, rows) -> None:
+    """Set ``column`` to b_value on every row whose ``fk`` is b_id."""
+    carriers = next(link[4] for link in _LINKS if link[0] == column)
+    for model in carriers:
+        table = model.__table__
+        session.connection().execute(
+            update(table)
+            .where(table.c[fk] == bindparam("b_id"))
+            .values({column: bindparam("b_value"), "updated_at": table.c.updated_at, "row_version": table.c.row_version}),
+            rows
+        )
+        mark_changed(session, RECORD_TYPES[model])
+
+    # Keep rows already loaded in this session consistent with the database
+    values = {row["b_id"]: row["b_value"] for row in rows}
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, carriers) and getattr(obj, fk) in values:
+            attributes.set_committed_value(obj, column, values[getattr(obj, fk)])
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_denormalized_columns(session, flush_context, instances):
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty):
+            is_new = obj in session.new
+            for column, fk, rel, target, carriers in _LINKS:
+                if not isinstance(obj, carriers):
+                    continue
+                if is_new or _changed(obj, fk, rel):
+                    setattr(obj, column, _lookup(session, obj, fk, rel, target))
+
+        # The flush nulls the foreign keys pointing at deleted users, accounts
+        # and contacts; clear their names first, while the keys still match.
+        for source_model, (keys, column, fk, value_of) in _SOURCES.items():
+            deleted = [
+                {"b_id": obj.id, "b_value": None}
+                for obj in session.deleted
+                if isinstance(obj, source_model)
+            ]
+            if deleted:
+                _update_carriers(session, column, fk, deleted)
+
+
+@event.listens_for(Session, "after_flush")
+def _fan_out_renames(session, flush_context):
+    for source_model, (keys, column, fk, value_of) in _SOURCES.items():
+        renamed = [
+            {"b_id": obj.id, "b_value": value_of(obj)}
+            for obj in session.dirty
+            if isinstance(obj, source_model) and _changed(obj, *keys)
+        ]
+        if renamed:
+            _update_carriers(session, column, fk, renamed)
+
+
+def backfill(connection) -> None:
+    """Populate the denormalized columns for rows written before they existed.
+
+    updated_at and row_version are left untouched since the records themselves
+    did not change.
+    """
+    aliases = [
+        {"b_id": user.id, "b_value": user.alias}
+        for user in (models.User(**row._mapping) for row in connection.execute(
+            select(models.User.id, models.User.username, models.User.first_name, models.User.last_name)
+        ))
+    ]
+    for model in OWNER_MODELS:
+        table = model.__table__
+        if aliases:
+            connection.execute(
+                update(table)
+                .where(table.c.owner_id == bindparam("b_id"))
+                .values(owner_alias=bindparam("b_value"), updated_at=table.c.updated_at, row_version=table.c.row_version),
+                aliases
+            )
+
+    accounts = models.Account.__table__
+    for model in ACCOUNT_MODELS:
+        table = model.__table__
+        connection.execute(update(table).values(
+            account_name=select(accounts.c.name).where(accounts.c.id == table.c.account_id).scalar_subquery(),
+            updated_at=table.c.updated_at,
+            row_version=table.c.row_version
+        ))
+
+    contacts = models.Contact.__table__
+    full_name = func.trim(func.coalesce(contacts.c.first_name, "") + " " + func.coalesce(contacts.c.last_name, ""))
+    for model in CONTACT_MODELS:
+        table = model.__table__
+        connection.execute(update(table).values(
+            contact_name=select(full_name).where(contacts.c.id == table.c.contact_id).scalar_subquery(),
+            updated_at=table.c.updated_at,
+            row_version=table.c.row_version
+        ))
@@ -0,0 +1,51 @@
+"""
+Conditional GET support for record endpoints.
+
+Detail ETags are built by the record cache from the record's row_version,
+which every UPDATE bumps, and a checksum of the payload, which also covers
+the denormalized names that renames elsewhere rewrite. List ETags combine
+the per-type change counter in table_versions with the request's query
+parameters, so a matching If-None-Match is answered with 304 before the
+page query runs.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from .filters import Filter
+
+# Clients must revalidate, but may keep the body they already have
+CACHE_CONTROL = "private, no-cache"
+
+
+def list_etag(request: Request, record_type: str, version: int, filters: Optional[Filter] = None) -> str:
+    """ETag of a list page; ``version`` is the type's table_version.
+
+    A filter with relative dates adds its window, so "last 7 days" gets a new
+    ETag when the day rolls over even if nothing was written.
+    """
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    if filters is not None and filters.window:
+        query += f"#{filters.window}"
+    signature = hashlib.sha1(query.encode()).hexdigest()[:16]
+    return f'"{record_type}s-{version}-{signature}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match, as RFC 9110 requires for GET."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
@@ -0,0 +1,409 @@
+"""
+Filter expressions for the list endpoints.
+
+A filter is a JSON document passed as ``filter=``; leaves test one field and
+groups combine them:
+
+    {"and": [
+        {"field": "status", "op": "in", "value": ["New", "Contacted"]},
+        {"or": [
+            {"field": "score", "op": "gte", "value": 80},
+            {"field": "created_at", "op": "last_n_days", "value": 7}
+        ]}
+    ]}
+
+Fields are typed per record type and each type allows a fixed set of
+operators, so every expression compiles to an indexable comparison on a known
+column. Compilation only depends on the expression's shape (fields, operators
+and the group structure, not the values), so compiled clauses are cached by
+shape with every value bound as a parameter. A saved view, or the next page
+of the same list, reuses both this cache and SQLAlchemy's compiled statement
+cache.
+
+The list page's filter panel sends flat ``filter_<n>_field/op/value``
+parameters; these are translated into an AND of leaves.
+"""
+import json
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, bindparam, or_
+
+from . import db_models as models
+
+MAX_CONDITIONS = 20
+MAX_DEPTH = 4
+MAX_IN_VALUES = 100
+
+TEXT, INTEGER, NUMBER, DATE, BOOLEAN = "text", "integer", "number", "date", "boolean"
+
+_COMMON_OPS = {"eq", "ne", "in", "not_in", "is_null", "not_null"}
+_RANGE_OPS = {"gt", "gte", "lt", "lte", "between"}
+OPERATORS = {
+    TEXT: _COMMON_OPS | {"contains", "starts_with", "ends_with", "is_empty", "not_empty"},
+    INTEGER: _COMMON_OPS | _RANGE_OPS,
+    NUMBER: _COMMON_OPS | _RANGE_OPS,
+    DATE: {"is_null", "not_null", "on"} | _RANGE_OPS | {"last_n_days", "next_n_days", "this_month", "this_year"},
+    BOOLEAN: {"eq", "is_null", "not_null"},
+}
+# Operators without a value
+_UNARY_OPS = {"is_null", "not_null", "is_empty", "not_empty", "this_month", "this_year"}
+
+FILTER_FIELDS: Dict[str, Dict[str, Tuple[Any, str]]] = {
+    "account": {
+        "name": (models.Account.name, TEXT),
+        "industry": (models.Account.industry, TEXT),
+        "phone": (models.Account.phone, TEXT),
+        "website": (models.Account.website, TEXT),
+        "owner_id": (models.Account.owner_id, INTEGER),
+        "created_at": (models.Account.created_at, DATE),
+        "updated_at": (models.Account.updated_at, DATE),
+    },
+    "contact": {
+        "first_name": (models.Contact.first_name, TEXT),
+        "last_name": (models.Contact.last_name, TEXT),
+        "email": (models.Contact.email, TEXT),
+        "phone": (models.Contact.phone, TEXT),
+        "title": (models.Contact.title, TEXT),
+        "account_name": (models.Contact.account_name, TEXT),
+        "account_id": (models.Contact.account_id, INTEGER),
+        "owner_id": (models.Contact.owner_id, INTEGER),
+        "created_at": (models.Contact.created_at, DATE),
+        "updated_at": (models.Contact.updated_at, DATE),
+    },
+    "lead": {
+        "first_name": (models.Lead.first_name, TEXT),
+        "last_name": (models.Lead.last_name, TEXT),
+        "company": (models.Lead.company, TEXT),
+        "email": (models.Lead.email, TEXT),
+        "status": (models.Lead.status, TEXT),
+        "score": (models.Lead.score, INTEGER),
+        "region": (models.Lead.region, TEXT),
+        "source": (models.Lead.source, TEXT),
+        "owner_id": (models.Lead.owner_id, INTEGER),
+        "created_at": (models.Lead.created_at, DATE),
+        "updated_at": (models.Lead.updated_at, DATE),
+    },
+    "opportunity": {
+        "name": (models.Opportunity.name, TEXT),
+        "stage": (models.Opportunity.stage, TEXT),
+        "amount": (models.Opportunity.amount, NUMBER),
+        "probability": (models.Opportunity.probability, INTEGER),
+        "close_date": (models.Opportunity.close_date, DATE),
+        "account_name": (models.Opportunity.account_name, TEXT),
+        "account_id": (models.Opportunity.account_id, INTEGER),
+        "owner_id": (models.Opportunity.owner_id, INTEGER),
+        "created_at": (models.Opportunity.created_at, DATE),
+        "updated_at": (models.Opportunity.updated_at, DATE),
+    },
+    "case": {
+        "subject": (models.Case.subject, TEXT),
+        "case_number": (models.Case.case_number, TEXT),
+        "status": (models.Case.status, TEXT),
+        "priority": (models.Case.priority, TEXT),
+        "is_escalated": (models.Case.is_escalated, BOOLEAN),
+        "account_name": (models.Case.account_name, TEXT),
+        "account_id": (models.Case.account_id, INTEGER),
+        "contact_id": (models.Case.contact_id, INTEGER),
+        "owner_id": (models.Case.owner_id, INTEGER),
+        "sla_due_date": (models.Case.sla_due_date, DATE),
+        "created_at": (models.Case.created_at, DATE),
+        "updated_at": (models.Case.updated_at, DATE),
+    },
+}
+
+# filter_<n>_op values sent by FilterPanel.jsx
+_PANEL_OPS = {
+    "equals": "eq",
+    "not_equals": "ne",
+    "greater_than": "gt",
+    "less_than": "lt",
+    "before": "lt",
+    "after": "gt",
+    "is_empty": "is_empty",
+    "is_not_empty": "not_empty",
+    "contains": "contains",
+    "starts_with": "starts_with",
+    "ends_with": "ends_with",
+    "between": "between",
+    "this_month": "this_month",
+    "this_year": "this_year",
+}
+_PANEL_FIELDS = {"amount_min": ("amount", "gte"), "amount_max": ("amount", "lte")}
+
+
+class Filter:
+    """A compiled filter: a clause with bind parameters and their values.
+
+    ``window`` names the day, month or year that relative date operators were
+    resolved against (None without them); a cached answer for the same
+    expression is only valid within it.
+    """
+    __slots__ = ("clause", "params", "window")
+
+    def __init__(self, clause, params: Dict[str, Any], window: Optional[str] = None):
+        self.clause = clause
+        self.params = params
+        self.window = window
+
+    def apply(self, query):
+        return query.filter(self.clause).params(**self.params)
+
+
+def _shape(record_type: str, expr, depth: int = 0, counter: Optional[List[int]] = None):
+    """Validate an expression and reduce it to a hashable shape without values."""
+    counter = counter if counter is not None else [0]
+    if depth > MAX_DEPTH:
+        raise ValueError(f"Filter nests deeper than {MAX_DEPTH} levels")
+    if not isinstance(expr, dict):
+        raise ValueError("Filter expressions must be objects")
+
+    groups = [key for key in ("and", "or") if key in expr]
+    if groups:
+        if len(expr) != 1:
+            raise ValueError("A group takes a single 'and' or 'or' key")
+        children = expr[groups[0]]
+        if not isinstance(children, list) or not children:
+            raise ValueError(f"'{groups[0]}' takes a non-empty list")
+        return (groups[0], tuple(_shape(record_type, child, depth + 1, counter) for child in children))
+
+    counter[0] += 1
+    if counter[0] > MAX_CONDITIONS:
+        raise ValueError(f"Filters are limited to {MAX_CONDITIONS} conditions")
+
+    fields = FILTER_FIELDS[record_type]
+    field, op = expr.get("field"), expr.get("op")
+    if not isinstance(field, str) or not isinstance(op, str):
+        raise ValueError("A condition takes a 'field' and an 'op' string")
+    if field not in fields:
+        raise ValueError(f"Cannot filter on '{field}'. Must be one of: {list(fields)}")
+    field_type = fields[field][1]
+    if op not in OPERATORS[field_type]:
+        raise ValueError(f"Operator '{op}' does not apply to {field_type} field '{field}'. Must be one of: {sorted(OPERATORS[field_type])}")
+    if op not in _UNARY_OPS and "value" not in expr:
+        raise ValueError(f"Operator '{op}' on '{field}' needs a value")
+    return (field, op)
+
+
+@lru_cache(maxsize=512)
+def _compile(record_type: str, shape) -> Tuple[Any, Tuple[Tuple[str, str, str], ...]]:
+    """Clause for a shape, and the (parameter, field type, op) slots its values fill."""
+    slots = []
+
+    def param(field_type, op, expanding=False):
+        name = f"filter_{len(slots)}"
+        slots.append((name, field_type, op))
+        return bindparam(name, expanding=expanding)
+
+    def build(node):
+        if node[0] in ("and", "or"):
+            combine = and_ if node[0] == "and" else or_
+            return combine(*(build(child) for child in node[1]))
+
+        field, op = node
+        column, field_type = FILTER_FIELDS[record_type][field]
+        if op == "eq":
+            return column == param(field_type, op)
+        if op == "ne":
+            # SQL's <> drops NULLs, a filter on "not X" should keep them
+            return or_(column != param(field_type, op), column.is_(None))
+        if op == "in":
+            return column.in_(param(field_type, op, expanding=True))
+        if op == "not_in":
+            return or_(column.not_in(param(field_type, op, expanding=True)), column.is_(None))
+        if op == "is_null":
+            return column.is_(None)
+        if op == "not_null":
+            return column.is_not(None)
+        if op == "is_empty":
+            return or_(column.is_(None), column == "")
+        if op == "not_empty":
+            return and_(column.is_not(None), column != "")
+        if op in ("contains", "starts_with", "ends_with"):
+            return column.ilike(param(field_type, op), escape="\\")
+        if op == "gt":
+            return column > param(field_type, op)
+        if op == "gte":
+            return column >= param(field_type, op)
+        if op == "lt":
+            return column < param(field_type, op)
+        if op == "lte":
+            return column <= param(field_type, op)
+        if op == "between":
+            return column.between(param(field_type, "between_low"), param(field_type, "between_high"))
+        # Date windows: half-open [start, end) ranges so an index range scan serves them
+        if op in ("on", "this_month", "this_year", "next_n_days"):
+            return and_(column >= param(field_type, f"{op}_start"), column < param(field_type, f"{op}_end"))
+        if op == "last_n_days":
+            return column >= param(field_type, op)
+        raise ValueError(op)
+
+    return build(shape), tuple(slots)
+
+
+def _convert(field_type: str, value):
+    if value is None:
+        raise ValueError("Filter values cannot be null; use is_null")
+    try:
+        if field_type == INTEGER:
+            if isinstance(value, bool):
+                raise ValueError
+            return int(value)
+        if field_type == NUMBER:
+            if isinstance(value, bool):
+                raise ValueError
+            return float(value)
+        if field_type == BOOLEAN:
+            if isinstance(value, str):
+                if value.lower() not in ("true", "false"):
+                    raise ValueError
+                return value.lower() == "true"
+            if not isinstance(value, bool):
+                raise ValueError
+            return value
+        if field_type == DATE:
+            if isinstance(value, (int, float)):
+                raise ValueError
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+        if isinstance(value, (dict, list)):
+            raise ValueError
+        return str(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field_type} value: {value!r}")
+
+
+def _day(value) -> datetime:
+    moment = _convert(DATE, value)
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def _leaves(expr):
+    if "and" in expr or "or" in expr:
+        for child in next(iter(expr.values())):
+            yield from _leaves(child)
+    else:
+        yield expr
+
+
+def _bind(record_type: str, expr, slots, now: datetime) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Values for the slots of a compiled shape, in leaf order, and their window.
+
+    Relative dates resolve against whole days, months or years rather than
+    the current instant, so the values (and the count cache key built from
+    them) stay the same until the window rolls over.
+    """
+    params = {}
+    windows = set()
+    slots = iter(slots)
+    today = datetime(now.year, now.month, now.day)
+
+    for leaf in _leaves(expr):
+        value = leaf.get("value")
+        field_type = FILTER_FIELDS[record_type][leaf["field"]][1]
+        op = leaf["op"]
+        if op in ("is_null", "not_null", "is_empty", "not_empty"):
+            continue
+        if op in ("in", "not_in"):
+            if not isinstance(value, list) or not value or len(value) > MAX_IN_VALUES:
+                raise ValueError(f"'{op}' takes a list of 1 to {MAX_IN_VALUES} values")
+            params[next(slots)[0]] = [_convert(field_type, v) for v in value]
+        elif op == "between":
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError("'between' takes a [low, high] pair")
+            params[next(slots)[0]] = _convert(field_type, value[0])
+            params[next(slots)[0]] = _convert(field_type, value[1])
+        elif op in ("contains", "starts_with", "ends_with"):
+            text = _convert(field_type, value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            pattern = {"contains": f"%{text}%", "starts_with": f"{text}%", "ends_with": f"%{text}"}[op]
+            params[next(slots)[0]] = pattern
+        elif op == "on":
+            start = _day(value)
+            params[next(slots)[0]] = start
+            params[next(slots)[0]] = start + timedelta(days=1)
+        elif op == "this_month":
+            windows.add(f"{today:%Y-%m}")
+            start = datetime(today.year, today.month, 1)
+            params[next(slots)[0]] = start
+            params[next(slots)[0]] = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+        elif op == "this_year":
+            windows.add(f"{today:%Y}")
+            params[next(slots)[0]] = datetime(today.year, 1, 1)
+            params[next(slots)[0]] = datetime(today.year + 1, 1, 1)
+        elif op in ("last_n_days", "next_n_days"):
+            days = _convert(INTEGER, value)
+            if not 0 < days <= 3660:
+                raise ValueError(f"'{op}' takes a number of days between 1 and 3660")
+            windows.add(f"{today:%Y-%m-%d}")
+            if op == "last_n_days":
+                params[next(slots)[0]] = today - timedelta(days=days)
+            else:
+                params[next(slots)[0]] = today
+                params[next(slots)[0]] = today + timedelta(days=days + 1)
+        else:
+            params[next(slots)[0]] = _convert(field_type, value)
+    return params, ",".join(sorted(windows)) or None
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def compile_filter(record_type: str, expr, now: Optional[datetime] = None) -> Filter:
+    """Validate and compile an expression; ValueError when it is invalid."""
+    shape = _shape(record_type, expr)
+    clause, slots = _compile(record_type, shape)
+    params, window = _bind(record_type, expr, slots, now or _now())
+    return Filter(clause, params, window)
+
+
+def panel_filter(query_params) -> Optional[dict]:
+    """AND of the filter_<n>_field/op/value parameters sent by the filter panel."""
+    leaves = []
+    indexes = sorted({
+        int(key.split("_")[1]) for key in query_params
+        if key.startswith("filter_") and key.endswith("_field") and key.split("_")[1].isdigit()
+    })
+    for index in indexes:
+        field = query_params.get(f"filter_{index}_field")
+        op = query_params.get(f"filter_{index}_op", "equals")
+        value = query_params.get(f"filter_{index}_value")
+        if field in _PANEL_FIELDS:
+            field, op = _PANEL_FIELDS[field]
+        elif op in ("last_7_days", "last_30_days"):
+            op, value = "last_n_days", int(op.split("_")[1])
+        elif op == "equals" and field in ("created_at", "updated_at", "close_date", "sla_due_date"):
+            op = "on"
+        elif op == "after":
+            # After a day means from the next day on
+            op, value = "gte", (_day(value) + timedelta(days=1)).isoformat() if value else value
+        else:
+            op = _PANEL_OPS.get(op, op)
+        if op == "between" and isinstance(value, str):
+            value = [part.strip() for part in value.split(",")]
+        leaf = {"field": field, "op": op}
+        if op not in _UNARY_OPS:
+            leaf["value"] = value
+        leaves.append(leaf)
+    return {"and": leaves} if leaves else None
+
+
+def parse_filter(record_type: str, raw: Optional[str], query_params) -> Optional[Filter]:
+    """The request's filter, from ``filter=`` JSON and/or panel parameters; 400 when invalid."""
+    expressions = []
+    try:
+        if raw:
+            try:
+                expressions.append(json.loads(raw))
+            except ValueError:
+                raise ValueError("filter must be a JSON expression")
+        panel = panel_filter(query_params)
+        if panel:
+            expressions.append(panel)
+        if not expressions:
+            return None
+        expr = expressions[0] if len(expressions) == 1 else {"and": expressions}
+        return compile_filter(record_type, expr)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
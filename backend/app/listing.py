@@ -0,0 +1,208 @@
+"""
+List queries for the record list endpoints.
+
+Each record type is described by a ListSpec: the columns a search term is
+matched against, the equality filters its endpoint exposes, criteria every
+list applies (leads hide converted ones) and loader options. One engine builds
+the page and count statements from the spec, so projections (fields=), filter
+expressions (filters.py), index-backed sorts (sorting.py) and count caching
+behave the same for every object.
+
+Statements are cached by shape: the record type, which optional criteria are
+present, the compiled filter clause, the projected fields and the sort. Every
+value is a bound parameter, so the cached statement also hits SQLAlchemy's
+compiled cache.
+
+Counts are the expensive half of a page: they scan every matching row while
+the page query stops at LIMIT. When the caller passes the type's
+table_versions counter (the list routes read it for their ETags anyway), the
+total is cached under that version and reused for every page of the list
+until the next write to the type.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, or_, select
+from sqlalchemy.orm import Session, load_only
+
+from . import db_models as models
+from .filters import Filter
+from .sorting import sort_clauses
+
+
+@dataclass(frozen=True)
+class ListSpec:
+    model: Any
+    search_columns: Tuple = ()
+    equality_filters: Dict[str, Any] = field(default_factory=dict)
+    criteria: Tuple = ()
+    options: Tuple = ()
+
+
+LIST_SPECS: Dict[str, ListSpec] = {
+    "account": ListSpec(
+        models.Account,
+        search_columns=(models.Account.name, models.Account.phone),
+        equality_filters={"owner_id": models.Account.owner_id},
+    ),
+    "contact": ListSpec(
+        models.Contact,
+        search_columns=(models.Contact.first_name, models.Contact.last_name, models.Contact.email, models.Contact.phone),
+        equality_filters={"owner_id": models.Contact.owner_id, "account_id": models.Contact.account_id},
+    ),
+    "lead": ListSpec(
+        models.Lead,
+        search_columns=(models.Lead.first_name, models.Lead.last_name, models.Lead.email, models.Lead.company, models.Lead.phone),
+        equality_filters={"owner_id": models.Lead.owner_id, "status": models.Lead.status},
+        # Converted leads live on as contacts and opportunities
+        criteria=(models.Lead.is_converted == False,),
+    ),
+    "opportunity": ListSpec(
+        models.Opportunity,
+        search_columns=(models.Opportunity.name,),
+        equality_filters={
+            "owner_id": models.Opportunity.owner_id,
+            "account_id": models.Opportunity.account_id,
+            "stage": models.Opportunity.stage,
+        },
+    ),
+    "case": ListSpec(
+        models.Case,
+        search_columns=(models.Case.case_number, models.Case.subject),
+        equality_filters={
+            "owner_id": models.Case.owner_id,
+            "account_id": models.Case.account_id,
+            "status": models.Case.status,
+            "priority": models.Case.priority,
+        },
+    ),
+}
+
+
+def load_options(model, fields: Optional[List[str]]) -> list:
+    """Loader options restricting a list query to the requested response fields."""
+    if fields is None:
+        return []
+
+    columns = [model.id]
+    for name in fields:
+        if name == "full_name":
+            columns += [model.first_name, model.last_name]
+        elif name in model.__table__.columns:
+            columns.append(getattr(model, name))
+    return [load_only(*columns)]
+
+
+@lru_cache(maxsize=512)
+def _statements(record_type: str, search: bool, equals: Tuple[str, ...], filter_clause,
+                fields: Optional[Tuple[str, ...]], sort_by: str, sort_order: str):
+    """(page, count) statements for a list shape; values are bound at execution."""
+    spec = LIST_SPECS[record_type]
+    criteria = list(spec.criteria)
+    if search:
+        criteria.append(or_(*(column.ilike(bindparam("search")) for column in spec.search_columns)))
+    for name in equals:
+        criteria.append(spec.equality_filters[name] == bindparam(f"eq_{name}"))
+    if filter_clause is not None:
+        criteria.append(filter_clause)
+
+    page = (
+        select(spec.model)
+        .options(*spec.options, *load_options(spec.model, list(fields) if fields is not None else None))
+        .where(*criteria)
+        .order_by(*sort_clauses(record_type, sort_by, sort_order))
+    )
+    count = select(func.count()).select_from(spec.model).where(*criteria)
+    return page, count
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class CountCache:
+    """Bounded LRU of list totals, each valid for one table version."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Tuple[int, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key: tuple, version: int) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, version: int, total: int) -> None:
+        with self._lock:
+            self._entries[key] = (version, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+count_cache = CountCache()
+
+
+def list_records(
+    db: Session,
+    record_type: str,
+    skip: int = 0,
+    limit: int = 25,
+    search: Optional[str] = None,
+    sort_by: str = "created_at",
+    sort_order: str = "desc",
+    fields: Optional[List[str]] = None,
+    filters: Optional[Filter] = None,
+    version: Optional[int] = None,
+    **equals
+) -> Tuple[list, int]:
+    """One page of a record list and the total number of matches.
+
+    ``equals`` takes the spec's equality filters; falsy values are ignored.
+    Pass ``version`` (the type's table version, read in the same transaction)
+    only from read-only requests: totals are cached under it, and a session
+    with uncommitted writes would cache a count no one else can see.
+    """
+    spec = LIST_SPECS[record_type]
+    unknown = set(equals) - set(spec.equality_filters)
+    if unknown:
+        raise TypeError(f"Unknown {record_type} list filters: {sorted(unknown)}")
+
+    active = tuple(sorted(name for name, value in equals.items() if value))
+    params: Dict[str, Any] = {f"eq_{name}": equals[name] for name in active}
+    if search:
+        params["search"] = f"%{search}%"
+    if filters is not None:
+        params.update(filters.params)
+
+    shape = (
+        record_type, bool(search), active, filters.clause if filters is not None else None,
+        tuple(fields) if fields is not None else None, sort_by, sort_order
+    )
+    page, count = _statements(*shape)
+
+    total = None
+    if version is not None:
+        count_key = shape[:4] + (tuple(sorted((k, _hashable(v)) for k, v in params.items())),)
+        total = count_cache.get(count_key, version)
+    if total is None:
+        total = db.execute(count, params).scalar_one()
+        if version is not None:
+            count_cache.put(count_key, version, total)
+
+    rows = db.execute(page.offset(skip).limit(limit), params).scalars().all()
+    return rows, total
@@ -38,7 +38,7 @@ def log_action(action_type, user=None, details=None, status='success', error=Non
         action_type: Type of action (e.g., 'API_REQUEST', 'LOGIN', 'CREATE_LEAD', 'CLICK')
         user: Username or user ID
         details: Additional details about the action
-        status: 'success' or 'error'
+        status: 'success', 'warning' or 'error'
         error: Error message if status is 'error'
     """
     message = f"ACTION: {action_type}"
@@ -56,5 +56,7 @@ def log_action(action_type, user=None, details=None, status='success', error=Non
     
     if status == 'error':
         logger.error(message)
+    elif status == 'warning':
+        logger.warning(message)
     else:
         logger.info(message)
@@ -1,13 +1,20 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import os
-import time
 
-from .database import engine, Base
-from .routes import auth, accounts, contacts, leads, opportunities, cases, dashboard, activities, logs, service
-from .logger import log_action
+from .database import engine, Base, SessionLocal, upgrade_schema
+from . import denormalize
+from .user_directory import directory
+from .write_queue import write_queue
+from .compression import CompressionMiddleware, PrecompressedStaticFiles, precompress_directory
+from .auth import require_admin
+from .db_models import User
+from .routes import auth, accounts, contacts, leads, opportunities, cases, dashboard, activities, logs, service, admin
+from .middleware import RequestLoggingMiddleware
+from .metrics import MetricsMiddleware, registry
+from .profiling import ProfilingMiddleware
 
 
 @asynccontextmanager
@@ -15,7 +22,20 @@ async def lifespan(app: FastAPI):
     # Create tables on startup
     os.makedirs("data", exist_ok=True)
     Base.metadata.create_all(bind=engine)
+    if upgrade_schema(engine):
+        with engine.begin() as conn:
+            denormalize.backfill(conn)
+
+    db = SessionLocal()
+    try:
+        directory.load(db)
+    finally:
+        db.close()
+
+    if os.path.exists("static"):
+        precompress_directory("static")
     yield
+    write_queue.stop()
 
 
 app = FastAPI(
@@ -25,53 +45,8 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    
-    # Get user from token if available
-    user = "anonymous"
-    if "authorization" in request.headers:
-        try:
-            from .auth import decode_token
-            token = request.headers["authorization"].replace("Bearer ", "")
-            payload = decode_token(token)
-            user = payload.get("sub", "unknown")
-        except:
-            user = "anonymous"
-    
-    # Log request
-    log_action(
-        action_type=f"API_REQUEST",
-        user=user,
-        details=f"{request.method} {request.url.path}",
-        status="pending"
-    )
-    
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        
-        # Log response
-        log_action(
-            action_type=f"API_RESPONSE",
-            user=user,
-            details=f"{request.method} {request.url.path} | Status: {response.status_code} | Time: {process_time:.2f}s",
-            status="success"
-        )
-        
-        return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        log_action(
-            action_type=f"API_ERROR",
-            user=user,
-            details=f"{request.method} {request.url.path}",
-            status="error",
-            error=str(e)
-        )
-        raise
+# Compress API responses
+app.add_middleware(CompressionMiddleware)
 
 # CORS configuration
 app.add_middleware(
@@ -82,6 +57,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admin-triggered cProfile of matching requests
+app.add_middleware(ProfilingMiddleware)
+
+# Per-route latency, status and DB metrics
+app.add_middleware(MetricsMiddleware)
+
+# Request logging and timing; added last so it wraps everything else
+app.add_middleware(RequestLoggingMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(accounts.router)
@@ -93,6 +77,7 @@ app.include_router(dashboard.router)
 app.include_router(activities.router)
 app.include_router(logs.router)
 app.include_router(service.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -105,6 +90,14 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics(current_user: User = Depends(require_admin)):
+    """Prometheus text exposition of the in-process metrics. Route names and
+    traffic are operational detail, so scrapes authenticate as an admin like
+    the other diagnostics endpoints."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # Mount static files for production (frontend build)
 if os.path.exists("static"):
-    app.mount("/", StaticFiles(directory="static", html=True), name="static")
+    app.mount("/", PrecompressedStaticFiles(directory="static", html=True), name="static")
@@ -0,0 +1,183 @@
+"""
+Memory introspection for admins.
+
+Wraps tracemalloc (off by default, since tracing slows every allocation) with
+numbered snapshots that can be compared, and inventories what stays in memory:
+open SQLAlchemy sessions and their identity maps, live service instances, the
+in-process caches and the connection pool.
+"""
+import gc
+import os
+import resource
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .database import engine, read_engine
+from .listing import count_cache
+from .metrics import registry
+from .profiling import profiler
+from .services import AssignmentService
+from .record_cache import record_cache
+from .slow_queries import slow_query_log
+from .user_directory import directory
+from .write_queue import write_queue
+
+MAX_SNAPSHOTS = 10
+
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _statistic(stat) -> dict:
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+    }
+
+
+def _diff_statistic(stat) -> dict:
+    return {**_statistic(stat), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+
+
+class MemoryTracker:
+    def __init__(self, max_snapshots: int = MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        self._snapshots: Dict[int, tuple] = {}
+        self._next_id = 1
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        """Stop tracing; traces and snapshots are discarded with it."""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def _take(self):
+        return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+    def snapshot(self) -> dict:
+        """Keep a snapshot for later diffs, dropping the oldest beyond the limit."""
+        if not self.tracing:
+            raise RuntimeError("tracemalloc is not tracing")
+        snapshot = self._take()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = (datetime.utcnow(), snapshot)
+            while len(self._snapshots) > self.max_snapshots:
+                del self._snapshots[min(self._snapshots)]
+        return {"id": snapshot_id, "traced_kb": round(sum(t.size for t in snapshot.traces) / 1024, 1)}
+
+    def snapshots(self) -> List[dict]:
+        with self._lock:
+            return [{"id": i, "taken_at": taken_at} for i, (taken_at, _) in sorted(self._snapshots.items())]
+
+    def top(self, limit: int = 20, group_by: str = "lineno") -> List[dict]:
+        if not self.tracing:
+            return []
+        return [_statistic(s) for s in self._take().statistics(group_by)[:limit]]
+
+    def diff(self, since: int, until: Optional[int] = None, limit: int = 20, group_by: str = "lineno") -> List[dict]:
+        """Largest growth between two kept snapshots (``until`` None: now)."""
+        with self._lock:
+            if since not in self._snapshots or (until is not None and until not in self._snapshots):
+                raise KeyError(until if since in self._snapshots else since)
+            old = self._snapshots[since][1]
+            new = self._snapshots[until][1] if until is not None else None
+        if new is None:
+            new = self._take()
+        return [_diff_statistic(s) for s in new.compare_to(old, group_by)[:limit]]
+
+
+tracker = MemoryTracker()
+
+
+def _rss_kb() -> Optional[int]:
+    # Current resident set size; Linux only
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return None
+
+
+def sessions_inventory(objects: list) -> dict:
+    """Live sessions and what their identity maps hold."""
+    sessions = [obj for obj in objects if isinstance(obj, Session)]
+    models = Counter(type(obj).__name__ for session in sessions for obj in session.identity_map.values())
+    return {
+        "open_sessions": len(sessions),
+        "identity_map_objects": sum(models.values()),
+        "by_model": dict(models.most_common()),
+    }
+
+
+def services_inventory(objects: list) -> dict:
+    """Service instances should die with their request; a growing count is a leak."""
+    assignment = [obj for obj in objects if isinstance(obj, AssignmentService)]
+    return {
+        "assignment_services": len(assignment),
+        "sales_pool_entries": sum(len(service._sales_pool) for service in assignment),
+    }
+
+
+def cache_sizes() -> dict:
+    return {
+        "record_cache": {"entries": len(record_cache), "maxsize": record_cache.maxsize},
+        "list_counts": {"entries": len(count_cache), "maxsize": count_cache.maxsize},
+        "user_directory": {"loaded": directory.loaded, "users": len(directory)},
+        "metrics": {
+            "latency_series": len(registry.latency),
+            "response_series": len(registry.responses),
+        },
+        "slow_queries": {"fingerprints": len(slow_query_log), "max": slow_query_log.max_fingerprints},
+        "profiling": {"active_sessions": len(profiler.active())},
+        "write_queue": write_queue.stats(),
+        "connection_pool": engine.pool.status(),
+        "read_connection_pool": read_engine.pool.status() if read_engine is not engine else None,
+    }
+
+
+def report(limit: int = 20) -> dict:
+    """Everything above in one payload.
+
+    Walks all objects tracked by the garbage collector, so it is meant for
+    occasional admin use only.
+    """
+    traced = tracemalloc.get_traced_memory() if tracker.tracing else (0, 0)
+    objects = gc.get_objects()
+    return {
+        "rss_kb": _rss_kb(),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "gc_objects": len(objects),
+        "tracemalloc": {
+            "tracing": tracker.tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracker.tracing else None,
+            "current_kb": round(traced[0] / 1024, 1),
+            "peak_kb": round(traced[1] / 1024, 1),
+            "snapshots": tracker.snapshots(),
+            "top": tracker.top(limit),
+        },
+        "sessions": sessions_inventory(objects),
+        "services": services_inventory(objects),
+        "caches": cache_sizes(),
+    }
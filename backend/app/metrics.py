@@ -0,0 +1,233 @@
+"""
+In-process request and database metrics in Prometheus text format.
+
+MetricsMiddleware times every request and files it under its route template
+(``/api/leads/{lead_id}``, not the concrete path), together with the response
+status and the number and duration of SQL statements it issued. Statements
+are attributed through a context variable set for the duration of the request;
+the same totals go back to the client in a Server-Timing header, and requests
+that exceed the query budget or repeat one statement shape many times (the
+usual sign of an N+1 lazy load) are logged.
+
+Recording never takes a lock: series are created with dict.setdefault and
+updated with plain increments, relying on the GIL. An increment lost to a
+thread switch is an acceptable price for keeping the hot path cheap.
+"""
+import os
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logger import log_action
+
+# Seconds; the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Statements per request before it is logged as over budget
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "25"))
+# Executions of one statement shape in a request that suggest an N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+_EXPANDED_IN = re.compile(r"\(\?(?:, \?)+\)")
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; made cumulative when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with expanded IN lists collapsed; parameters are already bound."""
+    return _EXPANDED_IN.sub("(?)", statement)
+
+
+class RequestStats:
+    """Per-request accumulator for the statements a request issues."""
+    __slots__ = ("scope", "queries", "db_time", "shapes")
+
+    def __init__(self, scope: Optional[Scope] = None):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes: Dict[str, int] = {}
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        if not self.shapes:
+            return None, 0
+        shape = max(self.shapes, key=self.shapes.get)
+        return shape, self.shapes[shape]
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+RouteKey = Tuple[str, str]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.latency: Dict[RouteKey, Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.db_queries: Dict[RouteKey, int] = {}
+        self.db_seconds: Dict[RouteKey, float] = {}
+        self.query_warnings: Dict[Tuple[str, str, str], int] = {}
+
+    def clear(self) -> None:
+        self.latency.clear()
+        self.responses.clear()
+        self.db_queries.clear()
+        self.db_seconds.clear()
+        self.query_warnings.clear()
+
+    def record(self, method: str, route: str, status: int, duration: float, stats: RequestStats) -> None:
+        key = (method, route)
+        histogram = self.latency.get(key) or self.latency.setdefault(key, Histogram())
+        histogram.observe(duration)
+        status_key = (method, route, status)
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+        self.db_queries[key] = self.db_queries.get(key, 0) + stats.queries
+        self.db_seconds[key] = self.db_seconds.get(key, 0.0) + stats.db_time
+
+    def record_query_warning(self, method: str, route: str, kind: str) -> None:
+        key = (method, route, kind)
+        self.query_warnings[key] = self.query_warnings.get(key, 0) + 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.latency.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP http_responses_total Responses by route template and status code.",
+            "# TYPE http_responses_total counter",
+        ]
+        for (method, route, status), count in sorted(self.responses.items()):
+            lines.append(f'http_responses_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+        for name, help_text, series in (
+            ("db_queries_total", "SQL statements issued by route template.", self.db_queries),
+            ("db_query_seconds_total", "Time spent executing SQL by route template.", self.db_seconds),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, route), value in sorted(series.items()):
+                lines.append(f'{name}{{method="{method}",route="{_escape(route)}"}} {value}')
+
+        lines += [
+            "# HELP db_query_warnings_total Requests over the query budget (budget) or repeating a statement (repeat).",
+            "# TYPE db_query_warnings_total counter",
+        ]
+        for (method, route, kind), count in sorted(self.query_warnings.items()):
+            lines.append(f'db_query_warnings_total{{method="{method}",route="{_escape(route)}",kind="{kind}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route's path template, so ids don't explode the series count."""
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or "<unmatched>"
+
+
+def server_timing(stats: RequestStats, elapsed: float) -> str:
+    return f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", app;dur={elapsed * 1000:.1f}'
+
+
+def check_query_pattern(method: str, route: str, stats: RequestStats) -> None:
+    """Log requests that issue too many statements or repeat one shape."""
+    request_line = f"{method} {route}"
+    if stats.queries > QUERY_BUDGET:
+        registry.record_query_warning(method, route, "budget")
+        log_action(
+            action_type="QUERY_BUDGET_EXCEEDED",
+            details=f"{request_line} | Queries: {stats.queries} | DB time: {stats.db_time:.3f}s",
+            status="warning"
+        )
+
+    shape, repeats = stats.most_repeated()
+    if repeats >= QUERY_REPEAT_THRESHOLD:
+        registry.record_query_warning(method, route, "repeat")
+        log_action(
+            action_type="N_PLUS_ONE_SUSPECTED",
+            details=f"{request_line} | Repeated {repeats} times: {' '.join(shape.split())[:200]}",
+            status="warning"
+        )
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, time.perf_counter() - start_time))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            method, route = scope["method"], route_template(scope)
+            registry.record(method, route, status_code, time.perf_counter() - start_time, stats)
+            check_query_pattern(method, route, stats)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - context._query_start
+        shape = statement_shape(statement)
+        stats.shapes[shape] = stats.shapes.get(shape, 0) + 1
@@ -0,0 +1,76 @@
+"""
+Request logging and timing as a pure ASGI middleware.
+
+Unlike a BaseHTTPMiddleware the response is never re-wrapped: messages are
+passed straight through, so streamed bodies stay streamed. The status and the
+time to the first response byte are taken from the http.response.start
+message.
+"""
+import time
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .auth import decode_token
+from .logger import log_action
+
+
+def request_user(headers: Headers) -> str:
+    """Username from the bearer token, for log lines only (not verified against the DB)."""
+    authorization = headers.get("authorization")
+    if not authorization:
+        return "anonymous"
+    payload = decode_token(authorization.replace("Bearer ", ""))
+    if payload is None:
+        return "anonymous"
+    return payload.get("username") or payload.get("sub", "unknown")
+
+
+class RequestLoggingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        user = request_user(Headers(scope=scope))
+        request_line = f"{scope['method']} {scope['path']}"
+
+        log_action(
+            action_type="API_REQUEST",
+            user=user,
+            details=request_line,
+            status="pending"
+        )
+
+        status_code = None
+        process_time = 0.0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, process_time
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = time.perf_counter() - start_time
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            log_action(
+                action_type="API_ERROR",
+                user=user,
+                details=request_line,
+                status="error",
+                error=str(e)
+            )
+            raise
+
+        log_action(
+            action_type="API_RESPONSE",
+            user=user,
+            details=f"{request_line} | Status: {status_code} | Time: {process_time:.2f}s",
+            status="success"
+        )
@@ -0,0 +1,262 @@
+"""
+On-demand request profiling.
+
+An admin starts a session for a path pattern and a number of requests. The
+session lives on disk under logs/profiles/<session id>/, so every worker picks
+it up (checked at most once per PROFILE_POLL_SECONDS) and claims request slots
+with exclusive file creation until the requested number has been profiled.
+Each profiled request is written as a cProfile .prof file, and summaries merge
+all files of a session with pstats.
+
+Sessions still collecting also have an empty marker under
+logs/profiles/active/, and the request path reads only those. A marker is
+removed when its session is stopped or its last slot is claimed, and starting
+a session sweeps any that were left behind.
+
+cProfile hooks the event loop thread, so coroutines of other requests that run
+while a profiled request awaits are included in its profile, and work that a
+sync endpoint hands to the threadpool is not. One request per worker is
+profiled at a time.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import secrets
+import time
+from datetime import datetime
+from fnmatch import fnmatchcase
+from typing import List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .logger import LOG_DIR
+
+PROFILE_DIR = os.path.join(LOG_DIR, "profiles")
+ACTIVE_DIR = "active"
+PROFILE_POLL_SECONDS = 1.0
+MAX_PROFILED_REQUESTS = 100
+
+SESSION_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$")
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+
+class ProfileSession:
+    def __init__(self, session_id: str, pattern: str, count: int, method: Optional[str] = None,
+                 created_at: Optional[str] = None, stopped: bool = False):
+        self.id = session_id
+        self.pattern = pattern
+        self.count = count
+        self.method = method
+        self.created_at = created_at
+        self.stopped = stopped
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and fnmatchcase(path, self.pattern)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "pattern": self.pattern,
+            "method": self.method,
+            "count": self.count,
+            "created_at": self.created_at,
+            "stopped": self.stopped,
+        }
+
+
+class Profiler:
+    def __init__(self, directory: str = PROFILE_DIR, poll_interval: float = PROFILE_POLL_SECONDS):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._active: List[ProfileSession] = []
+        self._exhausted = set()
+        self._last_poll = 0.0
+        self.busy = False
+
+    def _session_dir(self, session_id: str) -> str:
+        if not SESSION_ID.match(session_id):
+            raise KeyError(session_id)
+        return os.path.join(self.directory, session_id)
+
+    def _marker(self, session_id: str) -> str:
+        return os.path.join(self.directory, ACTIVE_DIR, session_id)
+
+    def _retire(self, session_id: str) -> None:
+        try:
+            os.remove(self._marker(session_id))
+        except FileNotFoundError:
+            pass
+
+    def _prune(self) -> None:
+        """Drop the markers of sessions that are stopped, full or gone."""
+        try:
+            marked = os.listdir(os.path.join(self.directory, ACTIVE_DIR))
+        except FileNotFoundError:
+            return
+        for session_id in marked:
+            try:
+                session = self._load(session_id)
+                claimed = sum(name.endswith(".claim") for name in os.listdir(self._session_dir(session_id)))
+            except (KeyError, OSError):
+                self._retire(session_id)
+                continue
+            if session.stopped or claimed >= session.count:
+                self._retire(session_id)
+
+    def _load(self, session_id: str) -> ProfileSession:
+        try:
+            with open(os.path.join(self._session_dir(session_id), "session.json")) as f:
+                return ProfileSession(session_id, **json.load(f))
+        except (OSError, ValueError):
+            raise KeyError(session_id)
+
+    def _save(self, session: ProfileSession) -> None:
+        data = session.to_dict()
+        del data["id"]
+        path = os.path.join(self._session_dir(session.id), "session.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    def start(self, pattern: str, count: int, method: Optional[str] = None) -> ProfileSession:
+        session = ProfileSession(
+            f"{datetime.utcnow():%Y%m%d-%H%M%S}-{secrets.token_hex(3)}",
+            pattern,
+            count,
+            method.upper() if method else None,
+            datetime.utcnow().isoformat()
+        )
+        os.makedirs(self._session_dir(session.id))
+        self._save(session)
+        self._prune()
+        os.makedirs(os.path.join(self.directory, ACTIVE_DIR), exist_ok=True)
+        open(self._marker(session.id), "w").close()
+        self._last_poll = 0.0
+        return session
+
+    def stop(self, session_id: str) -> ProfileSession:
+        session = self._load(session_id)
+        session.stopped = True
+        self._save(session)
+        self._retire(session_id)
+        self._last_poll = 0.0
+        return session
+
+    def _profiles(self, session_id: str) -> List[str]:
+        directory = self._session_dir(session_id)
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".prof")
+        )
+
+    def sessions(self) -> List[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        result = []
+        for session_id in sorted(os.listdir(self.directory), reverse=True):
+            try:
+                session = self._load(session_id)
+            except KeyError:
+                continue
+            result.append({**session.to_dict(), "captured": len(self._profiles(session_id))})
+        return result
+
+    def active(self) -> List[ProfileSession]:
+        """Sessions still collecting, re-read from their markers at most once
+        per poll interval."""
+        now = time.monotonic()
+        if now - self._last_poll >= self.poll_interval:
+            self._last_poll = now
+            try:
+                marked = sorted(os.listdir(os.path.join(self.directory, ACTIVE_DIR)), reverse=True)
+            except FileNotFoundError:
+                marked = []
+            active = []
+            for session_id in marked:
+                if session_id in self._exhausted:
+                    continue
+                try:
+                    session = self._load(session_id)
+                except KeyError:
+                    continue
+                if not session.stopped:
+                    active.append(session)
+            self._active = active
+        return self._active
+
+    def claim(self, method: str, path: str) -> Optional[Tuple[ProfileSession, str]]:
+        """Reserve the next free request slot of a matching session.
+
+        Returns the session and the .prof path to write, or None.
+        """
+        for session in self.active():
+            if session.id in self._exhausted or not session.matches(method, path):
+                continue
+            directory = self._session_dir(session.id)
+            for slot in range(session.count):
+                try:
+                    fd = os.open(os.path.join(directory, f"{slot:03d}.claim"), os.O_CREAT | os.O_EXCL)
+                except FileExistsError:
+                    continue
+                except FileNotFoundError:
+                    break
+                os.close(fd)
+                slug = re.sub(r"[^\w]+", "_", path).strip("_") or "root"
+                return session, os.path.join(directory, f"{slot:03d}-{method}-{slug}.prof")
+            self._exhausted.add(session.id)
+            self._retire(session.id)
+        return None
+
+    def summary(self, session_id: str, sort: str = "cumulative", limit: int = 30) -> dict:
+        """Hot functions across all profiled requests of a session."""
+        session = self._load(session_id)
+        files = self._profiles(session_id)
+        result = {**session.to_dict(), "captured": len(files), "sort": sort, "functions": []}
+        if not files:
+            return result
+
+        stats = pstats.Stats(*files)
+        stats.sort_stats(sort)
+        result["total_time"] = round(stats.total_tt, 6)
+        for func in stats.fcn_list[:limit]:
+            primitive_calls, calls, tottime, cumtime, _ = stats.stats[func]
+            filename, line, name = func
+            result["functions"].append({
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "file": filename,
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6),
+            })
+        return result
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or profiler.busy or not profiler.active():
+            await self.app(scope, receive, send)
+            return
+
+        claim = profiler.claim(scope["method"], scope["path"])
+        if claim is None:
+            await self.app(scope, receive, send)
+            return
+
+        _, output = claim
+        profile = cProfile.Profile()
+        profiler.busy = True
+        profile.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.disable()
+            profiler.busy = False
+            profile.dump_stats(output)
@@ -0,0 +1,246 @@
+"""
+Read-through cache of serialized record detail payloads.
+
+Detail GETs for accounts, contacts, leads, opportunities and cases are served
+from a bounded per-process LRU keyed by (type, id) and tagged with the version
+the worker knew when the payload was built. Every flush that modifies or
+deletes a record appends to the record_changes table in the same transaction
+and evicts the local entry on commit; other workers pick the change up by
+polling that table (an indexed range scan on its primary key) at most once per
+RECORD_CACHE_POLL_SECONDS.
+
+The same writes bump a per-type counter in table_versions, which list
+endpoints use for their ETags.
+"""
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import db_models as models
+from .responses import dumps
+
+RECORD_TYPES = {
+    models.Account: "account",
+    models.Contact: "contact",
+    models.Lead: "lead",
+    models.Opportunity: "opportunity",
+    models.Case: "case",
+}
+
+# Change log rows older than this are pruned; a worker that has not polled for
+# half of it may have missed pruned rows and starts over with an empty cache.
+CHANGE_RETENTION = timedelta(minutes=10)
+
+
+class CachedRecord(NamedTuple):
+    version: Tuple[int, int]
+    body: bytes
+    name: str
+    etag: str
+
+
+class RecordCache:
+    """Bounded LRU of record payloads with change-log based invalidation."""
+
+    def __init__(self, maxsize: int = 2048, poll_interval: float = 1.0):
+        self.maxsize = maxsize
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int], CachedRecord]" = OrderedDict()
+        self._versions = {}
+        self._type_generations = {}
+        self._local_writes = 0
+        self._last_seq: Optional[int] = None
+        self._last_poll = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._type_generations.clear()
+            self._last_seq = None
+
+    def _version(self, key: Tuple[str, int]) -> Tuple[int, int]:
+        return (self._type_generations.get(key[0], 0), self._versions.get(key, 0))
+
+    def get_or_load(
+        self,
+        db: Session,
+        record_type: str,
+        record_id: int,
+        load: Callable[[], Optional[Tuple[object, str, int]]]
+    ) -> Optional[CachedRecord]:
+        """Return the cached payload, or build it with ``load``.
+
+        ``load`` returns (response model, record name, row version) or None if
+        the record does not exist. The version is captured before loading so a change
+        committed meanwhile is never hidden behind the freshly built entry.
+        """
+        self.poll(db)
+        key = (record_type, record_id)
+        with self._lock:
+            version = self._version(key)
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                return entry
+
+        loaded = load()
+        if loaded is None:
+            return None
+        response, name, row_version = loaded
+        body = dumps(response)
+        # Renames fanned out by denormalize.py change the payload but not row_version
+        etag = f'"{record_type}-{record_id}-{row_version}-{zlib.crc32(body):08x}"'
+        entry = CachedRecord(version, body, name, etag)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def evict(self, record_type: str, record_id: Optional[int]) -> None:
+        """Drop local entries for a committed write (record_id None: whole type)."""
+        with self._lock:
+            self._local_writes += 1
+            # Local versions are negative so they never collide with the
+            # change-log ids another poll will bring in.
+            if record_id is None:
+                self._type_generations[record_type] = -self._local_writes
+                for key in [k for k in self._entries if k[0] == record_type]:
+                    del self._entries[key]
+            else:
+                self._versions[(record_type, record_id)] = -self._local_writes
+                self._entries.pop((record_type, record_id), None)
+
+    def poll(self, db: Session) -> None:
+        """Apply record changes committed by any worker since the last poll."""
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return
+
+        changes = models.RecordChange.__table__
+        if self._last_seq is None or now - self._last_poll > CHANGE_RETENTION.total_seconds() / 2:
+            # First poll, or rows we never saw may have been pruned since
+            self.clear()
+            last_seq = db.execute(select(func.max(changes.c.id))).scalar() or 0
+            rows = []
+        else:
+            last_seq = self._last_seq
+            rows = db.execute(
+                select(changes.c.id, changes.c.record_type, changes.c.record_id)
+                .where(changes.c.id > last_seq)
+                .order_by(changes.c.id)
+            ).all()
+
+        with self._lock:
+            for seq, record_type, record_id in rows:
+                if record_id is None:
+                    self._type_generations[record_type] = seq
+                    for key in [k for k in self._entries if k[0] == record_type]:
+                        del self._entries[key]
+                else:
+                    self._versions[(record_type, record_id)] = seq
+                    self._entries.pop((record_type, record_id), None)
+                last_seq = seq
+            self._last_seq = last_seq
+            self._last_poll = now
+
+
+record_cache = RecordCache(
+    maxsize=int(os.getenv("RECORD_CACHE_SIZE", "2048")),
+    poll_interval=float(os.getenv("RECORD_CACHE_POLL_SECONDS", "1.0"))
+)
+
+
+_last_prune = 0.0
+
+
+def table_version(db: Session, record_type: str) -> int:
+    """Number of committed transactions that wrote records of this type."""
+    versions = models.TableVersion.__table__
+    return db.execute(
+        select(versions.c.version).where(versions.c.record_type == record_type)
+    ).scalar() or 0
+
+
+def bump_table_version(session: Session, record_type: str) -> None:
+    """Increment the type's change counter, once per transaction."""
+    bumped = session.info.setdefault("table_versions", set())
+    if record_type in bumped:
+        return
+    bumped.add(record_type)
+
+    versions = models.TableVersion.__table__
+    connection = session.connection()
+    result = connection.execute(
+        update(versions)
+        .where(versions.c.record_type == record_type)
+        .values(version=versions.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(versions).values(record_type=record_type, version=1))
+
+
+def mark_changed(session: Session, record_type: str, record_id: Optional[int] = None) -> None:
+    """Log a record write in the current transaction; evicted locally on commit.
+
+    Used directly for bulk Core updates (record_id None) that bypass the flush
+    tracking below.
+    """
+    global _last_prune
+    pending = session.info.setdefault("record_changes", set())
+    if (record_type, record_id) in pending:
+        return
+    pending.add((record_type, record_id))
+    bump_table_version(session, record_type)
+
+    changes = models.RecordChange.__table__
+    connection = session.connection()
+    connection.execute(insert(changes), [{"record_type": record_type, "record_id": record_id}])
+
+    # Writers already hold the write lock, so they also keep the log short
+    now = time.monotonic()
+    if now - _last_prune > 60:
+        _last_prune = now
+        connection.execute(delete(changes).where(changes.c.changed_at < datetime.utcnow() - CHANGE_RETENTION))
+
+
+@event.listens_for(Session, "after_flush")
+def _log_record_changes(session, flush_context):
+    for obj in session.new:
+        record_type = RECORD_TYPES.get(type(obj))
+        if record_type is not None:
+            bump_table_version(session, record_type)
+    for obj in chain(session.dirty, session.deleted):
+        record_type = RECORD_TYPES.get(type(obj))
+        if record_type is None:
+            continue
+        if obj in session.deleted or session.is_modified(obj, include_collections=False):
+            mark_changed(session, record_type, obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed(session):
+    session.info.pop("table_versions", None)
+    for record_type, record_id in session.info.pop("record_changes", ()):
+        record_cache.evict(record_type, record_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("table_versions", None)
+    session.info.pop("record_changes", None)
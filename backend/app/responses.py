@@ -0,0 +1,80 @@
+from typing import Any, List, Optional
+import math
+
+import orjson
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from .schemas import PaginatedResponse
+
+
+def _default(obj: Any) -> Any:
+    # Response models built with model_construct are dumped without validation;
+    # orjson handles the datetimes, enums and nested dicts natively.
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Routes that return this directly skip FastAPI's response_model validation,
+    so the payload is validated at most once (usually never, for data read from
+    the database) and encoded in a single pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(fields: Optional[str], response_model) -> Optional[List[str]]:
+    """Parse a comma separated ``fields=`` sparse fieldset.
+
+    Returns None when no projection was requested. ``id`` is always included.
+    """
+    if not fields:
+        return None
+
+    selected = ["id"]
+    for field in (f.strip() for f in fields.split(",")):
+        if not field or field in selected:
+            continue
+        if field not in response_model.model_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown field '{field}'. Must be one of: {list(response_model.model_fields)}"
+            )
+        selected.append(field)
+    return selected
+
+
+def project(obj, fields: List[str]) -> dict:
+    """Serialize only the requested fields of a record loaded with load_only."""
+    return {field: getattr(obj, field) for field in fields}
+
+
+def raw_json(body: bytes, **kwargs) -> Response:
+    """Response for a payload that was serialized ahead of time."""
+    return Response(content=body, media_type="application/json", **kwargs)
+
+
+def paginate(page_model, items: list, total: int, page: int, page_size: int):
+    """Build a page of already constructed response items.
+
+    Sparse items (plain dicts from ``project``) go into the untyped page.
+    """
+    if items and not isinstance(items[0], BaseModel):
+        page_model = PaginatedResponse
+    return page_model.model_construct(
+        items=items,
+        total=total,
+        page=page,
+        page_size=page_size,
+        pages=math.ceil(total / page_size) if total > 0 else 0
+    )
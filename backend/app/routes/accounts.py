@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
-from typing import Optional
-import math
+from typing import Optional, List
+from functools import partial
 
-from ..database import get_db
+from ..database import client_key, get_db
 from ..auth import get_current_user
 from .. import schemas, crud
 from ..db_models import User
+from ..responses import ORJSONResponse, paginate, parse_fields, project, raw_json
+from ..record_cache import record_cache, table_version
+from ..etags import cache_headers, etag_matches, list_etag, not_modified
+from ..filters import parse_filter
+from ..sorting import parse_sort
+from ..write_queue import write_queue
 
 router = APIRouter(prefix="/api/accounts", tags=["accounts"])
 
 
-def account_to_response(account) -> schemas.AccountResponse:
-    return schemas.AccountResponse(
+def account_to_response(account, fields: Optional[List[str]] = None):
+    if fields is not None:
+        return project(account, fields)
+    return schemas.AccountResponse.model_construct(
         id=account.id,
         name=account.name,
         phone=account.phone,
@@ -23,21 +31,32 @@ def account_to_response(account) -> schemas.AccountResponse:
         owner_id=account.owner_id,
         created_at=account.created_at,
         updated_at=account.updated_at,
-        owner_alias=account.owner.alias if account.owner else None
+        owner_alias=account.owner_alias
     )
 
 
-@router.get("", response_model=schemas.PaginatedResponse)
+@router.get("", response_model=schemas.AccountPage)
 async def list_accounts(
+    request: Request,
     q: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
     owner_id: Optional[int] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma separated response fields; items then carry only these and id"),
+    filter_expression: Optional[str] = Query(None, alias="filter", description="JSON filter expression, see filters.py"),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
+    selected = parse_fields(fields, schemas.AccountResponse)
+    parse_sort("account", sort_by, sort_order)
+    filters = parse_filter("account", filter_expression, request.query_params)
+    version = table_version(db, "account")
+    etag = list_etag(request, "account", version, filters)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     skip = (page - 1) * page_size
     accounts, total = crud.get_accounts(
         db,
@@ -46,74 +65,84 @@ async def list_accounts(
         search=q,
         owner_id=owner_id,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        fields=selected,
+        filters=filters,
+        version=version
     )
 
-    return schemas.PaginatedResponse(
-        items=[account_to_response(a) for a in accounts],
-        total=total,
-        page=page,
-        page_size=page_size,
-        pages=math.ceil(total / page_size) if total > 0 else 0
+    items = [account_to_response(a, selected) for a in accounts]
+    return ORJSONResponse(
+        paginate(schemas.AccountPage, items, total, page, page_size),
+        headers=cache_headers(etag)
     )
 
 
 @router.get("/{account_id}", response_model=schemas.AccountResponse)
 async def get_account(
     account_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
-    account = crud.get_account(db, account_id)
-    if not account:
+    def load():
+        account = crud.get_account(db, account_id)
+        return (account_to_response(account), account.name, account.row_version) if account else None
+
+    entry = record_cache.get_or_load(db, "account", account_id, load)
+    if entry is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Account not found"
         )
 
     # Track recent record
-    crud.add_recent_record(db, current_user.id, "account", account.id, account.name)
+    write_queue.defer(partial(
+        crud.track_recent_record, user_id=current_user.id, record_type="account", record_id=account_id, record_name=entry.name
+    ))
 
-    return account_to_response(account)
+    if etag_matches(request, entry.etag):
+        return not_modified(entry.etag)
+    return raw_json(entry.body, headers=cache_headers(entry.etag))
 
 
 @router.post("", response_model=schemas.AccountResponse, status_code=status.HTTP_201_CREATED)
 async def create_account(
     account: schemas.AccountCreate,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     # Set owner to current user if not specified
     if not account.owner_id:
         account.owner_id = current_user.id
 
-    db_account = crud.create_account(db, account)
-    return account_to_response(crud.get_account(db, db_account.id))
+    db_account = await write_queue.run(partial(crud.create_account, account=account, commit=False), client_key(request))
+    return ORJSONResponse(account_to_response(db_account), status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{account_id}", response_model=schemas.AccountResponse)
 async def update_account(
     account_id: int,
     account: schemas.AccountUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    db_account = crud.update_account(db, account_id, account)
+    db_account = await write_queue.run(partial(crud.update_account, account_id=account_id, account=account, commit=False), client_key(request))
     if not db_account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Account not found"
         )
-    return account_to_response(crud.get_account(db, account_id))
+    return ORJSONResponse(account_to_response(db_account))
 
 
 @router.delete("/{account_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_account(
     account_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    success = crud.delete_account(db, account_id)
+    success = await write_queue.run(partial(crud.delete_account, account_id=account_id, commit=False), client_key(request))
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -125,13 +154,13 @@ async def delete_account(
 async def change_account_owner(
     account_id: int,
     owner_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    account = crud.update_account(db, account_id, schemas.AccountUpdate(owner_id=owner_id))
+    account = await write_queue.run(partial(crud.update_account, account_id=account_id, account=schemas.AccountUpdate(owner_id=owner_id), commit=False), client_key(request))
     if not account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Account not found"
         )
-    return account_to_response(crud.get_account(db, account_id))
+    return ORJSONResponse(account_to_response(account))
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from typing import List
+from functools import partial
 
-from ..database import get_db
+from ..database import client_key, get_db
 from ..auth import get_current_user
 from .. import schemas, crud
 from ..db_models import User
+from ..user_directory import directory
+from ..write_queue import write_queue
 
 router = APIRouter(prefix="/api/activities", tags=["activities"])
 
@@ -16,7 +19,7 @@ async def get_activities(
     record_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     valid_types = ["contact", "account", "lead", "opportunity", "case"]
@@ -38,7 +41,7 @@ async def get_activities(
             "details": a.details,
             "created_by": a.created_by,
             "created_at": a.created_at,
-            "created_by_name": a.created_by_user.full_name if a.created_by_user else None
+            "created_by_name": directory.full_name(db, a.created_by)
         }
         for a in activities
     ]
@@ -47,7 +50,7 @@ async def get_activities(
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_activity(
     activity: schemas.ActivityCreate,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     valid_types = ["contact", "account", "lead", "opportunity", "case"]
@@ -64,7 +67,9 @@ async def create_activity(
             detail=f"Invalid activity type. Must be one of: {valid_activity_types}"
         )
 
-    db_activity = crud.create_activity(db, activity, current_user.id)
+    db_activity = await write_queue.run(
+        partial(crud.create_activity, activity=activity, user_id=current_user.id, commit=False), client_key(request)
+    )
 
     return {
         "id": db_activity.id,
@@ -0,0 +1,150 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, Field
+from typing import Optional
+
+from ..auth import require_admin
+from ..db_models import User
+from ..logger import log_action
+from ..memory import report, tracker
+from ..profiling import MAX_PROFILED_REQUESTS, SORT_KEYS, profiler
+from ..slow_queries import slow_query_log
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+class ProfileStart(BaseModel):
+    pattern: str = Field(..., description="Request path glob, e.g. /api/leads*")
+    count: int = Field(5, ge=1, le=MAX_PROFILED_REQUESTS)
+    method: Optional[str] = None
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(current_user: User = Depends(require_admin)):
+    """Statements slower than the threshold, aggregated by fingerprint"""
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "dropped": slow_query_log.dropped,
+        "queries": slow_query_log.findings()
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_slow_queries(current_user: User = Depends(require_admin)):
+    slow_query_log.clear()
+
+
+@router.post("/profiles", status_code=status.HTTP_201_CREATED)
+async def start_profiling(
+    data: ProfileStart,
+    current_user: User = Depends(require_admin)
+):
+    """Profile the next `count` requests whose path matches `pattern`"""
+    session = profiler.start(data.pattern, data.count, data.method)
+    log_action(
+        action_type="PROFILING_STARTED",
+        user=current_user.username,
+        details=f"Session {session.id}: {data.count} x {data.method or '*'} {data.pattern}",
+        status="success"
+    )
+    return session.to_dict()
+
+
+@router.get("/profiles")
+async def list_profiles(current_user: User = Depends(require_admin)):
+    return profiler.sessions()
+
+
+@router.get("/profiles/{session_id}")
+async def get_profile_summary(
+    session_id: str,
+    sort: str = Query("cumulative", enum=list(SORT_KEYS)),
+    limit: int = Query(30, ge=1, le=200),
+    current_user: User = Depends(require_admin)
+):
+    """Hot functions across the profiled requests of a session"""
+    try:
+        return profiler.summary(session_id, sort, limit)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling session not found"
+        )
+
+
+@router.delete("/profiles/{session_id}")
+async def stop_profiling(
+    session_id: str,
+    current_user: User = Depends(require_admin)
+):
+    """Stop a session before it has captured all requests"""
+    try:
+        return profiler.stop(session_id).to_dict()
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling session not found"
+        )
+
+
+@router.get("/memory")
+async def get_memory_report(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(require_admin)
+):
+    """Process memory, top allocation sites (while tracing), sessions and cache sizes"""
+    return report(limit)
+
+
+@router.post("/memory/tracemalloc/start")
+async def start_tracemalloc(
+    frames: int = Query(1, ge=1, le=50),
+    current_user: User = Depends(require_admin)
+):
+    tracker.start(frames)
+    log_action(
+        action_type="TRACEMALLOC_STARTED",
+        user=current_user.username,
+        details=f"Tracing with {frames} frame(s)",
+        status="success"
+    )
+    return {"tracing": tracker.tracing}
+
+
+@router.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc(current_user: User = Depends(require_admin)):
+    tracker.stop()
+    log_action(
+        action_type="TRACEMALLOC_STOPPED",
+        user=current_user.username,
+        status="success"
+    )
+    return {"tracing": tracker.tracing}
+
+
+@router.post("/memory/snapshots", status_code=status.HTTP_201_CREATED)
+async def take_memory_snapshot(current_user: User = Depends(require_admin)):
+    try:
+        return tracker.snapshot()
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+
+@router.get("/memory/diff")
+async def get_memory_diff(
+    since: int,
+    until: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    group_by: str = Query("lineno", enum=["lineno", "filename", "traceback"]),
+    current_user: User = Depends(require_admin)
+):
+    """Allocation growth from snapshot `since` to snapshot `until` (or now)"""
+    try:
+        return tracker.diff(since, until, limit, group_by)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Snapshot not found"
+        )
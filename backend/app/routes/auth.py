@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
@@ -12,12 +12,15 @@ from ..auth import (
 from .. import schemas, crud
 from ..db_models import User
 from ..logger import log_action
+from ..user_directory import directory
+from ..etags import cache_headers, etag_matches, not_modified
+from ..responses import raw_json
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
 @router.post("/login", response_model=schemas.Token)
-async def login(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(user_login: schemas.UserLogin, db: Session = Depends(get_db, scope="function")):
     user = authenticate_user(db, user_login.username, user_login.password)
     if not user:
         log_action(
@@ -49,7 +52,7 @@ async def login(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/register", response_model=schemas.UserResponse)
-async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db, scope="function")):
     # Check if username exists
     db_user = crud.get_user_by_username(db, user.username)
     if db_user:
@@ -118,22 +121,11 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 @router.get("/users", response_model=list[schemas.UserResponse])
 async def get_users(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
-    users = crud.get_users(db)
-    return [
-        schemas.UserResponse(
-            id=u.id,
-            username=u.username,
-            email=u.email,
-            first_name=u.first_name,
-            last_name=u.last_name,
-            role=u.role,
-            avatar_url=u.avatar_url,
-            is_active=u.is_active,
-            created_at=u.created_at,
-            alias=u.alias
-        )
-        for u in users
-    ]
+    payload, etag = directory.users_payload(db)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return raw_json(payload, headers=cache_headers(etag))
@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List
-import math
+from functools import partial
 
-from ..database import get_db
+from ..database import client_key, get_db
 from ..auth import get_current_user
 from .. import schemas, crud
 from ..services import AssignmentService, CaseEscalationService, CaseMergeService
 from ..db_models import User
+from ..responses import ORJSONResponse, paginate, parse_fields, project, raw_json
+from ..record_cache import record_cache, table_version
+from ..etags import cache_headers, etag_matches, list_etag, not_modified
+from ..filters import parse_filter
+from ..sorting import parse_sort
+from ..write_queue import write_queue
 
 router = APIRouter(prefix="/api/cases", tags=["cases"])
 
 
-def case_to_response(case) -> schemas.CaseResponse:
-    return schemas.CaseResponse(
+def case_to_response(case, fields: Optional[List[str]] = None):
+    if fields is not None:
+        return project(case, fields)
+    return schemas.CaseResponse.model_construct(
         id=case.id,
         case_number=case.case_number,
         subject=case.subject,
@@ -28,14 +36,15 @@ def case_to_response(case) -> schemas.CaseResponse:
         sla_due_date=case.sla_due_date,
         created_at=case.created_at,
         updated_at=case.updated_at,
-        account_name=case.account.name if case.account else None,
-        contact_name=case.contact.full_name if case.contact else None,
-        owner_alias=case.owner.alias if case.owner else None
+        account_name=case.account_name,
+        contact_name=case.contact_name,
+        owner_alias=case.owner_alias
     )
 
 
-@router.get("", response_model=schemas.PaginatedResponse)
+@router.get("", response_model=schemas.CasePage)
 async def list_cases(
+    request: Request,
     q: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
@@ -45,9 +54,19 @@ async def list_cases(
     priority: Optional[str] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma separated response fields; items then carry only these and id"),
+    filter_expression: Optional[str] = Query(None, alias="filter", description="JSON filter expression, see filters.py"),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
+    selected = parse_fields(fields, schemas.CaseResponse)
+    parse_sort("case", sort_by, sort_order)
+    filters = parse_filter("case", filter_expression, request.query_params)
+    version = table_version(db, "case")
+    etag = list_etag(request, "case", version, filters)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     skip = (page - 1) * page_size
     cases, total = crud.get_cases(
         db,
@@ -59,22 +78,23 @@ async def list_cases(
         status=status,
         priority=priority,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        fields=selected,
+        filters=filters,
+        version=version
     )
 
-    return schemas.PaginatedResponse(
-        items=[case_to_response(c) for c in cases],
-        total=total,
-        page=page,
-        page_size=page_size,
-        pages=math.ceil(total / page_size) if total > 0 else 0
+    items = [case_to_response(c, selected) for c in cases]
+    return ORJSONResponse(
+        paginate(schemas.CasePage, items, total, page, page_size),
+        headers=cache_headers(etag)
     )
 
 
 @router.get("/by-priority")
 async def get_cases_by_priority(
     owner_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     return crud.get_cases_by_priority(db, owner_id)
@@ -83,65 +103,77 @@ async def get_cases_by_priority(
 @router.get("/{case_id}", response_model=schemas.CaseResponse)
 async def get_case(
     case_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
-    case = crud.get_case(db, case_id)
-    if not case:
+    def load():
+        case = crud.get_case(db, case_id)
+        return (case_to_response(case), f"{case.case_number}: {case.subject}", case.row_version) if case else None
+
+    entry = record_cache.get_or_load(db, "case", case_id, load)
+    if entry is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Case not found"
         )
 
     # Track recent record
-    crud.add_recent_record(db, current_user.id, "case", case.id, f"{case.case_number}: {case.subject}")
+    write_queue.defer(partial(
+        crud.track_recent_record, user_id=current_user.id, record_type="case", record_id=case_id, record_name=entry.name
+    ))
 
-    return case_to_response(case)
+    if etag_matches(request, entry.etag):
+        return not_modified(entry.etag)
+    return raw_json(entry.body, headers=cache_headers(entry.etag))
 
 
 @router.post("", response_model=schemas.CaseResponse, status_code=status.HTTP_201_CREATED)
 async def create_case(
+    request: Request,
     case: schemas.CaseCreate,
     auto_assign: bool = Query(True),
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Create the case first
-    db_case = crud.create_case(db, case)
+    def create(session):
+        db_case = crud.create_case(session, case, commit=False)
+
+        # Apply assignment rules if auto_assign is True
+        if auto_assign and not case.owner_id:
+            assignment_service = AssignmentService(session)
+            owner_id = assignment_service.apply_case_assignment(db_case)
+            if owner_id:
+                crud.update_case(session, db_case.id, schemas.CaseUpdate(owner_id=owner_id), commit=False)
+        return db_case
 
-    # Apply assignment rules if auto_assign is True
-    if auto_assign and not case.owner_id:
-        assignment_service = AssignmentService(db)
-        owner_id = assignment_service.apply_case_assignment(db_case)
-        if owner_id:
-            crud.update_case(db, db_case.id, schemas.CaseUpdate(owner_id=owner_id))
+    db_case = await write_queue.run(create, client_key(request))
 
-    return case_to_response(crud.get_case(db, db_case.id))
+    return ORJSONResponse(case_to_response(db_case), status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{case_id}", response_model=schemas.CaseResponse)
 async def update_case(
     case_id: int,
     case: schemas.CaseUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    db_case = crud.update_case(db, case_id, case)
+    db_case = await write_queue.run(partial(crud.update_case, case_id=case_id, case=case, commit=False), client_key(request))
     if not db_case:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Case not found"
         )
-    return case_to_response(crud.get_case(db, case_id))
+    return ORJSONResponse(case_to_response(db_case))
 
 
 @router.delete("/{case_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_case(
     case_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    success = crud.delete_case(db, case_id)
+    success = await write_queue.run(partial(crud.delete_case, case_id=case_id, commit=False), client_key(request))
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -152,7 +184,7 @@ async def delete_case(
 @router.post("/{case_id}/escalate", response_model=schemas.CaseResponse)
 async def escalate_case(
     case_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     escalation_service = CaseEscalationService(db)
@@ -165,13 +197,13 @@ async def escalate_case(
             detail=str(e)
         )
 
-    return case_to_response(crud.get_case(db, case_id))
+    return ORJSONResponse(case_to_response(case))
 
 
 @router.post("/merge", response_model=schemas.CaseResponse)
 async def merge_cases(
     merge_data: schemas.CaseMerge,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     merge_service = CaseMergeService(db)
@@ -188,28 +220,28 @@ async def merge_cases(
             detail=str(e)
         )
 
-    return case_to_response(crud.get_case(db, master_case.id))
+    return ORJSONResponse(case_to_response(master_case))
 
 
 @router.put("/{case_id}/change-owner", response_model=schemas.CaseResponse)
 async def change_case_owner(
     case_id: int,
     owner_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    case = crud.update_case(db, case_id, schemas.CaseUpdate(owner_id=owner_id))
+    case = await write_queue.run(partial(crud.update_case, case_id=case_id, case=schemas.CaseUpdate(owner_id=owner_id), commit=False), client_key(request))
     if not case:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Case not found"
         )
-    return case_to_response(crud.get_case(db, case_id))
+    return ORJSONResponse(case_to_response(case))
 
 
 @router.post("/check-sla")
 async def check_and_escalate_overdue(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     """Endpoint to manually trigger SLA check and escalation."""
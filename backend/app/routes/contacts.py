@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
-from typing import Optional
-import math
+from typing import Optional, List
+from functools import partial
 
-from ..database import get_db
+from ..database import client_key, get_db
 from ..auth import get_current_user
 from .. import schemas, crud
 from ..services import DuplicateDetectionService
 from ..db_models import User
+from ..responses import ORJSONResponse, paginate, parse_fields, project, raw_json
+from ..record_cache import record_cache, table_version
+from ..etags import cache_headers, etag_matches, list_etag, not_modified
+from ..filters import parse_filter
+from ..sorting import parse_sort
+from ..write_queue import write_queue
 
 router = APIRouter(prefix="/api/contacts", tags=["contacts"])
 
 
-def contact_to_response(contact) -> schemas.ContactResponse:
-    return schemas.ContactResponse(
+def contact_to_response(contact, fields: Optional[List[str]] = None):
+    if fields is not None:
+        return project(contact, fields)
+    return schemas.ContactResponse.model_construct(
         id=contact.id,
         first_name=contact.first_name,
         last_name=contact.last_name,
@@ -26,13 +34,14 @@ def contact_to_response(contact) -> schemas.ContactResponse:
         created_at=contact.created_at,
         updated_at=contact.updated_at,
         full_name=contact.full_name,
-        account_name=contact.account.name if contact.account else None,
-        owner_alias=contact.owner.alias if contact.owner else None
+        account_name=contact.account_name,
+        owner_alias=contact.owner_alias
     )
 
 
-@router.get("", response_model=schemas.PaginatedResponse)
+@router.get("", response_model=schemas.ContactPage)
 async def list_contacts(
+    request: Request,
     q: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
@@ -40,9 +49,19 @@ async def list_contacts(
     account_id: Optional[int] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma separated response fields; items then carry only these and id"),
+    filter_expression: Optional[str] = Query(None, alias="filter", description="JSON filter expression, see filters.py"),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
+    selected = parse_fields(fields, schemas.ContactResponse)
+    parse_sort("contact", sort_by, sort_order)
+    filters = parse_filter("contact", filter_expression, request.query_params)
+    version = table_version(db, "contact")
+    etag = list_etag(request, "contact", version, filters)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     skip = (page - 1) * page_size
     contacts, total = crud.get_contacts(
         db,
@@ -52,42 +71,53 @@ async def list_contacts(
         owner_id=owner_id,
         account_id=account_id,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        fields=selected,
+        filters=filters,
+        version=version
     )
 
-    return schemas.PaginatedResponse(
-        items=[contact_to_response(c) for c in contacts],
-        total=total,
-        page=page,
-        page_size=page_size,
-        pages=math.ceil(total / page_size) if total > 0 else 0
+    items = [contact_to_response(c, selected) for c in contacts]
+    return ORJSONResponse(
+        paginate(schemas.ContactPage, items, total, page, page_size),
+        headers=cache_headers(etag)
     )
 
 
 @router.get("/{contact_id}", response_model=schemas.ContactResponse)
 async def get_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
-    contact = crud.get_contact(db, contact_id)
-    if not contact:
+    def load():
+        contact = crud.get_contact(db, contact_id)
+        return (contact_to_response(contact), contact.full_name, contact.row_version) if contact else None
+
+    entry = record_cache.get_or_load(db, "contact", contact_id, load)
+    if entry is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
 
     # Track recent record
-    crud.add_recent_record(db, current_user.id, "contact", contact.id, contact.full_name)
+    write_queue.defer(partial(
+        crud.track_recent_record, user_id=current_user.id, record_type="contact", record_id=contact_id, record_name=entry.name
+    ))
 
-    return contact_to_response(contact)
+    if etag_matches(request, entry.etag):
+        return not_modified(entry.etag)
+    return raw_json(entry.body, headers=cache_headers(entry.etag))
 
 
 @router.post("", response_model=schemas.ContactResponse, status_code=status.HTTP_201_CREATED)
 async def create_contact(
+    request: Request,
     contact: schemas.ContactCreate,
     check_duplicates: bool = Query(False),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     # Check for duplicates if requested
@@ -107,33 +137,33 @@ async def create_contact(
     if not contact.owner_id:
         contact.owner_id = current_user.id
 
-    db_contact = crud.create_contact(db, contact)
-    return contact_to_response(crud.get_contact(db, db_contact.id))
+    db_contact = await write_queue.run(partial(crud.create_contact, contact=contact, commit=False), client_key(request))
+    return ORJSONResponse(contact_to_response(db_contact), status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{contact_id}", response_model=schemas.ContactResponse)
 async def update_contact(
     contact_id: int,
     contact: schemas.ContactUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    db_contact = crud.update_contact(db, contact_id, contact)
+    db_contact = await write_queue.run(partial(crud.update_contact, contact_id=contact_id, contact=contact, commit=False), client_key(request))
     if not db_contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
-    return contact_to_response(crud.get_contact(db, contact_id))
+    return ORJSONResponse(contact_to_response(db_contact))
 
 
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    success = crud.delete_contact(db, contact_id)
+    success = await write_queue.run(partial(crud.delete_contact, contact_id=contact_id, commit=False), client_key(request))
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -145,23 +175,23 @@ async def delete_contact(
 async def change_contact_owner(
     contact_id: int,
     owner_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    contact = crud.update_contact(db, contact_id, schemas.ContactUpdate(owner_id=owner_id))
+    contact = await write_queue.run(partial(crud.update_contact, contact_id=contact_id, contact=schemas.ContactUpdate(owner_id=owner_id), commit=False), client_key(request))
     if not contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
-    return contact_to_response(crud.get_contact(db, contact_id))
+    return ORJSONResponse(contact_to_response(contact))
 
 
 @router.post("/check-duplicates", response_model=schemas.DuplicateWarning)
 async def check_duplicates(
     email: Optional[str] = None,
     phone: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     if not email and not phone:
@@ -12,13 +12,13 @@ router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 @router.get("/stats", response_model=schemas.DashboardStats)
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     # Get counts for current user
-    leads, leads_total = crud.get_leads(db, owner_id=current_user.id, limit=1)
-    opportunities, opps_total = crud.get_opportunities(db, owner_id=current_user.id, limit=1)
-    contacts, contacts_total = crud.get_contacts(db, owner_id=current_user.id, limit=1)
+    leads, leads_total = crud.get_leads(db, owner_id=current_user.id, limit=1, fields=["id"])
+    opportunities, opps_total = crud.get_opportunities(db, owner_id=current_user.id, limit=1, fields=["id"])
+    contacts, contacts_total = crud.get_contacts(db, owner_id=current_user.id, limit=1, fields=["id"])
 
     # Get cases by priority
     cases_by_priority = crud.get_cases_by_priority(db, owner_id=current_user.id)
@@ -47,7 +47,7 @@ async def get_dashboard_stats(
 @router.get("/recent-records")
 async def get_recent_records(
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     recent = crud.get_recent_records(db, current_user.id, limit=limit)
@@ -67,7 +67,7 @@ async def get_recent_records(
 async def global_search(
     q: str = Query(..., min_length=1),
     limit: int = Query(20, ge=1, le=50),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     results = crud.global_search(db, q, limit=limit)
@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
-from typing import Optional
-import math
+from typing import Optional, List
+from functools import partial
 
-from ..database import get_db
+from ..database import client_key, get_db
 from ..auth import get_current_user
 from .. import schemas, crud
 from ..services import AssignmentService, LeadConversionService, DuplicateDetectionService
 from ..db_models import User
+from ..responses import ORJSONResponse, paginate, parse_fields, project, raw_json
+from ..record_cache import record_cache, table_version
+from ..etags import cache_headers, etag_matches, list_etag, not_modified
+from ..filters import parse_filter
+from ..sorting import parse_sort
+from ..write_queue import write_queue
 from ..logger import log_action
 
 router = APIRouter(prefix="/api/leads", tags=["leads"])
 
 
-def lead_to_response(lead) -> schemas.LeadResponse:
-    return schemas.LeadResponse(
+def lead_to_response(lead, fields: Optional[List[str]] = None):
+    if fields is not None:
+        return project(lead, fields)
+    return schemas.LeadResponse.model_construct(
         id=lead.id,
         first_name=lead.first_name,
         last_name=lead.last_name,
@@ -32,12 +40,13 @@ def lead_to_response(lead) -> schemas.LeadResponse:
         created_at=lead.created_at,
         updated_at=lead.updated_at,
         full_name=lead.full_name,
-        owner_alias=lead.owner.alias if lead.owner else None
+        owner_alias=lead.owner_alias
     )
 
 
-@router.get("", response_model=schemas.PaginatedResponse)
+@router.get("", response_model=schemas.LeadPage)
 async def list_leads(
+    request: Request,
     q: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
@@ -45,9 +54,19 @@ async def list_leads(
     status: Optional[str] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma separated response fields; items then carry only these and id"),
+    filter_expression: Optional[str] = Query(None, alias="filter", description="JSON filter expression, see filters.py"),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
+    selected = parse_fields(fields, schemas.LeadResponse)
+    parse_sort("lead", sort_by, sort_order)
+    filters = parse_filter("lead", filter_expression, request.query_params)
+    version = table_version(db, "lead")
+    etag = list_etag(request, "lead", version, filters)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     skip = (page - 1) * page_size
     leads, total = crud.get_leads(
         db,
@@ -57,43 +76,54 @@ async def list_leads(
         owner_id=owner_id,
         status=status,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        fields=selected,
+        filters=filters,
+        version=version
     )
 
-    return schemas.PaginatedResponse(
-        items=[lead_to_response(l) for l in leads],
-        total=total,
-        page=page,
-        page_size=page_size,
-        pages=math.ceil(total / page_size) if total > 0 else 0
+    items = [lead_to_response(l, selected) for l in leads]
+    return ORJSONResponse(
+        paginate(schemas.LeadPage, items, total, page, page_size),
+        headers=cache_headers(etag)
     )
 
 
 @router.get("/{lead_id}", response_model=schemas.LeadResponse)
 async def get_lead(
     lead_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
-    lead = crud.get_lead(db, lead_id)
-    if not lead:
+    def load():
+        lead = crud.get_lead(db, lead_id)
+        return (lead_to_response(lead), lead.full_name, lead.row_version) if lead else None
+
+    entry = record_cache.get_or_load(db, "lead", lead_id, load)
+    if entry is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lead not found"
         )
 
     # Track recent record
-    crud.add_recent_record(db, current_user.id, "lead", lead.id, lead.full_name)
+    write_queue.defer(partial(
+        crud.track_recent_record, user_id=current_user.id, record_type="lead", record_id=lead_id, record_name=entry.name
+    ))
 
-    return lead_to_response(lead)
+    if etag_matches(request, entry.etag):
+        return not_modified(entry.etag)
+    return raw_json(entry.body, headers=cache_headers(entry.etag))
 
 
 @router.post("", response_model=schemas.LeadResponse, status_code=status.HTTP_201_CREATED)
 async def create_lead(
+    request: Request,
     lead: schemas.LeadCreate,
     check_duplicates: bool = Query(False),
     auto_assign: bool = Query(True),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     # Check for duplicates if requested
@@ -115,9 +145,20 @@ async def create_lead(
                 }
             )
 
-    # Create the lead first
-    db_lead = crud.create_lead(db, lead)
-    
+    def create(session):
+        db_lead = crud.create_lead(session, lead, commit=False)
+
+        # Apply assignment rules if auto_assign is True
+        owner_id = None
+        if auto_assign and not lead.owner_id:
+            assignment_service = AssignmentService(session)
+            owner_id = assignment_service.apply_lead_assignment(db_lead)
+            if owner_id:
+                crud.update_lead(session, db_lead.id, schemas.LeadUpdate(owner_id=owner_id), commit=False)
+        return db_lead, owner_id
+
+    db_lead, owner_id = await write_queue.run(create, client_key(request))
+
     log_action(
         action_type="CREATE_LEAD",
         user=current_user.username,
@@ -125,30 +166,25 @@ async def create_lead(
         status="success"
     )
 
-    # Apply assignment rules if auto_assign is True
-    if auto_assign and not lead.owner_id:
-        assignment_service = AssignmentService(db)
-        owner_id = assignment_service.apply_lead_assignment(db_lead)
-        if owner_id:
-            crud.update_lead(db, db_lead.id, schemas.LeadUpdate(owner_id=owner_id))
-            log_action(
-                action_type="LEAD_ASSIGNED",
-                user=current_user.username,
-                details=f"Lead {db_lead.id} auto-assigned to user {owner_id}",
-                status="success"
-            )
+    if owner_id:
+        log_action(
+            action_type="LEAD_ASSIGNED",
+            user=current_user.username,
+            details=f"Lead {db_lead.id} auto-assigned to user {owner_id}",
+            status="success"
+        )
 
-    return lead_to_response(crud.get_lead(db, db_lead.id))
+    return ORJSONResponse(lead_to_response(db_lead), status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{lead_id}", response_model=schemas.LeadResponse)
 async def update_lead(
     lead_id: int,
     lead: schemas.LeadUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    db_lead = crud.update_lead(db, lead_id, lead)
+    db_lead = await write_queue.run(partial(crud.update_lead, lead_id=lead_id, lead=lead, commit=False), client_key(request))
     if not db_lead:
         log_action(
             action_type="UPDATE_LEAD_FAILED",
@@ -168,16 +204,16 @@ async def update_lead(
         status="success"
     )
     
-    return lead_to_response(crud.get_lead(db, lead_id))
+    return ORJSONResponse(lead_to_response(db_lead))
 
 
 @router.delete("/{lead_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_lead(
     lead_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    success = crud.delete_lead(db, lead_id)
+    success = await write_queue.run(partial(crud.delete_lead, lead_id=lead_id, commit=False), client_key(request))
     if not success:
         log_action(
             action_type="DELETE_LEAD_FAILED",
@@ -202,7 +238,7 @@ async def delete_lead(
 async def convert_lead(
     lead_id: int,
     conversion_data: schemas.LeadConvert,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     conversion_service = LeadConversionService(db)
@@ -231,23 +267,23 @@ async def convert_lead(
 async def change_lead_owner(
     lead_id: int,
     owner_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    lead = crud.update_lead(db, lead_id, schemas.LeadUpdate(owner_id=owner_id))
+    lead = await write_queue.run(partial(crud.update_lead, lead_id=lead_id, lead=schemas.LeadUpdate(owner_id=owner_id), commit=False), client_key(request))
     if not lead:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lead not found"
         )
-    return lead_to_response(crud.get_lead(db, lead_id))
+    return ORJSONResponse(lead_to_response(lead))
 
 
 @router.post("/check-duplicates", response_model=schemas.DuplicateWarning)
 async def check_duplicates(
     email: Optional[str] = None,
     phone: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     if not email and not phone:
@@ -1,10 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from ..database import get_db
-from ..auth import get_current_user
-from ..db_models import User
+from ..auth import get_current_username
 from ..logger import log_action
 
 router = APIRouter(prefix="/api/logs", tags=["logs"])
@@ -19,15 +16,14 @@ class FrontendLog(BaseModel):
 @router.post("/frontend-click")
 async def log_frontend_click(
     log_data: FrontendLog,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    username: str = Depends(get_current_username)
 ):
     """Log frontend clicks and user interactions"""
     details = f"CLICK: {log_data.element} | {log_data.details}" if log_data.element else log_data.details
     
     log_action(
         action_type=f"FRONTEND_CLICK",
-        user=current_user.username,
+        user=username,
         details=details,
         status="success"
     )
@@ -38,13 +34,12 @@ async def log_frontend_click(
 @router.post("/action")
 async def log_action_endpoint(
     log_data: FrontendLog,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    username: str = Depends(get_current_username)
 ):
     """Generic endpoint to log any action from frontend"""
     log_action(
         action_type=log_data.action_type,
-        user=current_user.username,
+        user=username,
         details=log_data.details,
         status="success"
     )
@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
-from typing import Optional
-import math
+from typing import Optional, List
+from functools import partial
 
-from ..database import get_db
+from ..database import client_key, get_db
 from ..auth import get_current_user
 from .. import schemas, crud
 from ..db_models import User
+from ..responses import ORJSONResponse, paginate, parse_fields, project, raw_json
+from ..record_cache import record_cache, table_version
+from ..etags import cache_headers, etag_matches, list_etag, not_modified
+from ..filters import parse_filter
+from ..sorting import parse_sort
+from ..write_queue import write_queue
 
 router = APIRouter(prefix="/api/opportunities", tags=["opportunities"])
 
 
-def opportunity_to_response(opportunity) -> schemas.OpportunityResponse:
-    return schemas.OpportunityResponse(
+def opportunity_to_response(opportunity, fields: Optional[List[str]] = None):
+    if fields is not None:
+        return project(opportunity, fields)
+    return schemas.OpportunityResponse.model_construct(
         id=opportunity.id,
         name=opportunity.name,
         account_id=opportunity.account_id,
@@ -24,13 +32,14 @@ def opportunity_to_response(opportunity) -> schemas.OpportunityResponse:
         owner_id=opportunity.owner_id,
         created_at=opportunity.created_at,
         updated_at=opportunity.updated_at,
-        account_name=opportunity.account.name if opportunity.account else None,
-        owner_alias=opportunity.owner.alias if opportunity.owner else None
+        account_name=opportunity.account_name,
+        owner_alias=opportunity.owner_alias
     )
 
 
-@router.get("", response_model=schemas.PaginatedResponse)
+@router.get("", response_model=schemas.OpportunityPage)
 async def list_opportunities(
+    request: Request,
     q: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
@@ -39,9 +48,19 @@ async def list_opportunities(
     stage: Optional[str] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma separated response fields; items then carry only these and id"),
+    filter_expression: Optional[str] = Query(None, alias="filter", description="JSON filter expression, see filters.py"),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
+    selected = parse_fields(fields, schemas.OpportunityResponse)
+    parse_sort("opportunity", sort_by, sort_order)
+    filters = parse_filter("opportunity", filter_expression, request.query_params)
+    version = table_version(db, "opportunity")
+    etag = list_etag(request, "opportunity", version, filters)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     skip = (page - 1) * page_size
     opportunities, total = crud.get_opportunities(
         db,
@@ -52,74 +71,84 @@ async def list_opportunities(
         account_id=account_id,
         stage=stage,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        fields=selected,
+        filters=filters,
+        version=version
     )
 
-    return schemas.PaginatedResponse(
-        items=[opportunity_to_response(o) for o in opportunities],
-        total=total,
-        page=page,
-        page_size=page_size,
-        pages=math.ceil(total / page_size) if total > 0 else 0
+    items = [opportunity_to_response(o, selected) for o in opportunities]
+    return ORJSONResponse(
+        paginate(schemas.OpportunityPage, items, total, page, page_size),
+        headers=cache_headers(etag)
     )
 
 
 @router.get("/{opportunity_id}", response_model=schemas.OpportunityResponse)
 async def get_opportunity(
     opportunity_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
-    opportunity = crud.get_opportunity(db, opportunity_id)
-    if not opportunity:
+    def load():
+        opportunity = crud.get_opportunity(db, opportunity_id)
+        return (opportunity_to_response(opportunity), opportunity.name, opportunity.row_version) if opportunity else None
+
+    entry = record_cache.get_or_load(db, "opportunity", opportunity_id, load)
+    if entry is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Opportunity not found"
         )
 
     # Track recent record
-    crud.add_recent_record(db, current_user.id, "opportunity", opportunity.id, opportunity.name)
+    write_queue.defer(partial(
+        crud.track_recent_record, user_id=current_user.id, record_type="opportunity", record_id=opportunity_id, record_name=entry.name
+    ))
 
-    return opportunity_to_response(opportunity)
+    if etag_matches(request, entry.etag):
+        return not_modified(entry.etag)
+    return raw_json(entry.body, headers=cache_headers(entry.etag))
 
 
 @router.post("", response_model=schemas.OpportunityResponse, status_code=status.HTTP_201_CREATED)
 async def create_opportunity(
     opportunity: schemas.OpportunityCreate,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     # Set owner to current user if not specified
     if not opportunity.owner_id:
         opportunity.owner_id = current_user.id
 
-    db_opportunity = crud.create_opportunity(db, opportunity)
-    return opportunity_to_response(crud.get_opportunity(db, db_opportunity.id))
+    db_opportunity = await write_queue.run(partial(crud.create_opportunity, opportunity=opportunity, commit=False), client_key(request))
+    return ORJSONResponse(opportunity_to_response(db_opportunity), status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{opportunity_id}", response_model=schemas.OpportunityResponse)
 async def update_opportunity(
     opportunity_id: int,
     opportunity: schemas.OpportunityUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    db_opportunity = crud.update_opportunity(db, opportunity_id, opportunity)
+    db_opportunity = await write_queue.run(partial(crud.update_opportunity, opportunity_id=opportunity_id, opportunity=opportunity, commit=False), client_key(request))
     if not db_opportunity:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Opportunity not found"
         )
-    return opportunity_to_response(crud.get_opportunity(db, opportunity_id))
+    return ORJSONResponse(opportunity_to_response(db_opportunity))
 
 
 @router.delete("/{opportunity_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_opportunity(
     opportunity_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    success = crud.delete_opportunity(db, opportunity_id)
+    success = await write_queue.run(partial(crud.delete_opportunity, opportunity_id=opportunity_id, commit=False), client_key(request))
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -131,25 +160,25 @@ async def delete_opportunity(
 async def change_opportunity_owner(
     opportunity_id: int,
     owner_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    opportunity = crud.update_opportunity(
-        db, opportunity_id, schemas.OpportunityUpdate(owner_id=owner_id)
-    )
+    opportunity = await write_queue.run(partial(
+        crud.update_opportunity, opportunity_id=opportunity_id, opportunity=schemas.OpportunityUpdate(owner_id=owner_id), commit=False
+    ), client_key(request))
     if not opportunity:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Opportunity not found"
         )
-    return opportunity_to_response(crud.get_opportunity(db, opportunity_id))
+    return ORJSONResponse(opportunity_to_response(opportunity))
 
 
 @router.put("/{opportunity_id}/stage", response_model=schemas.OpportunityResponse)
 async def update_opportunity_stage(
     opportunity_id: int,
     stage: str,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     # Update probability based on stage
@@ -163,14 +192,15 @@ async def update_opportunity_stage(
         "Closed Lost": 0
     }
 
-    opportunity = crud.update_opportunity(
-        db,
-        opportunity_id,
-        schemas.OpportunityUpdate(
+    opportunity = await write_queue.run(partial(
+        crud.update_opportunity,
+        opportunity_id=opportunity_id,
+        opportunity=schemas.OpportunityUpdate(
             stage=stage,
             probability=stage_probabilities.get(stage, 0)
-        )
-    )
+        ),
+        commit=False
+    ), client_key(request))
 
     if not opportunity:
         raise HTTPException(
@@ -178,4 +208,4 @@ async def update_opportunity_stage(
             detail="Opportunity not found"
         )
 
-    return opportunity_to_response(crud.get_opportunity(db, opportunity_id))
+    return ORJSONResponse(opportunity_to_response(opportunity))
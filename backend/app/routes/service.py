@@ -49,7 +49,7 @@ router = APIRouter(prefix="/api/service", tags=["service"])
 async def list_service_accounts(
     skip: int = 0,
     limit: int = 25,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     accounts = db.query(ServiceAccount).offset(skip).limit(limit).all()
@@ -59,7 +59,7 @@ async def list_service_accounts(
 @router.post("/accounts")
 async def create_service_account(
     data: ServiceAccountCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     service_account = ServiceAccount(
@@ -85,7 +85,7 @@ async def create_service_account(
 @router.get("/accounts/{account_id}")
 async def get_service_account(
     account_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     account = db.query(ServiceAccount).filter(ServiceAccount.id == account_id).first()
@@ -98,7 +98,7 @@ async def update_service_account(
     account_id: int,
     warranty_status: Optional[str] = None,
     service_level: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     account = db.query(ServiceAccount).filter(ServiceAccount.id == account_id).first()
@@ -127,7 +127,7 @@ async def update_service_account(
 async def list_quotations(
     skip: int = 0,
     limit: int = 25,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     quotations = db.query(Quotation).offset(skip).limit(limit).all()
@@ -137,7 +137,7 @@ async def list_quotations(
 @router.post("/quotations")
 async def create_quotation(
     data: QuotationCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     try:
@@ -172,7 +172,7 @@ async def create_quotation(
 @router.get("/quotations/{quotation_id}")
 async def get_quotation(
     quotation_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     quotation = db.query(Quotation).filter(Quotation.id == quotation_id).first()
@@ -185,7 +185,7 @@ async def update_quotation(
     quotation_id: int,
     status: Optional[str] = None,
     amount: Optional[float] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     quotation = db.query(Quotation).filter(Quotation.id == quotation_id).first()
@@ -215,7 +215,7 @@ async def update_quotation(
 async def list_invoices(
     skip: int = 0,
     limit: int = 25,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     invoices = db.query(Invoice).offset(skip).limit(limit).all()
@@ -225,7 +225,7 @@ async def list_invoices(
 @router.post("/invoices")
 async def create_invoice(
     data: InvoiceCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     try:
@@ -262,7 +262,7 @@ async def create_invoice(
 @router.get("/invoices/{invoice_id}")
 async def get_invoice(
     invoice_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
@@ -275,7 +275,7 @@ async def update_invoice(
     invoice_id: int,
     status: Optional[str] = None,
     amount: Optional[float] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
@@ -307,7 +307,7 @@ async def update_invoice(
 async def list_warranty_extensions(
     skip: int = 0,
     limit: int = 25,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     extensions = db.query(WarrantyExtension).offset(skip).limit(limit).all()
@@ -317,7 +317,7 @@ async def list_warranty_extensions(
 @router.post("/warranty-extensions")
 async def create_warranty_extension(
     data: WarrantyExtensionCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     extension = WarrantyExtension(
@@ -346,7 +346,7 @@ async def create_warranty_extension(
 async def list_slas(
     skip: int = 0,
     limit: int = 25,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     try:
@@ -360,7 +360,7 @@ async def list_slas(
 @router.post("/slas")
 async def create_sla(
     data: SLACreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     sla = ServiceLevelAgreement(
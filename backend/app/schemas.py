@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Any
+from typing import Optional, List, Generic, TypeVar, Union
 from datetime import datetime
 from enum import Enum
 
@@ -345,14 +345,38 @@ class SearchResponse(BaseModel):
 
 
 # List Response
-class PaginatedResponse(BaseModel):
-    items: List[Any]
+ItemT = TypeVar("ItemT")
+
+
+class PaginatedResponse(BaseModel, Generic[ItemT]):
+    items: List[ItemT]
     total: int
     page: int
     page_size: int
     pages: int
 
 
+# Items are sparse dicts when the list was requested with fields=
+class AccountPage(PaginatedResponse[Union[AccountResponse, dict]]):
+    pass
+
+
+class ContactPage(PaginatedResponse[Union[ContactResponse, dict]]):
+    pass
+
+
+class LeadPage(PaginatedResponse[Union[LeadResponse, dict]]):
+    pass
+
+
+class OpportunityPage(PaginatedResponse[Union[OpportunityResponse, dict]]):
+    pass
+
+
+class CasePage(PaginatedResponse[Union[CaseResponse, dict]]):
+    pass
+
+
 # Recent Records
 class RecentRecordResponse(BaseModel):
     id: int
@@ -0,0 +1,185 @@
+"""
+Slow-query log.
+
+Statements slower than SLOW_QUERY_MS are logged and aggregated by fingerprint
+(the statement with literals and IN lists normalized away). The first time a
+fingerprint is seen its EXPLAIN QUERY PLAN is captured on a separate cursor of
+the same connection, and the tables it scans without an index are listed, so
+a search falling back to a full scan stands out in /api/admin/slow-queries.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .logger import log_action
+from .metrics import current_request, route_template, statement_shape
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# Distinct fingerprints kept; further ones are only counted as dropped
+MAX_FINGERPRINTS = 500
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+# "SCAN leads" on SQLite >= 3.36, "SCAN TABLE leads" before; covering index scans are fine
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)\b(?! USING (?:COVERING )?INDEX)")
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def normalize_sql(statement: str) -> str:
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement_shape(statement)).strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """Types of the bound parameters, e.g. "(int, str)" or "12 x (int, str)"."""
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} x {parameter_shape(rows[0], False)}" if rows else "0 x ()"
+    if isinstance(parameters, dict):
+        return "(" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + ")"
+    return "(" + ", ".join(type(v).__name__ for v in parameters or ()) + ")"
+
+
+class SlowQuery:
+    __slots__ = (
+        "fingerprint", "sql", "count", "total_ms", "max_ms", "routes",
+        "parameter_shapes", "plan", "full_scans", "last_seen"
+    )
+
+    def __init__(self, key: str, sql: str):
+        self.fingerprint = key
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.routes: Dict[str, int] = {}
+        self.parameter_shapes: Dict[str, int] = {}
+        self.plan: Optional[List[str]] = None
+        self.full_scans: List[str] = []
+        self.last_seen: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "full_scans": self.full_scans,
+            "plan": self.plan,
+            "routes": self.routes,
+            "parameter_shapes": self.parameter_shapes,
+            "last_seen": self.last_seen,
+        }
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, max_fingerprints: int = MAX_FINGERPRINTS):
+        self.threshold_ms = threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queries: Dict[str, SlowQuery] = {}
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._queries.clear()
+            self.dropped = 0
+
+    def findings(self) -> List[dict]:
+        """Aggregated slow statements, most total time first."""
+        with self._lock:
+            queries = sorted(self._queries.values(), key=lambda q: q.total_ms, reverse=True)
+            return [q.to_dict() for q in queries]
+
+    def record(self, conn, statement: str, parameters, executemany: bool, elapsed_ms: float) -> None:
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        stats = current_request.get()
+        route = "<background>"
+        if stats is not None and stats.scope is not None:
+            route = f"{stats.scope['method']} {route_template(stats.scope)}"
+        shape = parameter_shape(parameters, executemany)
+
+        with self._lock:
+            query = self._queries.get(key)
+            if query is None:
+                if len(self._queries) >= self.max_fingerprints:
+                    self.dropped += 1
+                    return
+                query = self._queries[key] = SlowQuery(key, normalized)
+            query.count += 1
+            query.total_ms += elapsed_ms
+            query.max_ms = max(query.max_ms, elapsed_ms)
+            query.routes[route] = query.routes.get(route, 0) + 1
+            query.parameter_shapes[shape] = query.parameter_shapes.get(shape, 0) + 1
+            query.last_seen = datetime.utcnow()
+            needs_plan = query.plan is None
+
+        if needs_plan:
+            sample = list(parameters)[0] if executemany and parameters else parameters
+            query.plan = explain(conn, statement, sample)
+            query.full_scans = full_scans(query.plan)
+
+        log_action(
+            action_type="SLOW_QUERY",
+            details=(
+                f"{elapsed_ms:.1f}ms | {route} | {key}"
+                + (f" | SCAN {', '.join(query.full_scans)}" if query.full_scans else "")
+                + f" | {normalized[:300]}"
+            ),
+            status="warning"
+        )
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    """EXPLAIN QUERY PLAN details, run on a separate DBAPI cursor so the
+    statement being measured and the event hooks are not disturbed."""
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE) or conn.dialect.name != "sqlite":
+        return []
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        return [row[-1] for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """Tables the plan reads row by row without an index."""
+    tables = []
+    for detail in plan:
+        match = _FULL_SCAN.match(detail)
+        if match and match.group(1) not in tables:
+            tables.append(match.group(1))
+    return tables
+
+
+slow_query_log = SlowQueryLog()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_slow_query(conn, cursor, statement, parameters, context, executemany):
+    # _query_start is set by the metrics before_cursor_execute hook
+    elapsed_ms = (time.perf_counter() - context._query_start) * 1000
+    if elapsed_ms >= slow_query_log.threshold_ms:
+        slow_query_log.record(conn, statement, parameters, executemany, elapsed_ms)
@@ -0,0 +1,89 @@
+"""
+Sort keys accepted by the list endpoints.
+
+Each record type allows a fixed set of sort keys, each mapped to the columns
+of an index (see the __table_args__ in db_models.py), so a sorted page is read
+by walking the index and stopping at LIMIT instead of sorting the table. The
+record id is appended as a tiebreaker so pages are stable when sort values
+repeat; SQLite stores the rowid at the end of every index entry, so the same
+index serves it. Low-cardinality keys (stage, status, priority) sort by
+created_at within a value, reusing their (key, created_at) filter indexes.
+Lead lists always filter on is_converted, so their indexes lead with it.
+"""
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Column
+
+from . import db_models as models
+
+SORT_ORDERS = ("asc", "desc")
+
+SORT_KEYS: Dict[str, Dict[str, Tuple[Column, ...]]] = {
+    "account": {
+        "created_at": (models.Account.created_at,),
+        "updated_at": (models.Account.updated_at,),
+        "name": (models.Account.name,),
+        "industry": (models.Account.industry,),
+    },
+    "contact": {
+        "created_at": (models.Contact.created_at,),
+        "updated_at": (models.Contact.updated_at,),
+        "full_name": (models.Contact.last_name, models.Contact.first_name),
+        "account_name": (models.Contact.account_name,),
+        "email": (models.Contact.email,),
+    },
+    "lead": {
+        "created_at": (models.Lead.created_at,),
+        "updated_at": (models.Lead.updated_at,),
+        "full_name": (models.Lead.last_name, models.Lead.first_name),
+        "company": (models.Lead.company,),
+        "status": (models.Lead.status,),
+        "score": (models.Lead.score,),
+    },
+    "opportunity": {
+        "created_at": (models.Opportunity.created_at,),
+        "updated_at": (models.Opportunity.updated_at,),
+        "name": (models.Opportunity.name,),
+        "account_name": (models.Opportunity.account_name,),
+        "amount": (models.Opportunity.amount,),
+        "stage": (models.Opportunity.stage, models.Opportunity.created_at),
+        "close_date": (models.Opportunity.close_date,),
+    },
+    "case": {
+        "created_at": (models.Case.created_at,),
+        "updated_at": (models.Case.updated_at,),
+        "case_number": (models.Case.case_number,),
+        "subject": (models.Case.subject,),
+        "priority": (models.Case.priority, models.Case.created_at),
+        "status": (models.Case.status, models.Case.created_at),
+    },
+}
+
+_ID_COLUMNS = {
+    "account": models.Account.id,
+    "contact": models.Contact.id,
+    "lead": models.Lead.id,
+    "opportunity": models.Opportunity.id,
+    "case": models.Case.id,
+}
+
+
+def sort_clauses(record_type: str, sort_by: str, sort_order: str) -> List:
+    """ORDER BY clauses for an allowed sort, id last; ValueError otherwise."""
+    keys = SORT_KEYS[record_type]
+    if sort_by not in keys:
+        raise ValueError(f"Cannot sort by '{sort_by}'. Must be one of: {list(keys)}")
+    if sort_order not in SORT_ORDERS:
+        raise ValueError(f"Invalid sort_order '{sort_order}'. Must be one of: {list(SORT_ORDERS)}")
+
+    columns = keys[sort_by] + (_ID_COLUMNS[record_type],)
+    return [column.desc() if sort_order == "desc" else column.asc() for column in columns]
+
+
+def parse_sort(record_type: str, sort_by: str, sort_order: str) -> None:
+    """Reject unsupported sorts with a 400 before any query runs."""
+    try:
+        sort_clauses(record_type, sort_by, sort_order)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
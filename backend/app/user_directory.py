@@ -0,0 +1,163 @@
+"""
+Process-wide cache of the user table.
+
+Users are few and change rarely, but their alias and name are needed on every
+record response. The directory keeps id -> alias / full name maps and the
+serialized /api/auth/users payload in memory. It is warmed at startup, loaded
+lazily otherwise, and dropped whenever a transaction that touched a user
+commits.
+
+Those transactions also bump the "user" counter in table_versions. Each
+directory remembers the counter it was loaded at and compares it at most once
+per USER_DIRECTORY_POLL_SECONDS, so other workers reload after a user change
+instead of keeping stale aliases.
+"""
+import hashlib
+import os
+import threading
+import time
+from itertools import chain
+from typing import Dict, Optional, Tuple
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .db_models import User
+from .record_cache import bump_table_version, table_version
+
+# Matches the default page of crud.get_users
+USERS_PAYLOAD_LIMIT = 100
+
+
+class UserDirectory:
+    """In-memory id -> alias / full name maps for all users."""
+
+    def __init__(self, poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._version: Optional[int] = None
+        self._last_poll = 0.0
+        self._aliases: Optional[Dict[int, str]] = None
+        self._names: Dict[int, str] = {}
+        self._usernames: Dict[int, str] = {}
+        self._payload: bytes = b"[]"
+        self._etag: str = ""
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def loaded(self) -> bool:
+        return self._aliases is not None
+
+    def load(self, db: Session) -> None:
+        # Build everything into locals and swap references under the lock so
+        # readers never see a half-built directory. A build that raced with an
+        # invalidation is retried; user writes are rare, so this settles.
+        while True:
+            generation = self._generation
+            version = table_version(db, "user")
+            users = db.query(User).order_by(User.id).all()
+            payload = orjson.dumps([
+                schemas.UserResponse.model_construct(
+                    id=u.id,
+                    username=u.username,
+                    email=u.email,
+                    first_name=u.first_name,
+                    last_name=u.last_name,
+                    role=u.role,
+                    avatar_url=u.avatar_url,
+                    is_active=u.is_active,
+                    created_at=u.created_at,
+                    alias=u.alias
+                ).model_dump()
+                for u in users[:USERS_PAYLOAD_LIMIT]
+            ])
+            names = {u.id: u.full_name for u in users}
+            usernames = {u.id: u.username for u in users}
+            aliases = {u.id: u.alias for u in users}
+            etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+
+            with self._lock:
+                if generation == self._generation:
+                    self._names = names
+                    self._usernames = usernames
+                    self._payload = payload
+                    self._etag = etag
+                    self._aliases = aliases
+                    self._version = version
+                    self._last_poll = time.monotonic()
+                    return
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._aliases = None
+            self._names = {}
+            self._usernames = {}
+            self._payload = b"[]"
+            self._etag = ""
+
+    def poll(self, db: Session) -> None:
+        """Drop the directory if another worker changed a user since it was loaded."""
+        now = time.monotonic()
+        if not self.loaded or now - self._last_poll < self.poll_interval:
+            return
+        self._last_poll = now
+        if table_version(db, "user") != self._version:
+            self.invalidate()
+
+    def _ensure_loaded(self, db: Session) -> None:
+        self.poll(db)
+        if not self.loaded:
+            self.load(db)
+
+    def alias(self, user_id: Optional[int]) -> Optional[str]:
+        """Alias of a user if the directory is loaded and knows them."""
+        aliases = self._aliases
+        if aliases is None or user_id is None:
+            return None
+        return aliases.get(user_id)
+
+    def full_name(self, db: Session, user_id: Optional[int]) -> Optional[str]:
+        if user_id is None:
+            return None
+        self._ensure_loaded(db)
+        return self._names.get(user_id)
+
+    def username(self, db: Session, user_id: int) -> Optional[str]:
+        self._ensure_loaded(db)
+        return self._usernames.get(user_id)
+
+    def users_payload(self, db: Session) -> Tuple[bytes, str]:
+        """Serialized user list and its ETag."""
+        while True:
+            self._ensure_loaded(db)
+            # Read the pair together, not across an invalidation
+            with self._lock:
+                if self.loaded:
+                    return self._payload, self._etag
+
+
+directory = UserDirectory(poll_interval=float(os.getenv("USER_DIRECTORY_POLL_SECONDS", "1.0")))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session, flush_context):
+    if any(isinstance(obj, User) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["users_changed"] = True
+        bump_table_version(session, "user")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("users_changed", False):
+        directory.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("users_changed", None)
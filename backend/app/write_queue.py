@@ -0,0 +1,210 @@
+"""
+Single-writer queue with group commit.
+
+SQLite allows one writer at a time, and every commit waits for a sync of the
+WAL. Request handlers that each commit on their own serialize on the database
+lock, and under bursts some of them give up with "database is locked".
+
+Handlers instead hand a write unit (a function of a Session that does not
+commit) to the process' writer thread. The writer takes every unit queued
+while its previous commit was in flight (up to MAX_BATCH), applies them in
+one transaction and commits once, so a burst costs one sync instead of one
+per request while a lone write is not delayed. WINDOW optionally waits that
+many seconds for more units first; measured here, waiting only added latency
+and lowered throughput. Each caller's future resolves with its own unit's
+return value.
+
+If a unit raises, the batch is rolled back and its units are replayed one
+transaction each, so only the failing caller sees the error. Units may
+therefore run twice and must only touch the database through the session.
+Returned ORM objects are detached after the commit with their loaded state.
+
+Record creates (with their auto-assignment), updates, owner and stage
+changes and deletes and activity creation run as units through the crud
+functions' ``commit=False`` mode, and their handlers await the commit.
+Detail views defer recent-record tracking, so a read responds without
+waiting for the writer. Multi-step service flows (lead conversion, case
+escalation and merges, the SLA sweep) still commit on the request's session.
+"""
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, recent_writers
+from .logger import log_action
+
+WINDOW = float(os.getenv("WRITE_QUEUE_WINDOW", "0"))
+MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+
+
+def _resolve(future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    # The caller may have given up (a cancelled request); its write still stands
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _log_failure(future: Future) -> None:
+    error = future.exception()
+    if error is not None:
+        log_action(action_type="WRITE_QUEUE_UNIT_FAILED", details=type(error).__name__, status="error", error=str(error))
+
+
+class WriteUnit(NamedTuple):
+    apply: Callable[[Session], Any]
+    future: Future
+    client: Optional[str]
+    # The submitter's context vars, so the unit's SQL counts towards its
+    # request in metrics and the slow query log
+    context: contextvars.Context
+
+
+class WriteQueue:
+    def __init__(self, session_factory=SessionLocal, window: float = WINDOW, max_batch: int = MAX_BATCH):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[WriteUnit]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.units = 0
+        self.replays = 0
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, apply: Callable[[Session], Any], client: Optional[str] = None) -> Future:
+        """Queue a write unit. ``client`` (see database.client_key) reads its
+        own writes from the primary afterwards."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put(WriteUnit(apply, future, client, contextvars.copy_context()))
+        return future
+
+    async def run(self, apply: Callable[[Session], Any], client: Optional[str] = None) -> Any:
+        """Submit a unit and wait for its commit without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(apply, client))
+
+    def defer(self, apply: Callable[[Session], Any], client: Optional[str] = None) -> Future:
+        """Submit a unit nobody waits for, such as bookkeeping on a read;
+        failures are logged instead of raised."""
+        future = self.submit(apply, client)
+        future.add_done_callback(_log_failure)
+        return future
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Finish the queued units and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self),
+            "batches": self.batches,
+            "units": self.units,
+            "replays": self.replays,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> Optional[List[WriteUnit]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                unit = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if unit is None:
+                # Stop after this batch
+                self._queue.put(None)
+                break
+            batch.append(unit)
+        return batch
+
+    def _work(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._commit(batch)
+
+    def _commit(self, batch: List[WriteUnit]) -> None:
+        session = self.session_factory()
+        try:
+            results = [unit.context.run(unit.apply, session) for unit in batch]
+            # A lone unit's commit is its own; a shared one belongs to no request
+            if len(batch) == 1:
+                batch[0].context.run(session.commit)
+            else:
+                session.commit()
+        except Exception as e:
+            session.rollback()
+            session.close()
+            if len(batch) == 1:
+                _resolve(batch[0].future, error=e)
+                return
+            self.replays += 1
+            for unit in batch:
+                self._commit_one(unit)
+            return
+        session.expunge_all()
+        session.close()
+
+        self.batches += 1
+        self.units += len(batch)
+        self._mark_clients(batch)
+        for unit, result in zip(batch, results):
+            _resolve(unit.future, result)
+
+    def _commit_one(self, unit: WriteUnit) -> None:
+        session = self.session_factory()
+        try:
+            result = unit.context.run(unit.apply, session)
+            unit.context.run(session.commit)
+            session.expunge_all()
+        except Exception as e:
+            session.rollback()
+            _resolve(unit.future, error=e)
+        else:
+            self.batches += 1
+            self.units += 1
+            self._mark_clients([unit])
+            _resolve(unit.future, result)
+        finally:
+            session.close()
+
+    @staticmethod
+    def _mark_clients(batch: List[WriteUnit]) -> None:
+        for unit in batch:
+            if unit.client:
+                recent_writers.mark(unit.client)
+
+
+write_queue = WriteQueue()
@@ -0,0 +1,308 @@
+"""
+API benchmarks with regression thresholds.
+Run with: python -m benchmarks.api [--size small|medium|large] [--update-baseline]
+
+Seeds a database of the chosen size with seed.generate (cached between runs
+under --data-dir, copied fresh for every run since some scenarios write), then
+drives list, detail, search, dashboard, create, convert and escalate requests
+in-process. For every scenario it records latency percentiles, the number of
+SQL statements per request (from the Server-Timing header) and the memory
+allocated per request (tracemalloc peak, measured in a separate pass so
+tracing doesn't skew the latencies).
+
+Results are compared with benchmarks/baselines/<size>.json; the run fails
+(exit status 1) when any metric is worse than its baseline by more than its
+tolerance. Scenarios with slower latencies are run a second time and only fail
+if the second run is slow too. --update-baseline writes the current results as the new baseline.
+Latencies depend on the machine, so refresh the baseline when moving to new
+hardware; query counts and allocations do not.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+BASELINE_DIR = os.path.join(BENCHMARK_DIR, "baselines")
+
+SIZES = {
+    "small": {"accounts": 2000, "contacts": 8000, "leads": 20000, "opportunities": 4000, "cases": 6000},
+    "medium": {"accounts": 20000, "contacts": 80000, "leads": 200000, "opportunities": 40000, "cases": 60000},
+    "large": {"accounts": 200000, "contacts": 800000, "leads": 2000000, "opportunities": 400000, "cases": 600000},
+}
+ACTIVITIES_PER_RECORD = 1.0
+SEED = 42
+
+# Allowed relative increase over the baseline before a metric counts as a regression
+TOLERANCES = {
+    "p50_ms": 0.30,
+    "p95_ms": 0.50,
+    # The tail is noisy on a shared machine; only gross regressions count
+    "p99_ms": 1.00,
+    "queries": 0.0,
+    "alloc_kb": 0.20,
+}
+# Differences below these are noise whatever the ratio
+ABSOLUTE_SLACK = {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "queries": 0, "alloc_kb": 16.0}
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def database_file(size: str, data_dir: str, fresh: bool) -> str:
+    """Path of the generated database for a size, generating it if needed."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{size}-{SEED}.db")
+    if os.path.exists(path) and not fresh:
+        return path
+
+    # seed.py reads the URL from the environment through app.database
+    from subprocess import run
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    args = [sys.executable, os.path.join(os.path.dirname(BENCHMARK_DIR), "seed.py"), "--seed", str(SEED),
+            "--activities-per-record", str(ACTIVITIES_PER_RECORD)]
+    for table, count in SIZES[size].items():
+        args += [f"--{table}", str(count)]
+    run(args, check=True, cwd=data_dir, env={**os.environ, "DATABASE_URL": f"sqlite:///{partial}"})
+    os.replace(partial, path)
+    return path
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class Scenarios:
+    """Requests per scenario; each call returns (method, url, json body)."""
+
+    def __init__(self, ids: Dict[str, List[int]], rng: random.Random):
+        self.ids = ids
+        self.rng = rng
+        self.counter = 0
+
+    def _take(self, key: str) -> int:
+        # Write scenarios need a record nobody has used yet
+        return self.ids[key].pop()
+
+    def all(self) -> Dict[str, Callable[[], Tuple[str, str, dict]]]:
+        rng = self.rng
+        return {
+            "list_leads": lambda: ("GET", f"/api/leads?page={rng.randint(1, 20)}&page_size=25", None),
+            "list_leads_by_status": lambda: ("GET", "/api/leads?status=Qualified&page_size=50", None),
+            "list_cases": lambda: ("GET", f"/api/cases?page={rng.randint(1, 20)}&page_size=25", None),
+            "list_accounts": lambda: ("GET", "/api/accounts?page_size=100", None),
+            "detail_lead": lambda: ("GET", f"/api/leads/{rng.choice(self.ids['leads'])}", None),
+            "detail_case": lambda: ("GET", f"/api/cases/{rng.choice(self.ids['cases'])}", None),
+            "search_leads": lambda: ("GET", f"/api/leads?q={rng.choice(['smith', 'patel', 'acme', 'zzz'])}", None),
+            "search_global": lambda: ("GET", f"/api/dashboard/search?q={rng.choice(['lee', 'summit', 'case 1'])}", None),
+            "dashboard_stats": lambda: ("GET", "/api/dashboard/stats", None),
+            "create_lead": self._create_lead,
+            "convert_lead": lambda: ("POST", f"/api/leads/{self._take('convertible_leads')}/convert", {}),
+            "escalate_case": lambda: ("POST", f"/api/cases/{self._take('open_cases')}/escalate", None),
+        }
+
+    def _create_lead(self):
+        self.counter += 1
+        return "POST", "/api/leads?auto_assign=false", {
+            "first_name": "Bench",
+            "last_name": f"Lead {self.counter}",
+            "company": "Benchmark Inc",
+            "email": f"bench{self.counter}@example.com",
+        }
+
+
+def record_ids(rounds: int) -> Dict[str, List[int]]:
+    from app.database import SessionLocal
+    from app.db_models import Case, Lead
+
+    db = SessionLocal()
+    try:
+        # Enough fresh records for two runs (warm-up, timed and memory passes) of the write scenarios
+        needed = rounds * 2 + 40
+        return {
+            "leads": [i for (i,) in db.query(Lead.id).order_by(Lead.id.desc()).limit(5000)],
+            "cases": [i for (i,) in db.query(Case.id).order_by(Case.id.desc()).limit(5000)],
+            "convertible_leads": [
+                i for (i,) in db.query(Lead.id).filter(Lead.is_converted == False).order_by(Lead.id).limit(needed)
+            ],
+            "open_cases": [
+                i for (i,) in db.query(Case.id).filter(Case.is_escalated == False).order_by(Case.id).limit(needed)
+            ],
+        }
+    finally:
+        db.close()
+
+
+def request(client, headers, method: str, url: str, body) -> Tuple[float, int]:
+    start = time.perf_counter()
+    response = client.request(method, url, json=body, headers=headers)
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text[:200]}")
+    match = _QUERIES.search(response.headers.get("server-timing", ""))
+    return elapsed, int(match.group(1)) if match else 0
+
+
+def run_scenario(client, headers, make_request, rounds: int, memory_rounds: int) -> dict:
+    for _ in range(3):
+        request(client, headers, *make_request())
+
+    latencies, queries = [], []
+    # Collector pauses land on random requests and swamp the differences we look for
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            elapsed, count = request(client, headers, *make_request())
+            latencies.append(elapsed * 1000)
+            queries.append(count)
+    finally:
+        gc.enable()
+
+    allocations = []
+    tracemalloc.start()
+    try:
+        for _ in range(memory_rounds):
+            call = make_request()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            request(client, headers, *call)
+            allocations.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries": int(statistics.median(queries)),
+        "alloc_kb": round(statistics.median(allocations), 1),
+    }
+
+
+def compare(results: dict, baseline: dict, metrics=tuple(TOLERANCES)) -> List[str]:
+    """Metrics worse than the baseline beyond tolerance, as readable lines."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in metrics:
+            tolerance = TOLERANCES[metric]
+            if metric not in previous:
+                continue
+            limit = max(previous[metric] * (1 + tolerance), previous[metric] + ABSOLUTE_SLACK[metric])
+            if current[metric] > limit:
+                regressions.append(
+                    f"{name}.{metric}: {current[metric]} > {previous[metric]} (+{tolerance:.0%} tolerance)"
+                )
+    return regressions
+
+
+def print_results(results: dict, baseline: dict) -> None:
+    print(f"{'scenario':<22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'alloc KB':>9}  vs baseline p50")
+    for name, m in results.items():
+        previous = baseline.get(name)
+        change = ""
+        if previous and previous["p50_ms"]:
+            change = f"{(m['p50_ms'] - previous['p50_ms']) / previous['p50_ms']:+.0%}"
+        print(
+            f"{name:<22} {m['p50_ms']:>9} {m['p95_ms']:>9} {m['p99_ms']:>9} "
+            f"{m['queries']:>8} {m['alloc_kb']:>9}  {change}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--rounds", type=int, default=200, help="Timed requests per scenario")
+    parser.add_argument("--memory-rounds", type=int, default=5, help="Traced requests per scenario")
+    parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "crm-benchmarks"),
+                        help="Where generated databases are kept between runs")
+    parser.add_argument("--fresh", action="store_true", help="Regenerate the database")
+    parser.add_argument("--baseline", help="Baseline file (default benchmarks/baselines/<size>.json)")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    source = database_file(args.size, args.data_dir, args.fresh)
+    work_dir = tempfile.mkdtemp(prefix="api-bench-")
+    database = os.path.join(work_dir, "app.db")
+    shutil.copyfile(source, database)
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+
+    from fastapi.testclient import TestClient
+    from app.logger import logger
+    from app.main import app
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.size}.json")
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)["scenarios"]
+
+    logger.handlers, saved_handlers = [logging.NullHandler()], logger.handlers
+    try:
+        with TestClient(app) as client:
+            token = client.post("/api/auth/login", json={"username": "admin", "password": "admin123"}).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+            scenarios = Scenarios(record_ids(args.rounds), random.Random(SEED)).all()
+            selected = args.scenario or list(scenarios)
+            results = {}
+            for name in selected:
+                results[name] = run_scenario(client, headers, scenarios[name], args.rounds, args.memory_rounds)
+
+            # A latency regression has to show up twice; query counts and
+            # allocations are deterministic and need no second run
+            if not args.update_baseline:
+                for name in {line.split(".", 1)[0] for line in compare(results, baseline, LATENCY_METRICS)}:
+                    rerun = run_scenario(client, headers, scenarios[name], args.rounds, args.memory_rounds)
+                    for metric in LATENCY_METRICS:
+                        results[name][metric] = min(results[name][metric], rerun[metric])
+    finally:
+        logger.handlers = saved_handlers
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"size={args.size} rounds={args.rounds}")
+    print_results(results, baseline)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        merged = {**baseline, **results}
+        with open(baseline_path, "w") as f:
+            json.dump({"size": args.size, "rows": SIZES[args.size], "scenarios": merged}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {baseline_path}")
+        return 0
+
+    if not baseline:
+        print(f"No baseline at {baseline_path}; run with --update-baseline to create one")
+        return 0
+    regressions = compare(results, baseline)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Size and latency of compressed lead list pages.
+Run with: python -m benchmarks.compression
+
+For the default and maximum page sizes, reports the encoded size and the
+compression time for each encoding, plus the time to deliver the page
+(compression + transfer) over a few typical links.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import schemas
+from app.compression import compress
+from app.responses import ORJSONResponse, paginate
+from app.routes.leads import lead_to_response
+from benchmarks.serialization import build_leads
+
+PAGE_SIZES = (25, 100)
+ROUNDS = 200
+
+# Link speeds in Mbit/s
+LINKS = (("3G", 1.5), ("DSL", 10), ("LAN", 100))
+
+
+def page_body(leads, page_size: int) -> bytes:
+    items = [lead_to_response(l) for l in leads[:page_size]]
+    return ORJSONResponse(paginate(schemas.LeadPage, items, len(leads), 1, page_size)).body
+
+
+def main():
+    leads = build_leads()
+    header = f"{'page':>5} {'encoding':<9} {'bytes':>8} {'ratio':>6} {'compress':>10}"
+    header += "".join(f" {name:>9}" for name, _ in LINKS)
+    print(header)
+
+    for page_size in PAGE_SIZES:
+        body = page_body(leads, page_size)
+        for encoding in ("identity", "gzip", "br"):
+            if encoding == "identity":
+                size, seconds = len(body), 0.0
+            else:
+                size = len(compress(body, encoding))
+                seconds = min(timeit.repeat(lambda: compress(body, encoding), number=ROUNDS, repeat=5)) / ROUNDS
+
+            row = f"{page_size:>5} {encoding:<9} {size:>8} {len(body) / size:>5.1f}x {seconds * 1000:>7.3f} ms"
+            for _, mbits in LINKS:
+                total = seconds + size * 8 / (mbits * 1_000_000)
+                row += f" {total * 1000:>6.1f} ms"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Requests per second with and without the request logging middleware.
+Run with: python -m benchmarks.middleware
+
+Requests are driven straight through the ASGI interface (no sockets) against
+a minimal app, so the numbers isolate middleware overhead. Log records are
+sent to a NullHandler instead of logs/app.log.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.logger import log_action, logger
+from app.middleware import RequestLoggingMiddleware, request_user
+
+REQUESTS = 5000
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.get("/api/stream")
+    async def stream():
+        return StreamingResponse(iter([b"chunk"] * 10), media_type="text/plain")
+
+    return app
+
+
+def with_legacy_middleware(app: FastAPI) -> FastAPI:
+    # The @app.middleware("http") implementation this replaced
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = time.time()
+        user = request_user(request.headers)
+        log_action(action_type="API_REQUEST", user=user, details=f"{request.method} {request.url.path}", status="pending")
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        log_action(
+            action_type="API_RESPONSE",
+            user=user,
+            details=f"{request.method} {request.url.path} | Status: {response.status_code} | Time: {process_time:.2f}s",
+            status="success"
+        )
+        return response
+
+    return app
+
+
+async def drive(app, path: str, count: int) -> float:
+    # spec_version 2.4 keeps StreamingResponse from polling receive() for a
+    # disconnect, which this loop never sends
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    logger.handlers, saved = [logging.NullHandler()], logger.handlers
+    try:
+        variants = [
+            ("no middleware", build_app()),
+            ("@app.middleware('http')", with_legacy_middleware(build_app())),
+            ("RequestLoggingMiddleware", RequestLoggingMiddleware(build_app())),
+        ]
+        for path in ("/api/ping", "/api/stream"):
+            print(path)
+            for name, app in variants:
+                asyncio.run(drive(app, path, 200))  # warm up
+                rate = asyncio.run(drive(app, path, REQUESTS))
+                print(f"  {name:<26} {rate:>9.0f} req/s")
+    finally:
+        logger.handlers = saved
+
+
+if __name__ == "__main__":
+    main()
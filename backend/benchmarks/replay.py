@@ -0,0 +1,285 @@
+"""
+Replay the request mix recorded in logs/app.log.
+Run with: python -m benchmarks.replay [--log logs/app.log] [--speed 0] [--url http://localhost:8000]
+
+Parses the API_RESPONSE lines of the log and its rotated files (app.log.5 ...
+app.log.1, app.log), keeps their order and spacing, and replays them either
+in-process against a fresh database seeded by seed.py, or against a running
+instance with --url. Reports throughput and latency percentiles per route
+next to the latencies recorded in the log.
+
+The log has no query strings or bodies, so only GETs are replayed by default;
+other methods are counted as skipped. Record ids in detail paths are mapped
+onto ids that exist in the target database. Each logged user is replayed as
+the seeded user of the same name, falling back to admin.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+LOG_LINE = re.compile(
+    r"^\[(?P<timestamp>[\d-]+ [\d:]+)\] \w+ \| ACTION: API_RESPONSE \| USER: (?P<user>[^|]+?) \| "
+    r"DETAILS: (?P<method>[A-Z]+) (?P<path>\S+) \| Status: (?P<status>\d+) \| Time: (?P<time>[\d.]+)s"
+)
+RECORD_PATH = re.compile(r"^/api/(accounts|contacts|leads|opportunities|cases)/(\d+)(/.*)?$")
+NUMBER_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# Password of every seeded user (seed.py)
+SEED_PASSWORDS = {"admin": "admin123"}
+DEFAULT_PASSWORD = "password123"
+
+
+@dataclass
+class LoggedRequest:
+    offset: float
+    user: str
+    method: str
+    path: str
+    status: int
+    recorded: float
+
+
+def log_files(path: str) -> List[str]:
+    """The log and its rotations, oldest first."""
+    rotated = sorted(
+        glob.glob(f"{path}.[0-9]*"),
+        key=lambda name: int(name.rsplit(".", 1)[1]),
+        reverse=True
+    )
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def parse_log(path: str) -> List[LoggedRequest]:
+    requests = []
+    start: Optional[datetime] = None
+    for filename in log_files(path):
+        with open(filename, errors="replace") as f:
+            for line in f:
+                match = LOG_LINE.match(line)
+                if not match:
+                    continue
+                timestamp = datetime.strptime(match["timestamp"], "%Y-%m-%d %H:%M:%S")
+                start = start or timestamp
+                requests.append(LoggedRequest(
+                    offset=(timestamp - start).total_seconds(),
+                    user=match["user"],
+                    method=match["method"],
+                    path=match["path"],
+                    status=int(match["status"]),
+                    recorded=float(match["time"])
+                ))
+    return requests
+
+
+def route_of(path: str) -> str:
+    return NUMBER_SEGMENT.sub("/{id}", path)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def compress_gaps(requests: List[LoggedRequest], max_gap: float) -> None:
+    """Cap idle gaps (overnight, between sessions) so a replay doesn't sleep through them."""
+    shift = 0.0
+    previous = 0.0
+    for request in requests:
+        gap = request.offset - previous
+        previous = request.offset
+        if gap > max_gap:
+            shift += gap - max_gap
+        request.offset -= shift
+
+
+def seed_database() -> str:
+    """Point the app at a fresh SQLite file and seed it with seed.py."""
+    path = os.path.join(tempfile.mkdtemp(prefix="replay-"), "app.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    import seed
+    seed.seed_database()
+    return path
+
+
+def record_ids() -> Dict[str, List[int]]:
+    from app.database import SessionLocal
+    from app.db_models import Account, Case, Contact, Lead, Opportunity
+
+    db = SessionLocal()
+    try:
+        return {
+            table: [row[0] for row in db.query(model.id).order_by(model.id)]
+            for table, model in (
+                ("accounts", Account), ("contacts", Contact), ("leads", Lead),
+                ("opportunities", Opportunity), ("cases", Case)
+            )
+        }
+    finally:
+        db.close()
+
+
+def remap_path(path: str, ids: Dict[str, List[int]]) -> str:
+    match = RECORD_PATH.match(path)
+    if not match or not ids.get(match[1]):
+        return path
+    table, record_id, rest = match[1], int(match[2]), match[3] or ""
+    existing = ids[table]
+    return f"/api/{table}/{existing[record_id % len(existing)]}{rest}"
+
+
+async def login(client: httpx.AsyncClient, user: str) -> Optional[str]:
+    response = await client.post("/api/auth/login", json={
+        "username": user,
+        "password": SEED_PASSWORDS.get(user, DEFAULT_PASSWORD)
+    })
+    if response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+async def replay(client: httpx.AsyncClient, requests: List[LoggedRequest], speed: float,
+                 concurrency: int, ids: Dict[str, List[int]]) -> dict:
+    tokens: Dict[str, Optional[str]] = {}
+    for user in {r.user for r in requests if r.user != "anonymous"}:
+        tokens[user] = await login(client, user) or tokens.get("admin") or await login(client, "admin")
+
+    results = defaultdict(lambda: {"latencies": [], "recorded": [], "errors": 0, "statuses": defaultdict(int)})
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def run(request: LoggedRequest):
+        if speed > 0:
+            delay = request.offset / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        headers = {}
+        token = tokens.get(request.user)
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        async with semaphore:
+            begin = time.perf_counter()
+            try:
+                response = await client.get(remap_path(request.path, ids), headers=headers)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            elapsed = time.perf_counter() - begin
+
+        stats = results[route_of(request.path)]
+        stats["latencies"].append(elapsed)
+        stats["recorded"].append(request.recorded)
+        stats["statuses"][status] += 1
+        if status == 0 or status >= 500:
+            stats["errors"] += 1
+
+    await asyncio.gather(*(run(r) for r in requests))
+    return {"duration": time.perf_counter() - started, "routes": results}
+
+
+def report(outcome: dict, skipped: Dict[str, int]) -> dict:
+    duration = outcome["duration"]
+    routes = {}
+    for route, stats in sorted(outcome["routes"].items()):
+        latencies = stats["latencies"]
+        routes[route] = {
+            "count": len(latencies),
+            "errors": stats["errors"],
+            "statuses": dict(stats["statuses"]),
+            "rps": round(len(latencies) / duration, 2) if duration else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2),
+            "recorded_p50_ms": round(percentile(stats["recorded"], 50) * 1000, 2),
+            "recorded_p95_ms": round(percentile(stats["recorded"], 95) * 1000, 2),
+        }
+    total = sum(r["count"] for r in routes.values())
+    return {
+        "requests": total,
+        "duration_s": round(duration, 3),
+        "rps": round(total / duration, 2) if duration else 0.0,
+        "skipped": skipped,
+        "routes": routes,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"{result['requests']} requests in {result['duration_s']}s ({result['rps']} req/s)")
+    print(f"{'route':<40} {'count':>6} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'log p50':>8} {'log p95':>8}")
+    for route, r in result["routes"].items():
+        print(
+            f"{route[:40]:<40} {r['count']:>6} {r['errors']:>4} {r['rps']:>8} {r['p50_ms']:>8} "
+            f"{r['p95_ms']:>8} {r['p99_ms']:>8} {r['recorded_p50_ms']:>8} {r['recorded_p95_ms']:>8}"
+        )
+    if result["skipped"]:
+        print("skipped (not GET): " + ", ".join(f"{k} x{v}" for k, v in sorted(result["skipped"].items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default=os.path.join(BACKEND_DIR, "logs", "app.log"))
+    parser.add_argument("--url", help="Replay against a running instance instead of in-process")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Pacing multiplier: 1 = recorded pace, 10 = ten times faster, 0 = as fast as possible")
+    parser.add_argument("--max-gap", type=float, default=5.0, help="Longest idle gap kept, in recorded seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    logged = parse_log(args.log)
+    replayable = [r for r in logged if r.method == "GET"]
+    skipped = defaultdict(int)
+    for r in logged:
+        if r.method != "GET":
+            skipped[f"{r.method} {route_of(r.path)}"] += 1
+    replayable = replayable[:args.limit] if args.limit else replayable
+    compress_gaps(replayable, args.max_gap)
+
+    async def run():
+        if args.url:
+            async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+                return await replay(client, replayable, args.speed, args.concurrency, {})
+
+        seed_database()
+        from app.main import app
+        from app.user_directory import directory
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            directory.load(db)
+        finally:
+            db.close()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            return await replay(client, replayable, args.speed, args.concurrency, record_ids())
+
+    result = report(asyncio.run(run()), dict(skipped))
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Serialization cost of a 100-item lead page.
+Run with: python -m benchmarks.serialization
+
+Compares the previous path (validated response models re-validated against
+response_model and encoded by FastAPI) with the constructed models rendered by
+ORJSONResponse.
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app import schemas
+from app.db_models import Lead, User
+from app.responses import ORJSONResponse, paginate
+from app.routes.leads import lead_to_response
+
+PAGE_SIZE = 100
+ROUNDS = 200
+
+
+def build_leads():
+    owner = User(id=1, username="stalin", first_name="Stalin", last_name="Johnson")
+    now = datetime.utcnow()
+    return [
+        Lead(
+            id=i,
+            first_name="Alex",
+            last_name=f"Martinez {i}",
+            company="StartupX",
+            title="Founder",
+            phone="555-2001",
+            email=f"alex{i}@startupx.com",
+            status="New",
+            score=i % 100,
+            region="EMEA",
+            source="Web",
+            description="Met at the conference, interested in the enterprise tier. " * 4,
+            owner_id=1,
+            owner=owner,
+            is_converted=False,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(PAGE_SIZE)
+    ]
+
+
+def validated_response(lead) -> schemas.LeadResponse:
+    return schemas.LeadResponse(**lead_to_response(lead).model_dump())
+
+
+def legacy_path(leads, adapter):
+    # Hand-built, validated items, re-validated by FastAPI against response_model
+    page = schemas.PaginatedResponse(
+        items=[validated_response(l) for l in leads],
+        total=len(leads),
+        page=1,
+        page_size=PAGE_SIZE,
+        pages=1
+    )
+    value = adapter.validate_python(page.model_dump())
+    return JSONResponse(jsonable_encoder(value)).body
+
+
+def fast_path(leads):
+    items = [lead_to_response(l) for l in leads]
+    return ORJSONResponse(paginate(schemas.LeadPage, items, len(leads), 1, PAGE_SIZE)).body
+
+
+def main():
+    leads = build_leads()
+    adapter = TypeAdapter(schemas.PaginatedResponse)
+
+    for name, fn in [
+        ("validated + jsonable_encoder", lambda: legacy_path(leads, adapter)),
+        ("model_construct + orjson", lambda: fast_path(leads)),
+    ]:
+        best = min(timeit.repeat(fn, number=ROUNDS, repeat=5)) / ROUNDS
+        print(f"{name:<30} {best * 1000:8.3f} ms/page  {len(fn()):>7} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Python-side cost of the hot lookups: legacy Query vs prebuilt statements.
+Run with: python -m benchmarks.statements [--rounds 2000]
+
+Runs each query against a tiny in-memory database, so the time is almost all
+statement construction, cache key generation and result processing rather
+than SQLite. "query" rebuilds the statement through db.query() on every call
+the way crud.py and auth.py used to; "prebuilt" executes the module-level
+statements they use now.
+
+lambda_stmt was tried for the conditional case counts and came out slower
+than the legacy Query (each call re-analyzes the chained lambdas' closures),
+so statements with optional criteria are prebuilt once per shape instead.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, desc, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud
+from app import db_models as models
+from app.auth import USER_BY_ID, USER_BY_USERNAME
+from app.database import Base
+
+
+def setup_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    db.add(models.User(id=1, username="bench", email="bench@example.com", password_hash="x", role="user"))
+    db.add_all(
+        models.RecentRecord(user_id=1, record_type="lead", record_id=i, record_name=f"Lead {i}")
+        for i in range(10)
+    )
+    db.add_all(
+        models.Activity(record_type="lead", record_id=1, activity_type="Call", subject=f"Call {i}", created_by=1)
+        for i in range(10)
+    )
+    db.add(models.Case(case_number="CS-1", subject="Broken", priority="High", status="New", owner_id=1))
+    db.commit()
+    return db
+
+
+def scenarios(db):
+    # (name, legacy Query path, current path)
+    return [
+        (
+            "user_by_id",
+            lambda: db.query(models.User).filter(models.User.id == 1).first(),
+            lambda: db.scalars(USER_BY_ID, {"user_id": 1}).first(),
+        ),
+        (
+            "user_by_username",
+            lambda: db.query(models.User).filter(models.User.username == "bench").first(),
+            lambda: db.scalars(USER_BY_USERNAME, {"username": "bench"}).first(),
+        ),
+        (
+            "recent_records",
+            lambda: db.query(models.RecentRecord).filter(models.RecentRecord.user_id == 1)
+            .order_by(desc(models.RecentRecord.accessed_at)).limit(10).all(),
+            lambda: crud.get_recent_records(db, 1),
+        ),
+        (
+            "activities",
+            lambda: db.query(models.Activity).filter(
+                models.Activity.record_type == "lead", models.Activity.record_id == 1
+            ).order_by(desc(models.Activity.created_at)).offset(0).limit(50).all(),
+            lambda: crud.get_activities(db, "lead", 1),
+        ),
+        (
+            "cases_by_priority",
+            lambda: db.query(models.Case.priority, func.count(models.Case.id))
+            .filter(models.Case.status != "Closed").filter(models.Case.owner_id == 1)
+            .group_by(models.Case.priority).all(),
+            lambda: crud.get_cases_by_priority(db, owner_id=1),
+        ),
+        (
+            "global_search",
+            lambda: [
+                db.query(model).filter(column.ilike("%zz%")).limit(5).all()
+                for model, column in (
+                    (models.Contact, models.Contact.last_name), (models.Account, models.Account.name),
+                    (models.Lead, models.Lead.last_name), (models.Opportunity, models.Opportunity.name),
+                    (models.Case, models.Case.subject),
+                )
+            ],
+            lambda: crud.global_search(db, "zz"),
+        ),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    db = setup_session()
+    print(f"{'query':<20} {'query us':>10} {'prebuilt us':>12} {'saved':>7}")
+    results = {}
+    for name, legacy, current in scenarios(db):
+        # Warm both paths so the compiled cache is populated
+        legacy(), current()
+        legacy_us = min(timeit.repeat(legacy, number=args.rounds, repeat=3)) / args.rounds * 1e6
+        current_us = min(timeit.repeat(current, number=args.rounds, repeat=3)) / args.rounds * 1e6
+        results[name] = (legacy_us, current_us)
+        print(f"{name:<20} {legacy_us:>10.1f} {current_us:>12.1f} {1 - current_us / legacy_us:>7.0%}")
+    db.close()
+    return results
+
+
+if __name__ == "__main__":
+    main()
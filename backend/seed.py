@@ -1,17 +1,38 @@
 """
 Seed script to populate the database with demo data.
 Run with: python seed.py
+
+For performance work it also generates production-sized data on top of the
+demo data, e.g.:
+
+    python seed.py --leads 2000000 --accounts 200000 --contacts 800000 \
+        --opportunities 400000 --cases 600000 --activities-per-record 2 --workers 4
+
+Rows are written with bulk Core inserts, one transaction per table, and follow
+skewed distributions: a few owners hold most records, big accounts have most
+contacts, and activities fan out unevenly per record. Every chunk of rows is
+generated from its own random seed derived from --seed, so the same arguments
+produce the same data whatever the number of --workers. Workers only generate
+rows; the parent process writes them, since SQLite allows a single writer.
 """
+import argparse
+import math
 import os
 import sys
+import time
+from bisect import bisect
+from itertools import accumulate
+from multiprocessing import Pool
 
 # Add the app directory to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.database import engine, SessionLocal, Base
-from app.db_models import User, Account, Contact, Lead, Opportunity, Case
+from app.db_models import User, Account, Contact, Lead, Opportunity, Case, Activity
 from app.auth import get_password_hash
+from app.record_cache import RECORD_TYPES, bump_table_version
 from datetime import datetime, timedelta
+from sqlalchemy import func
 import random
 
 
@@ -184,5 +205,446 @@ def seed_database():
         db.close()
 
 
-if __name__ == "__main__":
+DEFAULT_BATCH_SIZE = 20000
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Priya", "Wei",
+    "Carlos", "Fatima", "Arjun", "Yuki", "Olga", "Kwame", "Lucia", "Ahmed", "Ingrid", "Mateo",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Patel", "Nguyen", "Kim", "Chen", "Singh", "Kowalski", "Okafor", "Tanaka", "Schmidt",
+]
+COMPANY_WORDS = [
+    "Acme", "Global", "Summit", "Blue", "Pioneer", "Apex", "Northern", "Silver", "Vertex", "Bright",
+    "Quantum", "Harbor", "Evergreen", "Atlas", "Nova", "Redwood", "Crescent", "Falcon", "Horizon", "Iron",
+]
+COMPANY_NOUNS = [
+    "Systems", "Industries", "Logistics", "Health", "Financial", "Foods", "Energy", "Software", "Labs", "Retail",
+    "Media", "Motors", "Capital", "Networks", "Pharma", "Analytics", "Partners", "Robotics", "Textiles", "Foundry",
+]
+COMPANY_SUFFIXES = ["Inc", "Ltd", "LLC", "Corp", "GmbH", "Group", "Co"]
+INDUSTRIES = ["Technology", "Manufacturing", "Healthcare", "Finance", "Retail", "Energy", "Education", "Media"]
+TITLES = ["CEO", "CFO", "CTO", "VP Sales", "Director", "Manager", "Engineer", "Analyst", "Buyer", "Consultant"]
+REGIONS = ["North America", "EMEA", "APAC", "LATAM"]
+SOURCES = ["Web", "Referral", "Trade Show", "Cold Call", "Partner", "Advertisement"]
+ACTIVITY_TYPES = ["call", "email", "meeting", "note", "task"]
+
+# (value, weight) mixes
+LEAD_STATUSES = [("New", 35), ("Contacted", 25), ("Qualified", 15), ("Unqualified", 15), ("Converted", 10)]
+STAGES = [
+    ("Prospecting", 25), ("Qualification", 20), ("Needs Analysis", 15), ("Proposal", 12),
+    ("Negotiation", 8), ("Closed Won", 10), ("Closed Lost", 10),
+]
+STAGE_PROBABILITY = {
+    "Prospecting": 10, "Qualification": 20, "Needs Analysis": 40, "Proposal": 60,
+    "Negotiation": 80, "Closed Won": 100, "Closed Lost": 0,
+}
+CASE_PRIORITIES = [("Low", 30), ("Medium", 45), ("High", 20), ("Critical", 5)]
+CASE_STATUSES = [("New", 20), ("Working", 30), ("Escalated", 5), ("Closed", 45)]
+SLA_HOURS = {"Low": 48, "Medium": 24, "High": 8, "Critical": 4}
+REGION_WEIGHTS = [45, 30, 15, 10]
+SOURCE_WEIGHTS = [35, 20, 15, 10, 12, 8]
+
+
+def _mix(weighted):
+    values, weights = zip(*weighted)
+    return list(values), list(accumulate(weights))
+
+
+def _pick(rng, mix):
+    values, cum_weights = mix
+    return values[bisect(cum_weights, rng.random() * cum_weights[-1])]
+
+
+def _skewed(rng, n, power=2.0):
+    """Index in range(n) biased towards the front: low indices are the big accounts/contacts."""
+    return min(n - 1, int(n * rng.random() ** power))
+
+
+def _uniform(value):
+    # Cheap stable hash of an id onto [0, 1)
+    return ((value * 2654435761) % 4294967296) / 4294967296
+
+
+def account_name(account_id):
+    return (
+        f"{COMPANY_WORDS[account_id % 20]} {COMPANY_NOUNS[account_id // 20 % 20]} "
+        f"{COMPANY_SUFFIXES[account_id // 400 % 7]} {account_id}"
+    )
+
+
+def contact_names(contact_id):
+    return FIRST_NAMES[contact_id * 7 % 30], LAST_NAMES[contact_id * 13 // 30 % 30]
+
+
+def contact_account(contact_id, ctx):
+    """Account of a generated contact; a function of its id so cases can reuse it."""
+    first, count = ctx["accounts"]
+    if not count:
+        return None
+    return first + min(count - 1, int(count * _uniform(contact_id) ** 2))
+
+
+def _created_at(rng, ctx):
+    # Newer records are more common, as in a growing org
+    return ctx["now"] - timedelta(seconds=int(ctx["days"] * 86400 * rng.random() ** 1.5))
+
+
+def _owner(rng, ctx):
+    owners, cum_weights = ctx["owners"]
+    return owners[bisect(cum_weights, rng.random() * cum_weights[-1])]
+
+
+def _account_rows(rng, ids, ctx):
+    rows = []
+    for account_id in ids:
+        owner_id, alias = _owner(rng, ctx)
+        created_at = _created_at(rng, ctx)
+        rows.append({
+            "id": account_id,
+            "name": account_name(account_id),
+            "phone": f"555-{rng.randrange(10000):04d}",
+            "website": f"www.account{account_id}.example.com",
+            "industry": rng.choice(INDUSTRIES),
+            "description": None,
+            "billing_address": None,
+            "owner_id": owner_id,
+            "owner_alias": alias,
+            "created_at": created_at,
+            "updated_at": None,
+        })
+    return rows
+
+
+def _contact_rows(rng, ids, ctx):
+    rows = []
+    for contact_id in ids:
+        owner_id, alias = _owner(rng, ctx)
+        first_name, last_name = contact_names(contact_id)
+        account_id = contact_account(contact_id, ctx)
+        rows.append({
+            "id": contact_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "account_id": account_id,
+            "account_name": account_name(account_id) if account_id else None,
+            "title": rng.choice(TITLES),
+            "phone": f"555-{rng.randrange(10000):04d}",
+            "email": f"{first_name.lower()}.{last_name.lower()}{contact_id}@example.com",
+            "mailing_address": None,
+            "owner_id": owner_id,
+            "owner_alias": alias,
+            "created_at": _created_at(rng, ctx),
+            "updated_at": None,
+        })
+    return rows
+
+
+def _lead_rows(rng, ids, ctx):
+    rows = []
+    for lead_id in ids:
+        owner_id, alias = _owner(rng, ctx)
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        status = _pick(rng, ctx["lead_statuses"])
+        rows.append({
+            "id": lead_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "company": f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_NOUNS)}",
+            "title": rng.choice(TITLES),
+            "phone": f"555-{rng.randrange(10000):04d}",
+            "email": f"{first_name.lower()}.{last_name.lower()}{lead_id}@example.com",
+            "status": status,
+            # Triangular: most leads score in the middle
+            "score": int(rng.triangular(0, 100, 55)),
+            "region": _pick(rng, ctx["regions"]),
+            "source": _pick(rng, ctx["sources"]),
+            "description": None,
+            "owner_id": owner_id,
+            "owner_alias": alias,
+            "is_converted": status == "Converted",
+            "converted_account_id": None,
+            "converted_contact_id": None,
+            "converted_opportunity_id": None,
+            "created_at": _created_at(rng, ctx),
+            "updated_at": None,
+        })
+    return rows
+
+
+def _opportunity_rows(rng, ids, ctx):
+    first, count = ctx["accounts"]
+    rows = []
+    for opportunity_id in ids:
+        owner_id, alias = _owner(rng, ctx)
+        account_id = first + _skewed(rng, count) if count else None
+        stage = _pick(rng, ctx["stages"])
+        created_at = _created_at(rng, ctx)
+        rows.append({
+            "id": opportunity_id,
+            "name": f"Opportunity {opportunity_id}",
+            "account_id": account_id,
+            "account_name": account_name(account_id) if account_id else None,
+            # Log-normal deal sizes: many small deals, a long tail of big ones
+            "amount": round(rng.lognormvariate(10, 1.2), 2),
+            "stage": stage,
+            "probability": STAGE_PROBABILITY[stage],
+            "close_date": created_at + timedelta(days=rng.randint(14, 180)),
+            "description": None,
+            "owner_id": owner_id,
+            "owner_alias": alias,
+            "created_at": created_at,
+            "updated_at": None,
+        })
+    return rows
+
+
+def _case_rows(rng, ids, ctx):
+    first, count = ctx["contacts"]
+    rows = []
+    for case_id in ids:
+        owner_id, alias = _owner(rng, ctx)
+        contact_id = first + _skewed(rng, count) if count else None
+        account_id = contact_account(contact_id, ctx) if contact_id else None
+        priority = _pick(rng, ctx["case_priorities"])
+        status = _pick(rng, ctx["case_statuses"])
+        created_at = _created_at(rng, ctx)
+        escalated = status == "Escalated"
+        rows.append({
+            "id": case_id,
+            "case_number": f"CS-{case_id:08X}",
+            "subject": f"Case {case_id}",
+            "description": None,
+            "status": status,
+            "priority": priority,
+            "account_id": account_id,
+            "account_name": account_name(account_id) if account_id else None,
+            "contact_id": contact_id,
+            "contact_name": " ".join(contact_names(contact_id)) if contact_id else None,
+            "owner_id": owner_id,
+            "owner_alias": alias,
+            "is_escalated": escalated,
+            "escalated_at": created_at + timedelta(hours=rng.randint(1, 72)) if escalated else None,
+            "sla_due_date": created_at + timedelta(hours=SLA_HOURS[priority]),
+            "created_at": created_at,
+            "updated_at": None,
+        })
+    return rows
+
+
+def _activity_rows(rng, ids, ctx, record_type):
+    """Activities for a chunk of records; the count per record is geometric with the requested mean."""
+    mean = ctx["activities_per_record"]
+    if mean <= 0:
+        return []
+    # Failures before the first success, P(success) = 1 / (mean + 1)
+    log_q = math.log(1 - 1 / (mean + 1))
+    rows = []
+    for record_id in ids:
+        for _ in range(int(math.log(1 - rng.random()) / log_q)):
+            user_id, _alias = _owner(rng, ctx)
+            activity_type = rng.choice(ACTIVITY_TYPES)
+            rows.append({
+                "record_type": record_type,
+                "record_id": record_id,
+                "activity_type": activity_type,
+                "subject": f"{activity_type.title()} about {record_type} {record_id}",
+                "details": None,
+                "created_by": user_id,
+                "created_at": _created_at(rng, ctx),
+            })
+    return rows
+
+
+GENERATORS = {
+    "accounts": _account_rows,
+    "contacts": _contact_rows,
+    "leads": _lead_rows,
+    "opportunities": _opportunity_rows,
+    "cases": _case_rows,
+}
+MODELS = {"accounts": Account, "contacts": Contact, "leads": Lead, "opportunities": Opportunity, "cases": Case}
+ACTIVITY_RECORD_TYPES = {
+    "accounts": "account", "contacts": "contact", "leads": "lead",
+    "opportunities": "opportunity", "cases": "case",
+}
+
+_worker_ctx = None
+
+
+def _init_worker(ctx):
+    global _worker_ctx
+    _worker_ctx = ctx
+
+
+def _generate_chunk(task):
+    """Rows of one chunk, from a random seed of its own so output doesn't depend on scheduling."""
+    table, chunk, first_id, count = task
+    rng = random.Random(f"{_worker_ctx['seed']}:{table}:{chunk}")
+    ids = range(first_id, first_id + count)
+    if table.startswith("activities:"):
+        parent = table.split(":", 1)[1]
+        return table, _activity_rows(rng, ids, _worker_ctx, ACTIVITY_RECORD_TYPES[parent])
+    return table, GENERATORS[table](rng, ids, _worker_ctx)
+
+
+def _ensure_users(db, count):
+    """Owners for generated records: the demo sales reps plus generated ones up to ``count``."""
+    owners = db.query(User).filter(User.role == "user").order_by(User.id).all()
+    if len(owners) < count:
+        password_hash = get_password_hash("password123")
+        rng = random.Random("users")
+        for n in range(len(owners) + 1, count + 1):
+            db.add(User(
+                username=f"rep{n:04d}",
+                email=f"rep{n:04d}@example.com",
+                password_hash=password_hash,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                role="user"
+            ))
+        db.commit()
+        owners = db.query(User).filter(User.role == "user").order_by(User.id).all()
+    return owners
+
+
+def generate(counts, users=50, activities_per_record=0.0, seed=42, workers=1,
+             batch_size=DEFAULT_BATCH_SIZE, days=730):
+    """Bulk-insert generated records on top of the demo data.
+
+    ``counts`` maps table name ("accounts", "leads", ...) to the number of rows
+    to add. Ids continue after the current maximum of each table.
+    """
     seed_database()
+    db = SessionLocal()
+    try:
+        owners = _ensure_users(db, users)
+        first_ids = {
+            table: (db.query(func.max(model.id)).scalar() or 0) + 1
+            for table, model in MODELS.items()
+        }
+    finally:
+        db.close()
+
+    # Zipf-like owner skew: the top rep owns several times what the median one does
+    owner_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(owners))))
+    ctx = {
+        "seed": seed,
+        "now": datetime.utcnow(),
+        "days": days,
+        "activities_per_record": activities_per_record,
+        "owners": ([(u.id, u.alias) for u in owners], owner_weights),
+        "accounts": (first_ids["accounts"], counts.get("accounts", 0)),
+        "contacts": (first_ids["contacts"], counts.get("contacts", 0)),
+        "lead_statuses": _mix(LEAD_STATUSES),
+        "stages": _mix(STAGES),
+        "case_priorities": _mix(CASE_PRIORITIES),
+        "case_statuses": _mix(CASE_STATUSES),
+        "regions": (REGIONS, list(accumulate(REGION_WEIGHTS))),
+        "sources": (SOURCES, list(accumulate(SOURCE_WEIGHTS))),
+    }
+
+    tasks = []
+    for table in MODELS:
+        count = counts.get(table, 0)
+        for chunk, offset in enumerate(range(0, count, batch_size)):
+            tasks.append((table, chunk, first_ids[table] + offset, min(batch_size, count - offset)))
+    if activities_per_record > 0:
+        for table in MODELS:
+            count = counts.get(table, 0)
+            for chunk, offset in enumerate(range(0, count, batch_size)):
+                tasks.append((f"activities:{table}", chunk, first_ids[table] + offset, min(batch_size, count - offset)))
+
+    tables = {name: model.__table__ for name, model in MODELS.items()}
+    activities = Activity.__table__
+    written = {}
+    started = time.perf_counter()
+
+    if workers > 1:
+        pool = Pool(workers, initializer=_init_worker, initargs=(ctx,))
+        chunks = pool.imap(_generate_chunk, tasks)
+    else:
+        pool = None
+        _init_worker(ctx)
+        chunks = map(_generate_chunk, tasks)
+
+    try:
+        with engine.connect() as conn:
+            if engine.dialect.name == "sqlite":
+                # Generated data can be regenerated; skip fsyncs during the load
+                conn.exec_driver_sql("PRAGMA synchronous = OFF")
+                conn.commit()
+            current = None
+            for table, rows in chunks:
+                if table != current:
+                    # One transaction per table
+                    if current is not None:
+                        conn.commit()
+                        _report(current, written[current], started)
+                    current = table
+                    written[table] = 0
+                if rows:
+                    target = activities if table.startswith("activities:") else tables[table]
+                    conn.execute(target.insert(), rows)
+                written[table] += len(rows)
+            if current is not None:
+                conn.commit()
+                _report(current, written[current], started)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Running servers cache list ETags per record type
+    db = SessionLocal()
+    try:
+        for table in MODELS:
+            if counts.get(table):
+                bump_table_version(db, RECORD_TYPES[MODELS[table]])
+        db.commit()
+    finally:
+        db.close()
+
+    total = sum(written.values())
+    elapsed = time.perf_counter() - started
+    print(f"Generated {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    return written
+
+
+def _report(table, rows, started):
+    print(f"  {table:<28} {rows:>10} rows  {time.perf_counter() - started:8.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the database with demo data and, optionally, generated records.")
+    for table in MODELS:
+        parser.add_argument(f"--{table}", type=int, default=0, metavar="N", help=f"Generate N {table}")
+    parser.add_argument("--users", type=int, default=50, help="Sales reps owning generated records (default 50)")
+    parser.add_argument("--activities-per-record", type=float, default=0.0, metavar="MEAN",
+                        help="Mean number of activities per generated record")
+    parser.add_argument("--days", type=int, default=730, help="Spread created_at over this many past days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="Processes generating rows")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per chunk and INSERT")
+    args = parser.parse_args(argv)
+
+    counts = {table: getattr(args, table) for table in MODELS}
+    if not any(counts.values()):
+        seed_database()
+        return
+    generate(
+        counts,
+        users=args.users,
+        activities_per_record=args.activities_per_record,
+        seed=args.seed,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        days=args.days
+    )
+
+
+if __name__ == "__main__":
+    main()
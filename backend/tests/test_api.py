@@ -1,13 +1,31 @@
+import gzip
+import json
+
+import brotli
 import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, update
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_write_db
 from app.auth import get_password_hash
-from app.db_models import User
+from app.db_models import Contact, Lead, User
+from app.user_directory import UserDirectory, directory
+from app.record_cache import RecordCache, bump_table_version, record_cache, table_version
+from app.compression import PrecompressedStaticFiles, precompress_directory
+from app.middleware import RequestLoggingMiddleware
+from app.metrics import MetricsMiddleware, registry
+from app.slow_queries import explain, full_scans, slow_query_log
+from app.profiling import profiler
+from app.sorting import SORT_KEYS, SORT_ORDERS
+from app.filters import compile_filter
+from app.listing import _statements, count_cache, list_records
+from app.write_queue import WriteQueue, write_queue
+from app import crud, schemas
 
 # Test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -17,7 +35,7 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def override_get_db():
@@ -29,11 +47,16 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_write_db] = override_get_db
+write_queue.session_factory = TestingSessionLocal
 
 
 @pytest.fixture(scope="function")
 def client():
     Base.metadata.create_all(bind=engine)
+    directory.invalidate()
+    record_cache.clear()
+    count_cache.clear()
     yield TestClient(app)
     Base.metadata.drop_all(bind=engine)
 
@@ -64,6 +87,15 @@ def auth_client(client):
     return client
 
 
+@pytest.fixture(scope="function")
+def admin_client(auth_client):
+    db = TestingSessionLocal()
+    db.query(User).filter(User.username == "testuser").update({"role": "admin"})
+    db.commit()
+    db.close()
+    return auth_client
+
+
 class TestHealth:
     def test_health_check(self, client):
         response = client.get("/api/health")
@@ -71,6 +103,83 @@ class TestHealth:
         assert response.json() == {"status": "healthy"}
 
 
+class TestRequestLogging:
+    def test_response_is_logged_with_status(self, auth_client, caplog):
+        with caplog.at_level("INFO", logger="salesforce_app"):
+            auth_client.get("/api/leads/999999")
+        responses = [r.message for r in caplog.records if "API_RESPONSE" in r.message]
+        assert responses
+        assert "USER: testuser" in responses[-1]
+        assert "GET /api/leads/999999 | Status: 404" in responses[-1]
+
+    def test_streaming_passes_through(self, caplog):
+        sent = []
+
+        async def chunks():
+            for i in range(3):
+                sent.append(i)
+                yield f"chunk{i};".encode()
+
+        stream_app = FastAPI()
+
+        @stream_app.get("/stream")
+        async def stream():
+            return StreamingResponse(chunks(), media_type="text/plain")
+
+        with caplog.at_level("INFO", logger="salesforce_app"):
+            response = TestClient(RequestLoggingMiddleware(stream_app)).get("/stream")
+        assert response.text == "chunk0;chunk1;chunk2;"
+        assert any("GET /stream | Status: 200" in r.message for r in caplog.records)
+
+
+class TestMetrics:
+    def test_requests_are_recorded_by_route_template(self, admin_client):
+        auth_client = admin_client
+        registry.clear()
+        lead_id = auth_client.post("/api/leads", json={"last_name": "Measured"}).json()["id"]
+        auth_client.get(f"/api/leads/{lead_id}")
+        auth_client.get("/api/leads/999999")
+
+        body = auth_client.get("/api/metrics").text
+        route = 'method="GET",route="/api/leads/{lead_id}"'
+        assert f"http_request_duration_seconds_count{{{route}}} 2" in body
+        assert f'http_request_duration_seconds_bucket{{{route},le="+Inf"}} 2' in body
+        assert f'http_responses_total{{{route},status="200"}} 1' in body
+        assert f'http_responses_total{{{route},status="404"}} 1' in body
+        assert f"/api/leads/{lead_id}" not in body
+
+        queries = next(line for line in body.splitlines() if line.startswith(f"db_queries_total{{{route}}}"))
+        assert int(queries.split()[-1]) > 0
+
+    def test_metrics_require_admin(self, auth_client):
+        assert TestClient(app).get("/api/metrics").status_code == 401
+        assert auth_client.get("/api/metrics").status_code == 403
+
+    def test_server_timing_header(self, auth_client):
+        timing = auth_client.get("/api/leads").headers["server-timing"]
+        assert timing.startswith("db;dur=")
+        assert "queries" in timing and "app;dur=" in timing
+
+    def test_repeated_statements_are_flagged(self, client, caplog):
+        registry.clear()
+        probe_app = FastAPI()
+
+        @probe_app.get("/owners")
+        def owners():
+            db = TestingSessionLocal()
+            try:
+                # One lookup per row: the N+1 pattern
+                return [db.get(User, user_id) is not None for user_id in range(1, 7)]
+            finally:
+                db.close()
+
+        with caplog.at_level("WARNING", logger="salesforce_app"):
+            response = TestClient(MetricsMiddleware(probe_app)).get("/owners")
+        assert 'desc="6 queries"' in response.headers["server-timing"]
+        assert any("N_PLUS_ONE_SUSPECTED" in r.message and "GET /owners" in r.message for r in caplog.records)
+        assert registry.query_warnings[("GET", "/owners", "repeat")] == 1
+
+
 class TestAuth:
     def test_register_user(self, client):
         response = client.post("/api/auth/register", json={
@@ -101,6 +210,24 @@ class TestAuth:
         assert response.status_code == 200
         assert "access_token" in response.json()
 
+    def test_users_etag(self, auth_client):
+        response = auth_client.get("/api/auth/users")
+        assert response.status_code == 200
+        assert response.json()[0]["alias"] == "TU"
+        etag = response.headers["etag"]
+
+        response = auth_client.get("/api/auth/users", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        auth_client.post("/api/auth/register", json={
+            "username": "second",
+            "email": "second@example.com",
+            "password": "secondpass"
+        })
+        response = auth_client.get("/api/auth/users", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+
     def test_login_invalid_credentials(self, client):
         response = client.post("/api/auth/login", json={
             "username": "nonexistent",
@@ -191,6 +318,55 @@ class TestLeads:
         assert data["last_name"] == "Test"
         assert data["company"] == "Test Co"
 
+    def test_list_leads(self, auth_client):
+        auth_client.post("/api/leads", json={"first_name": "Page", "last_name": "One"})
+
+        response = auth_client.get("/api/leads?page_size=10")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        assert data["pages"] == 1
+        item = data["items"][0]
+        assert item["full_name"] == "Page One"
+        assert item["owner_alias"] == "TU"
+        assert isinstance(item["created_at"], str)
+
+    def test_list_leads_sparse_fields(self, auth_client):
+        auth_client.post("/api/leads", json={
+            "first_name": "Sparse",
+            "last_name": "Lead",
+            "description": "Long notes that the list view never shows"
+        })
+
+        response = auth_client.get("/api/leads?fields=full_name,status")
+        assert response.status_code == 200
+        assert response.json()["items"] == [
+            {"id": response.json()["items"][0]["id"], "full_name": "Sparse Lead", "status": "New"}
+        ]
+
+        response = auth_client.get("/api/leads?fields=password_hash")
+        assert response.status_code == 400
+
+        # The documented page admits the sparse items
+        items = auth_client.get("/openapi.json").json()["components"]["schemas"]["LeadPage"]["properties"]["items"]
+        assert {"$ref": "#/components/schemas/LeadResponse"} in items["items"]["anyOf"]
+
+    def test_list_leads_sorting(self, auth_client):
+        for last_name, score in (("Baker", 50), ("Adams", 50), ("Clark", 90)):
+            auth_client.post("/api/leads", json={"last_name": last_name, "score": score})
+
+        response = auth_client.get("/api/leads?sort_by=full_name&sort_order=asc")
+        assert [l["last_name"] for l in response.json()["items"]] == ["Adams", "Baker", "Clark"]
+
+        # Equal scores fall back to id order
+        response = auth_client.get("/api/leads?sort_by=score&sort_order=desc")
+        assert [l["last_name"] for l in response.json()["items"]] == ["Clark", "Adams", "Baker"]
+
+        for query in ("sort_by=description", "sort_by=owner", "sort_by=full_name&sort_order=sideways"):
+            response = auth_client.get(f"/api/leads?{query}")
+            assert response.status_code == 400
+            assert "Must be one of" in response.json()["detail"]
+
     def test_convert_lead(self, auth_client):
         # Create a lead
         create_response = auth_client.post("/api/leads", json={
@@ -251,6 +427,358 @@ class TestOpportunities:
         assert data["amount"] == 50000
 
 
+class TestFilters:
+    def _names(self, client, expression, **params):
+        response = client.get("/api/leads", params={"filter": json.dumps(expression), "sort_by": "full_name", "sort_order": "asc", **params})
+        assert response.status_code == 200, response.text
+        return [item["last_name"] for item in response.json()["items"]]
+
+    def test_filter_expression(self, auth_client):
+        for last_name, status_, score, company in (
+            ("Able", "New", 10, "Acme"),
+            ("Baker", "Contacted", 55, "Globex"),
+            ("Clark", "Qualified", 90, None),
+            ("Dunn", "New", 75, "Acme Labs"),
+        ):
+            auth_client.post("/api/leads", json={"last_name": last_name, "status": status_, "score": score, "company": company})
+
+        assert self._names(auth_client, {"field": "status", "op": "in", "value": ["New", "Qualified"]}) == ["Able", "Clark", "Dunn"]
+        assert self._names(auth_client, {"field": "score", "op": "between", "value": [50, 80]}) == ["Baker", "Dunn"]
+        assert self._names(auth_client, {"field": "company", "op": "is_null"}) == ["Clark"]
+        assert self._names(auth_client, {"field": "company", "op": "starts_with", "value": "acme"}) == ["Able", "Dunn"]
+        assert self._names(auth_client, {"field": "created_at", "op": "last_n_days", "value": 7}) == ["Able", "Baker", "Clark", "Dunn"]
+        assert self._names(auth_client, {"and": [
+            {"field": "status", "op": "ne", "value": "Contacted"},
+            {"or": [{"field": "score", "op": "gte", "value": 80}, {"field": "company", "op": "eq", "value": "Acme"}]},
+        ]}) == ["Able", "Clark"]
+
+        response = auth_client.get("/api/leads", params={"filter": json.dumps({"field": "status", "op": "eq", "value": "New"})})
+        assert response.json()["total"] == 2
+
+    def test_filter_panel_params(self, auth_client):
+        auth_client.post("/api/opportunities", json={"name": "Small", "amount": 1000, "stage": "Prospecting"})
+        auth_client.post("/api/opportunities", json={"name": "Large", "amount": 90000, "stage": "Prospecting"})
+
+        response = auth_client.get("/api/opportunities", params={
+            "filter_0_field": "amount_min", "filter_0_op": "equals", "filter_0_value": "5000",
+            "filter_1_field": "stage", "filter_1_op": "equals", "filter_1_value": "Prospecting",
+        })
+        assert response.status_code == 200
+        assert [item["name"] for item in response.json()["items"]] == ["Large"]
+
+    def test_invalid_filters(self, auth_client):
+        for expression in (
+            "not json",
+            json.dumps({"field": "password_hash", "op": "eq", "value": "x"}),
+            json.dumps({"field": "score", "op": "contains", "value": "1"}),
+            json.dumps({"field": "score", "op": "gt", "value": "high"}),
+            json.dumps({"field": "status", "op": "in", "value": []}),
+            json.dumps({"or": []}),
+            json.dumps({"field": ["x"], "op": "eq", "value": 1}),
+            json.dumps({"field": "status", "op": ["eq"], "value": "New"}),
+            json.dumps({"field": {"name": "status"}, "op": {"eq": 1}}),
+        ):
+            response = auth_client.get("/api/leads", params={"filter": expression})
+            assert response.status_code == 400, expression
+
+    def test_relative_dates_follow_the_day(self, auth_client, monkeypatch):
+        from datetime import datetime, timedelta
+        from app import filters
+
+        auth_client.post("/api/leads", json={"last_name": "Recent"})
+        now = [datetime.utcnow()]
+        monkeypatch.setattr(filters, "_now", lambda: now[0])
+        params = {"filter": json.dumps({"field": "created_at", "op": "last_n_days", "value": 7})}
+
+        first = auth_client.get("/api/leads", params=params)
+        assert first.json()["total"] == 1
+        etag = first.headers["etag"]
+        now[0] += timedelta(minutes=1)
+        assert auth_client.get("/api/leads", params=params, headers={"If-None-Match": etag}).status_code == 304
+        # Same window, same bound values: the count is cached once
+        assert len(count_cache) == 1
+
+        now[0] += timedelta(days=1)
+        moved = auth_client.get("/api/leads", params=params, headers={"If-None-Match": etag})
+        assert moved.status_code == 200
+        assert moved.headers["etag"] != etag
+
+    def test_compiled_by_shape(self):
+        first = compile_filter("lead", {"field": "status", "op": "in", "value": ["New"]})
+        second = compile_filter("lead", {"field": "status", "op": "in", "value": ["Qualified", "Contacted"]})
+        assert first.clause is second.clause
+        assert first.params != second.params
+
+
+class TestListing:
+    def test_count_is_cached_per_table_version(self, auth_client):
+        for i in range(3):
+            auth_client.post("/api/leads", json={"last_name": f"Counted{i}"})
+
+        counts = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("SELECT count(*)"):
+                counts.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            first = auth_client.get("/api/leads?page_size=2&page=1").json()
+            second = auth_client.get("/api/leads?page_size=2&page=2").json()
+            assert first["total"] == second["total"] == 3
+            assert len(counts) == 1
+
+            auth_client.post("/api/leads", json={"last_name": "Counted3"})
+            assert auth_client.get("/api/leads?page_size=2&page=2").json()["total"] == 4
+            assert len(counts) == 2
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    def test_statements_are_cached_by_shape(self, auth_client):
+        db = TestingSessionLocal()
+        try:
+            for owner_id in (1, 2):
+                list_records(db, "case", owner_id=owner_id, search="x")
+            with pytest.raises(TypeError):
+                list_records(db, "case", stage="Proposal")
+        finally:
+            db.close()
+        assert _statements.cache_info().hits >= 1
+
+
+class TestSessionRouter:
+    def _request(self, method, token="Bearer abc"):
+        from starlette.requests import Request
+        return Request({
+            "type": "http", "method": method, "path": "/", "query_string": b"",
+            "headers": [(b"authorization", token.encode())], "client": ("127.0.0.1", 1),
+        })
+
+    def test_read_only_url(self, tmp_path):
+        from sqlalchemy.engine import make_url
+        from sqlalchemy.exc import OperationalError
+        from app.database import read_only_url
+
+        assert read_only_url(make_url("sqlite://")) is None
+        assert read_only_url(make_url("sqlite:///:memory:")) is None
+        assert read_only_url(make_url("postgresql://db/crm")) is None
+
+        path = tmp_path / "app.db"
+        writer = create_engine(f"sqlite:///{path}")
+        with writer.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+            conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+        reader = create_engine(read_only_url(make_url(f"sqlite:///{path}")))
+        with reader.connect() as conn:
+            assert conn.exec_driver_sql("SELECT x FROM t").scalar() == 1
+            with pytest.raises(OperationalError, match="readonly"):
+                conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+        reader.dispose()
+        writer.dispose()
+
+    def test_reads_stick_to_the_primary_after_a_write(self, client, monkeypatch):
+        from app import database
+
+        read_sessions = sessionmaker(bind=engine, info={"read": True})
+        monkeypatch.setattr(database, "read_engine", object())
+        monkeypatch.setattr(database, "ReadSessionLocal", read_sessions)
+        monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
+        monkeypatch.setattr(database, "recent_writers", database.RecentWriters(60))
+
+        def session_for(method, token="Bearer abc"):
+            dependency = database.get_db(self._request(method, token))
+            db = next(dependency)
+            return db, dependency
+
+        db, dependency = session_for("GET")
+        assert db.info.get("read")
+        dependency.close()
+
+        # A POST that only reads does not make its client sticky
+        db, dependency = session_for("POST")
+        assert not db.info.get("read")
+        db.execute(User.__table__.select()).all()
+        db.commit()
+        dependency.close()
+        assert session_for("GET")[0].info.get("read")
+
+        db, dependency = session_for("POST")
+        db.add(User(username="writer", email="writer@example.com", password_hash="x"))
+        db.commit()
+        dependency.close()
+        assert not session_for("GET")[0].info.get("read")
+        assert session_for("GET", "Bearer other")[0].info.get("read")
+
+    def test_sessions_are_created_on_first_use(self, client):
+        from app.database import LazySession
+
+        created = []
+
+        def factory(**kwargs):
+            created.append(kwargs)
+            return TestingSessionLocal(**kwargs)
+
+        db = LazySession(factory, {"client": "Bearer abc"})
+        db.close()
+        assert not created
+
+        db = LazySession(factory, {"client": "Bearer abc"})
+        assert db.execute(User.__table__.select()).all() == []
+        assert db.started and db.info["client"] == "Bearer abc"
+        db.close()
+        assert not db.started and len(created) == 1
+
+    def test_logging_endpoints_skip_the_database(self, auth_client, monkeypatch):
+        monkeypatch.setattr(directory, "poll_interval", 60)
+        auth_client.get("/api/auth/users")
+        checkouts = []
+        listener = lambda *args: checkouts.append(args)
+        event.listen(engine, "checkout", listener)
+        try:
+            for path in ("/api/logs/frontend-click", "/api/logs/action"):
+                response = auth_client.post(path, json={"action_type": "CLICK", "details": "Save", "element": "button"})
+                assert response.status_code == 200
+                assert response.json() == {"status": "logged"}
+        finally:
+            event.remove(engine, "checkout", listener)
+        assert checkouts == []
+
+        auth_client.headers = {"Authorization": "Bearer invalid"}
+        assert auth_client.post("/api/logs/action", json={"action_type": "CLICK", "details": "Save"}).status_code == 401
+
+    def test_recent_writers_expire(self, monkeypatch):
+        from app import database
+
+        writers = database.RecentWriters(5, maxsize=2)
+        now = [100.0]
+        monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+        writers.mark("a")
+        assert "a" in writers
+        now[0] += 6
+        assert "a" not in writers
+        writers.mark("b")
+        writers.mark("c")
+        assert len(writers) == 2
+
+
+class TestWriteQueue:
+    def _lead(self, name):
+        def apply(session):
+            lead = Lead(last_name=name)
+            session.add(lead)
+            session.flush()
+            return lead.id
+        return apply
+
+    def test_units_share_one_commit(self, client):
+        writes = WriteQueue(TestingSessionLocal, window=0.2)
+        try:
+            futures = [writes.submit(self._lead(f"Grouped {i}")) for i in range(5)]
+            ids = [f.result(timeout=5) for f in futures]
+        finally:
+            writes.stop()
+        assert len(set(ids)) == 5
+        assert (writes.batches, writes.units) == (1, 5)
+
+        db = TestingSessionLocal()
+        try:
+            assert crud.get_leads(db)[1] == 5
+        finally:
+            db.close()
+
+    def test_failing_unit_only_fails_its_caller(self, client):
+        def broken(session):
+            raise ValueError("bad unit")
+
+        writes = WriteQueue(TestingSessionLocal, window=0.2)
+        try:
+            futures = [writes.submit(self._lead("Kept")), writes.submit(broken), writes.submit(self._lead("Also kept"))]
+            assert futures[0].result(timeout=5)
+            with pytest.raises(ValueError, match="bad unit"):
+                futures[1].result(timeout=5)
+            assert futures[2].result(timeout=5)
+        finally:
+            writes.stop()
+        assert writes.replays == 1
+
+        db = TestingSessionLocal()
+        try:
+            assert sorted(lead.last_name for lead in crud.get_leads(db)[0]) == ["Also kept", "Kept"]
+        finally:
+            db.close()
+
+    def test_detail_views_do_not_wait_for_tracking(self, auth_client):
+        import threading
+
+        lead_id = auth_client.post("/api/leads", json={"last_name": "Viewed"}).json()["id"]
+        units = write_queue.units
+        release = threading.Event()
+        blocker = write_queue.submit(lambda session: release.wait(5))
+        try:
+            # Answered while the writer is still busy with the unit ahead
+            assert auth_client.get(f"/api/leads/{lead_id}").status_code == 200
+            assert not blocker.done()
+        finally:
+            release.set()
+        write_queue.stop()
+        assert write_queue.units == units + 2
+
+        recent = auth_client.get("/api/dashboard/recent-records").json()
+        assert [(r["record_type"], r["record_id"]) for r in recent] == [("lead", lead_id)]
+
+    def test_deferred_failures_are_logged(self, monkeypatch):
+        import app.write_queue as write_queue_module
+
+        logged = []
+        monkeypatch.setattr(write_queue_module, "log_action", lambda **kwargs: logged.append(kwargs))
+        writes = WriteQueue(TestingSessionLocal)
+        try:
+            writes.defer(lambda session: 1 / 0).exception(timeout=5)
+        finally:
+            writes.stop()
+        assert logged[0]["action_type"] == "WRITE_QUEUE_UNIT_FAILED" and logged[0]["status"] == "error"
+
+    def test_record_writes_go_through_the_queue(self, auth_client):
+        units = write_queue.units
+        created = auth_client.post("/api/cases", json={"subject": "Queued", "priority": "Critical"})
+        assert created.status_code == 201
+        case = created.json()
+        # Created and auto-assigned in the same unit
+        assert case["id"] and case["case_number"] and case["owner_alias"] == "TU"
+
+        updated = auth_client.put(f"/api/cases/{case['id']}", json={"status": "Working"}).json()
+        assert updated["status"] == "Working" and updated["updated_at"]
+        assert auth_client.put(f"/api/cases/{case['id'] + 1}", json={"status": "Working"}).status_code == 404
+        assert auth_client.delete(f"/api/cases/{case['id']}").status_code == 204
+        assert write_queue.units == units + 4
+
+    def test_queued_queries_count_towards_the_request(self, auth_client):
+        import re
+
+        case_id = auth_client.post("/api/cases", json={"subject": "Timed"}).json()["id"]
+        registry.clear()
+        response = auth_client.put(f"/api/cases/{case_id}", json={"status": "Working"})
+        queries = int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+        # The user lookup, then the unit's load, UPDATE and change log writes
+        assert queries >= 4
+        assert registry.db_queries[("PUT", "/api/cases/{case_id}")] == queries
+
+
+class TestActivities:
+    def test_activity_created_by_name(self, auth_client):
+        account_id = auth_client.post("/api/accounts", json={"name": "Busy"}).json()["id"]
+        auth_client.post("/api/activities", json={
+            "record_type": "account",
+            "record_id": account_id,
+            "activity_type": "call",
+            "subject": "Intro call"
+        })
+
+        response = auth_client.get(f"/api/activities/account/{account_id}")
+        assert response.status_code == 200
+        assert response.json()[0]["created_by_name"] == "Test User"
+
+
 class TestDashboard:
     def test_get_stats(self, auth_client):
         response = auth_client.get("/api/dashboard/stats")
@@ -267,3 +795,562 @@ class TestDashboard:
         assert response.status_code == 200
         data = response.json()
         assert len(data["results"]) > 0
+
+    def test_recent_records_keep_the_last_twenty(self, auth_client):
+        db = TestingSessionLocal()
+        try:
+            for record_id in range(25):
+                crud.add_recent_record(db, 1, "lead", record_id, f"Lead {record_id}")
+            crud.add_recent_record(db, 1, "lead", 10, "Lead 10 renamed")
+
+            recent = crud.get_recent_records(db, 1, limit=50)
+            assert len(recent) == 20
+            assert recent[0].record_name == "Lead 10 renamed"
+            assert crud.get_cases_by_priority(db, owner_id=1) == {}
+        finally:
+            db.close()
+
+
+class TestWritePaths:
+    def test_update_does_not_refetch(self, auth_client):
+        lead_id = auth_client.post("/api/leads", json={"last_name": "Quiet"}).json()["id"]
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = auth_client.put(f"/api/leads/{lead_id}", json={"company": "Quiet Co"})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert response.json()["company"] == "Quiet Co"
+        assert response.json()["updated_at"] is not None
+        # current user lookup, one load of the lead, the UPDATE, the lead
+        # table version bump and its record_changes entry
+        assert len(statements) == 5
+
+    def test_change_owner_returns_new_owner(self, auth_client):
+        db = TestingSessionLocal()
+        other = User(
+            username="other",
+            email="other@example.com",
+            password_hash="x",
+            first_name="Olivia",
+            last_name="Park",
+        )
+        db.add(other)
+        db.commit()
+        other_id = other.id
+        db.close()
+
+        account_id = auth_client.post("/api/accounts", json={"name": "Owned"}).json()["id"]
+        response = auth_client.put(f"/api/accounts/{account_id}/change-owner?owner_id={other_id}")
+        assert response.status_code == 200
+        assert response.json()["owner_id"] == other_id
+        assert response.json()["owner_alias"] == "OP"
+
+
+class TestDenormalizedNames:
+    def test_account_rename_fans_out(self, auth_client):
+        account_id = auth_client.post("/api/accounts", json={"name": "Old Name"}).json()["id"]
+        contact = auth_client.post("/api/contacts", json={
+            "last_name": "Linked",
+            "account_id": account_id
+        }).json()
+        assert contact["account_name"] == "Old Name"
+        assert contact["owner_alias"] == "TU"
+
+        auth_client.put(f"/api/accounts/{account_id}", json={"name": "New Name"})
+
+        items = auth_client.get("/api/contacts").json()["items"]
+        assert items[0]["account_name"] == "New Name"
+
+    def test_rename_keeps_child_versions(self, auth_client):
+        account_id = auth_client.post("/api/accounts", json={"name": "Old Name"}).json()["id"]
+        contact_id = auth_client.post("/api/contacts", json={"last_name": "Linked", "account_id": account_id}).json()["id"]
+        before = auth_client.get(f"/api/contacts/{contact_id}")
+
+        auth_client.put(f"/api/accounts/{account_id}", json={"name": "New Name"})
+
+        after = auth_client.get(f"/api/contacts/{contact_id}", headers={"If-None-Match": before.headers["etag"]})
+        assert after.status_code == 200
+        assert after.json()["account_name"] == "New Name"
+        assert after.json()["updated_at"] == before.json()["updated_at"]
+        db = TestingSessionLocal()
+        assert db.get(Contact, contact_id).row_version == 1
+        db.close()
+
+    def test_delete_clears_names(self, auth_client):
+        account_id = auth_client.post("/api/accounts", json={"name": "Gone"}).json()["id"]
+        contact_id = auth_client.post("/api/contacts", json={"last_name": "Orphan", "account_id": account_id}).json()["id"]
+        case_id = auth_client.post("/api/cases", json={"subject": "Help", "account_id": account_id, "contact_id": contact_id}).json()["id"]
+
+        auth_client.delete(f"/api/accounts/{account_id}")
+        contact = auth_client.get(f"/api/contacts/{contact_id}").json()
+        assert contact["account_id"] is None
+        assert contact["account_name"] is None
+
+        auth_client.delete(f"/api/contacts/{contact_id}")
+        case = auth_client.get(f"/api/cases/{case_id}").json()
+        assert (case["account_id"], case["account_name"]) == (None, None)
+        assert (case["contact_id"], case["contact_name"]) == (None, None)
+
+    def test_user_rename_fans_out(self, auth_client):
+        auth_client.post("/api/accounts", json={"name": "Renamed Owner"})
+
+        db = TestingSessionLocal()
+        user = db.query(User).filter(User.username == "testuser").first()
+        user.first_name = "Walter"
+        db.commit()
+        db.close()
+
+        items = auth_client.get("/api/accounts").json()["items"]
+        assert items[0]["owner_alias"] == "WU"
+
+    def test_user_change_in_another_worker(self, auth_client, monkeypatch):
+        monkeypatch.setattr(directory, "poll_interval", 0)
+        assert auth_client.get("/api/auth/users").json()[0]["alias"] == "TU"
+        assert directory.loaded
+
+        # Another worker's rename: this process' commit hooks never see it
+        db = TestingSessionLocal()
+        db.execute(update(User.__table__).where(User.__table__.c.username == "testuser").values(first_name="Walter"))
+        bump_table_version(db, "user")
+        db.commit()
+        db.close()
+
+        assert auth_client.post("/api/accounts", json={"name": "After"}).json()["owner_alias"] == "WU"
+        assert auth_client.get("/api/auth/users").json()[0]["alias"] == "WU"
+
+
+    def test_invalidate_clears_every_map(self, auth_client):
+        user_id = auth_client.get("/api/auth/me").json()["id"]
+        db = TestingSessionLocal()
+        try:
+            assert directory.username(db, user_id) == "testuser"
+        finally:
+            db.close()
+
+        directory.invalidate()
+        assert not directory.loaded and len(directory) == 0
+        assert directory.alias(user_id) is None
+
+    def test_load_retries_after_a_racing_invalidation(self, auth_client, monkeypatch):
+        from app import user_directory
+
+        users = UserDirectory()
+        versions = []
+
+        def racing_version(db, table):
+            versions.append(table)
+            if len(versions) == 1:
+                users.invalidate()
+            return table_version(db, table)
+
+        monkeypatch.setattr(user_directory, "table_version", racing_version)
+        db = TestingSessionLocal()
+        try:
+            users.load(db)
+        finally:
+            db.close()
+        assert len(versions) == 2
+        assert users.loaded and len(users) == 1
+
+
+class TestRecordCache:
+    def test_detail_reflects_updates(self, auth_client):
+        account_id = auth_client.post("/api/accounts", json={"name": "Cached"}).json()["id"]
+        assert auth_client.get(f"/api/accounts/{account_id}").json()["name"] == "Cached"
+        assert ("account", account_id) in record_cache._entries
+
+        auth_client.put(f"/api/accounts/{account_id}", json={"name": "Changed"})
+        assert auth_client.get(f"/api/accounts/{account_id}").json()["name"] == "Changed"
+
+        auth_client.delete(f"/api/accounts/{account_id}")
+        assert auth_client.get(f"/api/accounts/{account_id}").status_code == 404
+
+    def test_changes_from_other_workers_are_polled(self, client):
+        db = TestingSessionLocal()
+        account = crud.create_account(db, schemas.AccountCreate(name="Shared"))
+        worker_cache = RecordCache(poll_interval=0)
+        loads = []
+
+        def load():
+            loads.append(1)
+            row = crud.get_account(db, account.id)
+            return {"name": row.name}, row.name, row.row_version
+
+        worker_cache.get_or_load(db, "account", account.id, load)
+        worker_cache.get_or_load(db, "account", account.id, load)
+        assert len(loads) == 1
+
+        # Written through a different session, as another worker would
+        other = TestingSessionLocal()
+        crud.update_account(other, account.id, schemas.AccountUpdate(name="Renamed"))
+        other.close()
+
+        db.expire_all()
+        entry = worker_cache.get_or_load(db, "account", account.id, load)
+        assert len(loads) == 2
+        assert entry.name == "Renamed"
+        db.close()
+
+
+class TestConditionalGet:
+    def test_detail_etag_follows_row_version(self, auth_client):
+        lead_id = auth_client.post("/api/leads", json={"last_name": "Tagged"}).json()["id"]
+
+        first = auth_client.get(f"/api/leads/{lead_id}")
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        cached = auth_client.get(f"/api/leads/{lead_id}", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        # Two updates within the same second still produce distinct ETags
+        auth_client.put(f"/api/leads/{lead_id}", json={"company": "One"})
+        auth_client.put(f"/api/leads/{lead_id}", json={"company": "Two"})
+        changed = auth_client.get(f"/api/leads/{lead_id}", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.json()["company"] == "Two"
+        assert changed.headers["etag"] != etag
+
+    def test_list_not_modified_skips_page_query(self, auth_client):
+        auth_client.post("/api/leads", json={"last_name": "Listed"})
+        etag = auth_client.get("/api/leads?status=New").headers["etag"]
+        assert auth_client.get("/api/leads?status=Qualified").headers["etag"] != etag
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = auth_client.get("/api/leads?status=New", headers={"If-None-Match": f"W/{etag}"})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert response.status_code == 304
+        assert not any("FROM leads" in statement for statement in statements)
+
+    def test_list_etag_changes_on_insert(self, auth_client):
+        etag = auth_client.get("/api/leads").headers["etag"]
+        auth_client.post("/api/leads", json={"last_name": "Newcomer"})
+        response = auth_client.get("/api/leads", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+
+class TestCompression:
+    def test_large_list_is_compressed(self, auth_client):
+        for i in range(30):
+            auth_client.post("/api/leads", json={"last_name": f"Bulk {i}", "company": "Compressible Corp"})
+
+        response = auth_client.get("/api/leads", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "accept-encoding" in response.headers["vary"].lower()
+        assert response.headers["etag"].startswith("W/")
+        assert len(response.json()["items"]) == 25
+
+        # The weakened tag still validates
+        etag = response.headers["etag"]
+        assert auth_client.get("/api/leads", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_small_response_is_not_compressed(self, client):
+        response = client.get("/api/health", headers={"Accept-Encoding": "br, gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_precompressed_static_assets(self, tmp_path):
+        (tmp_path / "assets").mkdir()
+        script = b"console.log('hello');\n" * 200
+        (tmp_path / "assets" / "index-1a2b3c.js").write_bytes(script)
+        (tmp_path / "index.html").write_bytes(b"<html></html>")
+        assert precompress_directory(str(tmp_path)) == 2
+        assert precompress_directory(str(tmp_path)) == 0
+
+        static_app = FastAPI()
+        static_app.mount("/", PrecompressedStaticFiles(directory=str(tmp_path), html=True))
+        static_client = TestClient(static_app)
+
+        response = static_client.get("/assets/index-1a2b3c.js", headers={"Accept-Encoding": "br"})
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["content-type"].startswith("text/javascript")
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert brotli.decompress((tmp_path / "assets" / "index-1a2b3c.js.br").read_bytes()) == script
+
+        response = static_client.get("/assets/index-1a2b3c.js", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress((tmp_path / "assets" / "index-1a2b3c.js.gz").read_bytes()) == script
+
+        response = static_client.get("/", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["cache-control"] == "no-cache"
+
+
+class TestSlowQueries:
+    def test_requires_admin(self, auth_client):
+        assert auth_client.get("/api/admin/slow-queries").status_code == 403
+
+    def test_search_scan_is_reported(self, admin_client, monkeypatch):
+        auth_client = admin_client
+        monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+        slow_query_log.clear()
+        auth_client.post("/api/accounts", json={"name": "Acme Scanned"})
+        auth_client.get("/api/accounts?q=acme")
+        monkeypatch.setattr(slow_query_log, "threshold_ms", 1e9)
+
+        findings = auth_client.get("/api/admin/slow-queries").json()["queries"]
+        # The count has to visit every row; the page itself walks the created_at index
+        search = next(
+            q for q in findings
+            if q["sql"].startswith("SELECT count(*)") and "FROM accounts" in q["sql"] and "LIKE" in q["sql"].upper()
+        )
+        assert search["full_scans"] == ["accounts"]
+        assert search["plan"]
+        assert search["routes"] == {"GET /api/accounts": search["count"]}
+        assert "'%acme%'" not in search["sql"]
+
+        assert auth_client.delete("/api/admin/slow-queries").status_code == 204
+        assert auth_client.get("/api/admin/slow-queries").json()["queries"] == []
+
+
+# (case, crud call, tables a full scan is expected on). Searches match
+# substrings with a leading wildcard, which no index can serve.
+QUERY_PLAN_CASES = [
+    ("accounts", lambda db: crud.get_accounts(db), ()),
+    ("accounts_by_owner", lambda db: crud.get_accounts(db, owner_id=1), ()),
+    ("accounts_by_name", lambda db: crud.get_accounts(db, sort_by="name", sort_order="asc"), ()),
+    ("accounts_search", lambda db: crud.get_accounts(db, search="acme"), ("accounts",)),
+    ("contacts", lambda db: crud.get_contacts(db), ()),
+    ("contacts_by_owner", lambda db: crud.get_contacts(db, owner_id=1), ()),
+    ("contacts_by_account", lambda db: crud.get_contacts(db, account_id=1), ()),
+    ("leads", lambda db: crud.get_leads(db), ()),
+    ("leads_by_owner", lambda db: crud.get_leads(db, owner_id=1), ()),
+    ("leads_by_status", lambda db: crud.get_leads(db, status="New"), ()),
+    ("leads_by_owner_and_status", lambda db: crud.get_leads(db, owner_id=1, status="New"), ()),
+    ("leads_oldest_first", lambda db: crud.get_leads(db, sort_order="asc"), ()),
+    ("leads_search", lambda db: crud.get_leads(db, search="acme"), ("leads",)),
+    ("leads_filter_status_in", lambda db: crud.get_leads(db, filters=compile_filter(
+        "lead", {"field": "status", "op": "in", "value": ["New", "Qualified"]})), ()),
+    ("leads_filter_created_window", lambda db: crud.get_leads(db, filters=compile_filter(
+        "lead", {"field": "created_at", "op": "last_n_days", "value": 30})), ()),
+    ("opportunities", lambda db: crud.get_opportunities(db), ()),
+    ("opportunities_by_owner", lambda db: crud.get_opportunities(db, owner_id=1), ()),
+    ("opportunities_by_account", lambda db: crud.get_opportunities(db, account_id=1), ()),
+    ("opportunities_by_stage", lambda db: crud.get_opportunities(db, stage="Proposal"), ()),
+    ("cases", lambda db: crud.get_cases(db), ()),
+    ("cases_by_owner", lambda db: crud.get_cases(db, owner_id=1), ()),
+    ("cases_by_account", lambda db: crud.get_cases(db, account_id=1), ()),
+    ("cases_by_status", lambda db: crud.get_cases(db, status="Escalated"), ()),
+    ("cases_by_priority", lambda db: crud.get_cases(db, priority="High"), ()),
+    ("cases_filter_open_high", lambda db: crud.get_cases(db, filters=compile_filter("case", {"and": [
+        {"field": "priority", "op": "eq", "value": "High"},
+        {"field": "status", "op": "in", "value": ["New", "Working"]},
+    ]})), ()),
+    ("cases_search", lambda db: crud.get_cases(db, search="CS-"), ("cases",)),
+    ("case_counts_by_priority", lambda db: crud.get_cases_by_priority(db), ()),
+    ("case_counts_by_priority_for_owner", lambda db: crud.get_cases_by_priority(db, owner_id=1), ()),
+    ("activities", lambda db: crud.get_activities(db, "lead", 1), ()),
+    ("recent_records", lambda db: crud.get_recent_records(db, 1), ()),
+    ("user_by_username", lambda db: crud.get_user_by_username(db, "testuser"), ()),
+    ("user_by_email", lambda db: crud.get_user_by_email(db, "test@example.com"), ()),
+    ("detail", lambda db: crud.get_lead(db, 1), ()),
+    ("global_search", lambda db: crud.global_search(db, "acme"), ("contacts", "accounts", "leads", "opportunities", "cases")),
+]
+
+
+class TestQueryPlans:
+    """EXPLAIN QUERY PLAN of the hot read queries, so that a model or filter
+    change that drops an index use fails here instead of in production."""
+
+    @pytest.mark.parametrize("call, expected_scans", [c[1:] for c in QUERY_PLAN_CASES], ids=[c[0] for c in QUERY_PLAN_CASES])
+    def test_no_unexpected_full_scans(self, client, call, expected_scans):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        db = TestingSessionLocal()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            call(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+            db.close()
+
+        assert statements
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = explain(conn, statement, parameters)
+                unexpected = [t for t in full_scans(plan) if t not in expected_scans]
+                assert not unexpected, f"full scan of {unexpected}: {plan}\n{statement}"
+
+    @pytest.mark.parametrize(
+        "record_type, sort_by, sort_order",
+        [(t, key, order) for t, keys in SORT_KEYS.items() for key in keys for order in SORT_ORDERS]
+    )
+    def test_sorts_walk_an_index(self, client, record_type, sort_by, sort_order):
+        list_records = {
+            "account": crud.get_accounts,
+            "contact": crud.get_contacts,
+            "lead": crud.get_leads,
+            "opportunity": crud.get_opportunities,
+            "case": crud.get_cases,
+        }[record_type]
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        db = TestingSessionLocal()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            list_records(db, sort_by=sort_by, sort_order=sort_order)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+            db.close()
+
+        with engine.connect() as conn:
+            plan = explain(conn, *statements[-1])
+        assert not full_scans(plan), plan
+        assert not any("TEMP B-TREE" in detail for detail in plan), plan
+
+    def test_owner_lead_lists_use_the_owner_index(self, client):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        db = TestingSessionLocal()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            crud.get_leads(db, owner_id=1)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+            db.close()
+
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = explain(conn, statement, parameters)
+                assert any("ix_leads_owner_id_is_converted_created_at" in detail for detail in plan), plan
+
+
+class TestProfiling:
+    def test_profiles_next_matching_requests(self, admin_client, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiler, "directory", str(tmp_path))
+        monkeypatch.setattr(profiler, "poll_interval", 0)
+        lead_id = admin_client.post("/api/leads", json={"last_name": "Profiled"}).json()["id"]
+
+        response = admin_client.post("/api/admin/profiles", json={"pattern": "/api/leads/*", "count": 2, "method": "get"})
+        assert response.status_code == 201
+        session_id = response.json()["id"]
+
+        admin_client.get("/api/accounts")
+        for _ in range(3):
+            admin_client.get(f"/api/leads/{lead_id}")
+
+        sessions = admin_client.get("/api/admin/profiles").json()
+        assert sessions[0]["id"] == session_id
+        assert sessions[0]["captured"] == 2
+        assert len(list((tmp_path / session_id).glob("*-GET-api_leads_*.prof"))) == 2
+
+        summary = admin_client.get(f"/api/admin/profiles/{session_id}?sort=tottime&limit=5").json()
+        assert summary["captured"] == 2
+        assert len(summary["functions"]) == 5
+        tottimes = [f["tottime"] for f in summary["functions"]]
+        assert tottimes == sorted(tottimes, reverse=True)
+
+        assert admin_client.delete(f"/api/admin/profiles/{session_id}").json()["stopped"] is True
+        assert admin_client.get("/api/admin/profiles/../../etc").status_code == 404
+        assert admin_client.get("/api/admin/profiles/20260101-000000-abcdef").status_code == 404
+
+    def test_request_path_reads_only_collecting_sessions(self, tmp_path, monkeypatch):
+        from app.profiling import Profiler
+
+        profiles = Profiler(str(tmp_path), poll_interval=0)
+        full = profiles.start("/api/leads/*", 1)
+        stopped = profiles.start("/api/accounts", 5)
+        assert profiles.claim("GET", "/api/leads/1") is not None
+        assert profiles.claim("GET", "/api/leads/2") is None
+        profiles.stop(stopped.id)
+        # A worker that died before retiring its full session leaves a marker
+        open(tmp_path / "active" / full.id, "w").close()
+
+        current = profiles.start("/api/cases", 2)
+        assert [session.id for session in profiles.active()] == [current.id]
+        assert [marker.name for marker in (tmp_path / "active").iterdir()] == [current.id]
+        # Finished sessions stay listed for their summaries
+        assert len(profiles.sessions()) == 3
+
+        loaded = []
+        monkeypatch.setattr(profiles, "_load", lambda session_id: loaded.append(session_id) or Profiler._load(profiles, session_id))
+        profiles.active()
+        assert loaded == [current.id]
+
+    def test_requires_admin(self, auth_client):
+        response = auth_client.post("/api/admin/profiles", json={"pattern": "/api/*"})
+        assert response.status_code == 403
+
+
+class TestMemory:
+    def test_report_and_snapshot_diff(self, admin_client):
+        report = admin_client.get("/api/admin/memory").json()
+        assert report["tracemalloc"]["tracing"] is False
+        assert report["sessions"]["open_sessions"] >= 1
+        assert report["caches"]["record_cache"]["maxsize"] == record_cache.maxsize
+        assert "assignment_services" in report["services"]
+
+        assert admin_client.post("/api/admin/memory/snapshots").status_code == 409
+        try:
+            assert admin_client.post("/api/admin/memory/tracemalloc/start?frames=5").json()["tracing"] is True
+            first = admin_client.post("/api/admin/memory/snapshots").json()["id"]
+            retained = [bytearray(1024) for _ in range(512)]
+            diff = admin_client.get(f"/api/admin/memory/diff?since={first}").json()
+            assert any(d["size_diff_kb"] >= 500 and "test_api.py" in d["location"] for d in diff)
+            assert admin_client.get("/api/admin/memory").json()["tracemalloc"]["top"]
+            assert admin_client.get("/api/admin/memory/diff?since=999").status_code == 404
+            del retained
+        finally:
+            assert admin_client.post("/api/admin/memory/tracemalloc/stop").json()["tracing"] is False
+
+    def test_requires_admin(self, auth_client):
+        assert auth_client.get("/api/admin/memory").status_code == 403
+
+
+class TestReplay:
+    def test_parses_rotated_logs_in_order(self, tmp_path):
+        from benchmarks.replay import parse_log, remap_path, route_of
+
+        line = "[2026-01-20 17:53:{s:02d}] INFO | ACTION: API_RESPONSE | USER: sarah | DETAILS: {r} | Status: 200 | Time: 0.04s | STATUS: success\n"
+        (tmp_path / "app.log.1").write_text(line.format(s=0, r="GET /api/leads/7") + "noise\n")
+        (tmp_path / "app.log").write_text(line.format(s=3, r="POST /api/leads"))
+
+        logged = parse_log(str(tmp_path / "app.log"))
+        assert [(r.method, r.path, r.offset, r.user) for r in logged] == [
+            ("GET", "/api/leads/7", 0.0, "sarah"),
+            ("POST", "/api/leads", 3.0, "sarah"),
+        ]
+        assert route_of("/api/leads/7/convert") == "/api/leads/{id}/convert"
+        assert remap_path("/api/leads/7", {"leads": [10, 11]}) == "/api/leads/11"
+
+
+class TestSeed:
+    def test_activities_per_record_is_the_mean(self):
+        import random
+        from datetime import datetime
+        import seed
+
+        ctx = {"now": datetime(2026, 1, 1), "days": 30, "owners": ([(1, "TU")], [1.0])}
+        for mean in (0.5, 1, 3):
+            ctx["activities_per_record"] = mean
+            rows = seed._activity_rows(random.Random(7), range(20000), ctx, "lead")
+            assert abs(len(rows) / 20000 - mean) < 0.05 * mean
+        ctx["activities_per_record"] = 0
+        assert seed._activity_rows(random.Random(7), range(100), ctx, "lead") == []
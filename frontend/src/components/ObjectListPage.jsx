@@ -73,12 +73,15 @@ export default function ObjectListPage({
         sort_order: sortOrder,
       };
 
-      // Add filter params
+      // Add filter params; some operators take no value
       filters.forEach((filter, index) => {
-        if (filter.field && filter.value) {
+        const valueless = ['is_empty', 'is_not_empty', 'last_7_days', 'last_30_days', 'this_month', 'this_year'].includes(filter.operator);
+        if (filter.field && (filter.value || valueless)) {
           params[`filter_${index}_field`] = filter.field;
           params[`filter_${index}_op`] = filter.operator;
-          params[`filter_${index}_value`] = filter.value;
+          if (!valueless) {
+            params[`filter_${index}_value`] = filter.value;
+          }
         }
       });
 
@@ -8,10 +8,10 @@ import toast from 'react-hot-toast';
 
 const columns = [
   { key: 'name', label: 'Account Name' },
-  { key: 'phone', label: 'Phone' },
+  { key: 'phone', label: 'Phone', sortable: false },
   { key: 'industry', label: 'Industry' },
-  { key: 'website', label: 'Website' },
-  { key: 'owner_alias', label: 'Account Owner Alias' },
+  { key: 'website', label: 'Website', sortable: false },
+  { key: 'owner_alias', label: 'Account Owner Alias', sortable: false },
 ];
 
 export default function Accounts() {
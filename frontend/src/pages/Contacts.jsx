@@ -14,9 +14,9 @@ const columns = [
     render: (item) => item.full_name || `${item.first_name || ''} ${item.last_name}`.trim(),
   },
   { key: 'account_name', label: 'Account Name' },
-  { key: 'phone', label: 'Phone' },
+  { key: 'phone', label: 'Phone', sortable: false },
   { key: 'email', label: 'Email' },
-  { key: 'owner_alias', label: 'Contact Owner Alias' },
+  { key: 'owner_alias', label: 'Contact Owner Alias', sortable: false },
 ];
 
 export default function Contacts() {
@@ -25,12 +25,12 @@ const leadColumns = [
     label: 'Name',
     render: (item) => item.full_name || `${item.first_name || ''} ${item.last_name}`.trim(),
   },
-  { key: 'title', label: 'Title' },
+  { key: 'title', label: 'Title', sortable: false },
   { key: 'company', label: 'Company' },
-  { key: 'phone', label: 'Phone' },
-  { key: 'email', label: 'Email' },
+  { key: 'phone', label: 'Phone', sortable: false },
+  { key: 'email', label: 'Email', sortable: false },
   { key: 'status', label: 'Lead Status' },
-  { key: 'owner_alias', label: 'Owner Alias' },
+  { key: 'owner_alias', label: 'Owner Alias', sortable: false },
 ];
 
 const contactColumns = [
@@ -40,16 +40,16 @@ const contactColumns = [
     render: (item) => item.full_name || `${item.first_name || ''} ${item.last_name}`.trim(),
   },
   { key: 'account_name', label: 'Account Name' },
-  { key: 'phone', label: 'Phone' },
+  { key: 'phone', label: 'Phone', sortable: false },
   { key: 'email', label: 'Email' },
-  { key: 'owner_alias', label: 'Contact Owner Alias' },
+  { key: 'owner_alias', label: 'Contact Owner Alias', sortable: false },
 ];
 
 const accountColumns = [
   { key: 'name', label: 'Account Name' },
-  { key: 'phone', label: 'Phone' },
+  { key: 'phone', label: 'Phone', sortable: false },
   { key: 'industry', label: 'Industry' },
-  { key: 'owner_alias', label: 'Account Owner Alias' },
+  { key: 'owner_alias', label: 'Account Owner Alias', sortable: false },
 ];
 
 const opportunityColumns = [
@@ -66,7 +66,7 @@ const opportunityColumns = [
     label: 'Close Date',
     render: (item) => item.close_date ? new Date(item.close_date).toLocaleDateString() : '-',
   },
-  { key: 'owner_alias', label: 'Owner Alias' },
+  { key: 'owner_alias', label: 'Owner Alias', sortable: false },
 ];
 
 export default function Sales() {
@@ -52,7 +52,7 @@ const caseColumns = [
     label: 'Date/Time Opened',
     render: (item) => new Date(item.created_at).toLocaleString(),
   },
-  { key: 'owner_alias', label: 'Case Owner Alias' },
+  { key: 'owner_alias', label: 'Case Owner Alias', sortable: false },
 ];
 
 const contactColumns = [
@@ -62,16 +62,16 @@ const contactColumns = [
     render: (item) => item.full_name || `${item.first_name || ''} ${item.last_name}`.trim(),
   },
   { key: 'account_name', label: 'Account Name' },
-  { key: 'phone', label: 'Phone' },
+  { key: 'phone', label: 'Phone', sortable: false },
   { key: 'email', label: 'Email' },
-  { key: 'owner_alias', label: 'Contact Owner Alias' },
+  { key: 'owner_alias', label: 'Contact Owner Alias', sortable: false },
 ];
 
 const accountColumns = [
   { key: 'name', label: 'Account Name' },
-  { key: 'phone', label: 'Phone' },
+  { key: 'phone', label: 'Phone', sortable: false },
   { key: 'industry', label: 'Industry' },
-  { key: 'owner_alias', label: 'Account Owner Alias' },
+  { key: 'owner_alias', label: 'Account Owner Alias', sortable: false },
 ];
 
 export default function Service() {